@@ -1,12 +1,25 @@
 import os
+import re
 import json
+import asyncio
 import secrets
+import threading
 from datetime import datetime
 from functools import wraps
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, session
-from src.workflow_langgraph import process_resume_with_langgraph
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, session, jsonify, abort
+from markupsafe import escape
 from werkzeug.utils import secure_filename
+from src.metadata_store import load_metadata, update_metadata, next_id
+from src.storage import get_storage
+from src.admission import AdmissionController
+from src.deadline import Deadline
+from src import async_loop, llm_cache, search_index, storage_manager
+from src.upload_stream import PDFUploadStream, UploadRejected
+from src.site_renderer import WEBSITE_TEMPLATES, DEFAULT_TEMPLATE, build_template_context, template_file
+from src.build_assets import load_asset_manifest
+from src.template_cache import create_bytecode_cache, precompile_templates
+from src.pdf_preview import preview_key, store_previews, delete_previews
 
 # Carrega variáveis do ficheiro .env
 load_dotenv()
@@ -15,6 +28,10 @@ load_dotenv()
 
 app = Flask(__name__)
 
+# Bytecode dos templates em disco, partilhado pelos workers do gunicorn
+# (tem de ser definido antes do primeiro acesso a app.jinja_env)
+app.jinja_options = {**app.jinja_options, 'bytecode_cache': create_bytecode_cache()}
+
 # Carrega configurações do ficheiro config.json
 CONFIG_FILE = 'config.json'
 
@@ -45,13 +62,75 @@ DATA_FOLDER = 'data'
 ALLOWED_EXTENSIONS = set(config['app']['allowed_extensions'])
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 MAX_FILE_SIZE = config['app']['max_file_size_mb'] * 1024 * 1024
+MAX_PDF_PAGES = config['app'].get('max_pdf_pages', 50)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PHOTOS_FOLDER'] = PHOTOS_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
-# Ficheiro para guardar metadados
-METADATA_FILE = os.path.join(DATA_FOLDER, 'curriculos.json')
+# Assets minificados com hash (python -m src.build_assets); em debug usa as fontes
+ASSET_MANIFEST = load_asset_manifest()
+ASSET_CACHE_SECONDS = 365 * 24 * 3600
+# As fontes não têm hash no nome (--fetch-fonts reescreve os mesmos ficheiros): cache curta, revalidada pelo ETag
+FONT_CACHE_SECONDS = 24 * 3600
+
+# Pasta de exportação estática (src/static_export.py); None desativa a exportação automática
+STATIC_EXPORT_FOLDER = config['app'].get('static_export_folder')
+
+# Cache das respostas do LLM (src/llm_cache.py); TTL ou tamanho 0 desativam-na
+llm_cache.configure(
+    max_age_seconds=config['app'].get('llm_cache_ttl_hours', 168) * 3600,
+    max_bytes=config['app'].get('llm_cache_mb', 20) * 1024 * 1024
+)
+
+# Quota e limpeza dos uploads (src/storage_manager.py); quota 0 = sem limite
+storage_manager.configure(
+    quota_bytes=config['app'].get('storage_quota_mb', 0) * 1024 * 1024,
+    interval_seconds=config['app'].get('storage_gc_interval_min', 60) * 60
+)
+
+# O stack LLM/PDF (langgraph, langchain, pdfplumber) só é importado quando é
+# preciso, para que o /login responda logo após um cold start
+_workflow_lock = threading.Lock()
+_process_resume = None
+
+
+def load_workflow():
+    """Importa o workflow LangGraph sob demanda e devolve a função de processamento"""
+    global _process_resume
+    if _process_resume is None:
+        with _workflow_lock:
+            if _process_resume is None:
+                from src.workflow_langgraph import process_resume_with_langgraph
+                from src import extraction_cache, extraction_pool, pdf_engines, chunked_analysis
+                extraction_cache.configure(
+                    max_bytes=config['app'].get('extraction_cache_mb', 50) * 1024 * 1024
+                )
+                pdf_engines.configure(engine=config['app'].get('pdf_engine', 'auto'))
+                # CVs longos analisados em partes (map-reduce)
+                chunked_analysis.configure(
+                    threshold_tokens=config['app'].get('llm_chunk_threshold_tokens', 6000),
+                    chunk_tokens=config['app'].get('llm_chunk_tokens', 3000),
+                    concurrency=config['app'].get('llm_chunk_concurrency', 3)
+                )
+                # Processos de extração criados já (no warmup), com limites por PDF
+                extraction_pool.configure(
+                    workers=config['app'].get('extraction_workers', 2),
+                    cpu_seconds=config['app'].get('extraction_cpu_s', 20),
+                    memory_mb=config['app'].get('extraction_memory_mb', 1024),
+                    timeout_seconds=config['app'].get('extraction_timeout_s', 30),
+                    max_jobs=config['app'].get('extraction_max_jobs', 50)
+                )
+                extraction_pool.get_pool()
+                _process_resume = process_resume_with_langgraph
+    return _process_resume
+
+
+def start_workflow_warmup():
+    """Carrega o workflow numa thread em segundo plano para o primeiro upload não esperar"""
+    thread = threading.Thread(target=load_workflow, name='workflow-warmup', daemon=True)
+    thread.start()
+    return thread
 
 
 def generate_access_token():
@@ -69,52 +148,360 @@ def allowed_image(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_IMAGE_EXTENSIONS
 
 
+class UploadRequest(Request):
+    """Request que recebe PDFs em streaming diretamente para a pasta de uploads"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if filename and allowed_file(filename):
+            return PDFUploadStream(
+                app.config['UPLOAD_FOLDER'],
+                max_bytes=MAX_FILE_SIZE,
+                max_pages=MAX_PDF_PAGES
+            )
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+app.request_class = UploadRequest
+
+
+@app.template_global()
+def asset_url(path):
+    """URL de um asset de static/ (versão com hash do build, se existir)"""
+    built = None if app.debug else ASSET_MANIFEST.get(path)
+    return url_for('static', filename=f'dist/{built}' if built else path)
+
+
+@app.after_request
+def cache_static_assets(response):
+    """Os ficheiros em static/dist têm o hash no nome e nunca mudam de conteúdo: cache imutável"""
+    if response.status_code != 200:
+        return response
+    if request.path.startswith('/static/dist/'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_CACHE_SECONDS
+        response.cache_control.immutable = True
+    elif request.path.startswith('/static/fonts/'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = FONT_CACHE_SECONDS
+    return response
+
+
+# Esquemas de cores disponíveis para os websites
+COLOR_SCHEMES = {
+    'blue': {
+        'primary': '#2c3e50',
+        'secondary': '#3498db',
+        'gradient': 'linear-gradient(135deg, #2c3e50 0%, #3498db 100%)'
+    },
+    'green': {
+        'primary': '#1e3a2e',
+        'secondary': '#27ae60',
+        'gradient': 'linear-gradient(135deg, #1e3a2e 0%, #27ae60 100%)'
+    },
+    'purple': {
+        'primary': '#4a148c',
+        'secondary': '#9c27b0',
+        'gradient': 'linear-gradient(135deg, #4a148c 0%, #9c27b0 100%)'
+    },
+    'orange': {
+        'primary': '#d84315',
+        'secondary': '#ff5722',
+        'gradient': 'linear-gradient(135deg, #d84315 0%, #ff5722 100%)'
+    },
+    'teal': {
+        'primary': '#004d40',
+        'secondary': '#009688',
+        'gradient': 'linear-gradient(135deg, #004d40 0%, #009688 100%)'
+    }
+}
+
+
 def get_color_scheme(scheme_name):
     """Retorna as cores para o esquema selecionado"""
-    schemes = {
-        'blue': {
-            'primary': '#2c3e50',
-            'secondary': '#3498db',
-            'gradient': 'linear-gradient(135deg, #2c3e50 0%, #3498db 100%)'
-        },
-        'green': {
-            'primary': '#1e3a2e',
-            'secondary': '#27ae60',
-            'gradient': 'linear-gradient(135deg, #1e3a2e 0%, #27ae60 100%)'
-        },
-        'purple': {
-            'primary': '#4a148c',
-            'secondary': '#9c27b0',
-            'gradient': 'linear-gradient(135deg, #4a148c 0%, #9c27b0 100%)'
-        },
-        'orange': {
-            'primary': '#d84315',
-            'secondary': '#ff5722',
-            'gradient': 'linear-gradient(135deg, #d84315 0%, #ff5722 100%)'
-        },
-        'teal': {
-            'primary': '#004d40',
-            'secondary': '#009688',
-            'gradient': 'linear-gradient(135deg, #004d40 0%, #009688 100%)'
-        }
-    }
-    return schemes.get(scheme_name, schemes['blue'])
+    return COLOR_SCHEMES.get(scheme_name, COLOR_SCHEMES['blue'])
 
 
-def load_metadata():
-    """Carrega metadados dos currículos"""
-    if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+# Limite de análises com o LLM em simultâneo e fila de espera (partilhados pelos workers)
+admission = AdmissionController(
+    max_concurrent=config['app'].get('llm_max_concurrent', 2),
+    max_queue=config['app'].get('llm_max_queue', 8),
+    wait_timeout=config['app'].get('llm_queue_timeout_s', 300),
+    avg_seconds=config['app'].get('llm_avg_seconds', 30),
+)
 
 
-def save_metadata(data):
-    """Guarda metadados dos currículos"""
-    # Garante que o diretório existe
-    os.makedirs(DATA_FOLDER, exist_ok=True)
-    with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def admission_rejected():
+    """Resposta 503 com Retry-After quando a fila do LLM está cheia"""
+    retry_after = admission.retry_after()
+    print(f"[WARNING] Upload rejeitado - fila do LLM cheia ({admission.counts()})")
+    message = (f"O serviço está com muitos currículos em processamento. "
+               f"Tente novamente dentro de {retry_after} segundos.")
+    return message, 503, {'Retry-After': str(retry_after), 'Content-Type': 'text/plain; charset=utf-8'}
+
+
+# Processamento em duas fases: dados determinísticos já, resumos do LLM depois
+FAST_PATH_TIMEOUT = config['app'].get('fast_path_timeout_s', 30)
+
+
+def find_previous_version(metadata, update_token, username):
+    """
+    Procura o currículo com que o novo upload é comparado (páginas e secções iguais)
+
+    Usa o token indicado no formulário ou, na falta dele, o currículo mais
+    recente com o mesmo nome. Só serve para reaproveitar a extração e a
+    análise: quem é substituído é decidido por find_replaced_entry.
+    """
+    if update_token:
+        return next((c for c in metadata if c.get('access_token') == update_token), None)
+    same_name = [c for c in metadata if c.get('username', '').strip().lower() == username.lower()]
+    return same_name[-1] if same_name else None
+
+
+def find_replaced_entry(metadata, update_token):
+    """
+    Currículo que o upload substitui (mesmo token e id; PDF e foto antigos apagados)
+
+    Só com o token escolhido explicitamente no formulário: um nome igual
+    pode ser de outra pessoa.
+    """
+    if not update_token:
+        return None
+    return next((c for c in metadata if c.get('access_token') == update_token), None)
+
+
+def upload_key(filename):
+    """Chave no armazenamento de um ficheiro de uploads/ (PDF ou 'photos/<foto>')"""
+    return f"{UPLOAD_FOLDER}/{filename}"
+
+
+def discard_working_copy(filepath, key):
+    """Remove a cópia local de trabalho, se não for o próprio ficheiro guardado"""
+    if not get_storage().is_stored_at(key, filepath) and os.path.exists(filepath):
+        os.remove(filepath)
+
+
+def save_profile_photo(photo, timestamp):
+    """
+    Guarda a foto de perfil enviada no formulário
+
+    Returns:
+        Caminho relativo a uploads/ ('photos/<foto>'), ou None se não foi enviada uma imagem
+    """
+    if not photo or not photo.filename or not allowed_image(photo.filename):
+        return None
+    print("[DEBUG] Salvando foto de perfil...")
+    photo_filename = secure_filename(photo.filename)
+    unique_photo = f"{timestamp}_{photo_filename}"
+
+    # Garante que diretório existe
+    os.makedirs(app.config['PHOTOS_FOLDER'], exist_ok=True)
+
+    photo_path_full = os.path.join(app.config['PHOTOS_FOLDER'], unique_photo)
+    photo.save(photo_path_full)
+    # Caminho relativo para o template
+    profile_photo_path = f"photos/{unique_photo}"
+    get_storage().put_file(upload_key(profile_photo_path), photo_path_full)
+    discard_working_copy(photo_path_full, upload_key(profile_photo_path))
+    print(f"[DEBUG] Foto salva: {profile_photo_path}")
+    return profile_photo_path
+
+
+def save_resume_entry(new_entry, replace=False, text=None):
+    """
+    Grava a entrada de um currículo nos metadados (sob lock) e no índice de pesquisa
+
+    Com replace=True substitui a entrada com o mesmo token, mantendo o id; se
+    entretanto tiver sido eliminada, ou num upload novo, recebe um id novo.
+    text é o texto extraído do PDF (indexado para a pesquisa).
+    """
+    with update_metadata() as metadata:
+        index = next((i for i, c in enumerate(metadata)
+                      if c.get('access_token') == new_entry['access_token']), None) if replace else None
+        if index is not None:
+            new_entry['id'] = metadata[index]['id']
+            metadata[index] = new_entry
+        else:
+            new_entry['id'] = next_id(metadata)
+            metadata.append(new_entry)
+    search_index.index_entry(new_entry, text)
+    return new_entry
+
+
+def remove_resume_entry(token):
+    """Remove a entrada de um currículo dos metadados (sob lock) e devolve-a"""
+    with update_metadata() as metadata:
+        curriculo = next((c for c in metadata if c.get('access_token') == token), None)
+        if curriculo:
+            metadata.remove(curriculo)
+    if curriculo:
+        search_index.remove_entry(curriculo.get('id'))
+    return curriculo
+
+
+# Modo assíncrono (src/async_loop.py): o workflow em segundo plano corre como
+# corrotina num event loop partilhado em vez de ocupar uma thread por upload
+ASYNC_LLM = config['app'].get('async_llm', False)
+
+# Prazo de cada processamento (extração + LLM); os que estão a correr neste
+# worker ficam registados por token para poderem ser cancelados
+PROCESSING_DEADLINE = config['app'].get('processing_deadline_s', 180)
+_running_jobs = {}
+_running_jobs_lock = threading.Lock()
+
+
+def cancel_processing(access_token, reason):
+    """Cancela o processamento em curso de um currículo (se estiver a correr neste worker)"""
+    with _running_jobs_lock:
+        deadline = _running_jobs.get(access_token)
+    if deadline is not None and not deadline.cancelled:
+        print(f"[DEBUG] Processamento de {access_token[:8]} cancelado: {reason}")
+        deadline.cancel(reason)
+
+
+def start_resume_processing(filepath, access_token, previous_version=None, content_hash=None,
+                            ticket=None, profile=None):
+    """
+    Arranca o workflow numa thread (ou no event loop, com ASYNC_LLM) e espera
+    só pela extração determinística
+
+    Quando o LLM termina, o resultado é junto à entrada do currículo
+    (depois de o pedido de upload ter guardado os metadados).
+
+    Returns:
+        Dict do job com 'pdf_text', 'fast_data', 'preview_pages', 'entry_saved'
+        (Event) e, se o workflow já terminou, 'result'
+    """
+    process_resume_with_langgraph = load_workflow()
+    fast_ready = threading.Event()
+    deadline = Deadline(PROCESSING_DEADLINE)
+    job = {'entry_saved': threading.Event(), 'saved': False, 'deadline': deadline}
+
+    # Uma versão anterior ainda em análise é cancelada depois de esta ser guardada
+    with _running_jobs_lock:
+        job['superseded'] = _running_jobs.get(access_token)
+        _running_jobs[access_token] = deadline
+    if ticket:
+        ticket.deadline = deadline
+    if profile:
+        # O perfil só é gravado quando o workflow em segundo plano também terminar
+        profile.hold()
+        profile.info['token'] = access_token[:8]
+
+    def on_progress(node_name, state):
+        if profile:
+            profile.node_finished(node_name)
+        if node_name == 'rule_extract':
+            job['pdf_text'] = state['pdf_text']
+            job['fast_data'] = state['fast_data']
+            fast_ready.set()
+
+    def cleanup():
+        # Sem chamada ao LLM (nenhuma secção mudou) o lugar na fila ainda está ocupado
+        if ticket:
+            ticket.release()
+        with _running_jobs_lock:
+            if _running_jobs.get(access_token) is deadline:
+                del _running_jobs[access_token]
+
+    def deliver(result):
+        job['result'] = result
+        fast_ready.set()
+        print(f"[DEBUG] Workflow concluído: {result.get('success')}")
+
+        # Só atualiza a entrada depois de o pedido de upload a ter criado
+        # (um processamento cancelado já não tem a quem entregar o resultado)
+        if job['entry_saved'].wait(timeout=FAST_PATH_TIMEOUT + 60) and job['saved'] \
+                and not deadline.cancelled:
+            apply_llm_result(access_token, result)
+        # O PDF já foi guardado pelo pedido de upload
+        discard_working_copy(filepath, upload_key(os.path.basename(filepath)))
+        if profile:
+            profile.release()
+
+    def run():
+        if profile:
+            profile.workflow_started()
+        try:
+            result = process_resume_with_langgraph(
+                filepath, on_progress=on_progress, previous_version=previous_version,
+                pdf_hash=content_hash, llm_gate=ticket, deadline=deadline
+            )
+        finally:
+            cleanup()
+        deliver(result)
+
+    async def run_async():
+        from src.workflow_langgraph import process_resume_with_langgraph_async
+        if profile:
+            profile.workflow_started()
+        try:
+            result = await process_resume_with_langgraph_async(
+                filepath, on_progress=on_progress, previous_version=previous_version,
+                pdf_hash=content_hash, llm_gate=ticket, deadline=deadline
+            )
+        finally:
+            cleanup()
+        # Metadados, índice e exportação são síncronos: no executor do loop
+        await asyncio.get_running_loop().run_in_executor(None, deliver, result)
+
+    if ticket:
+        ticket.handed_off = True
+    if ASYNC_LLM:
+        async_loop.submit(run_async())
+    else:
+        threading.Thread(target=run, name=f'workflow-{access_token[:8]}', daemon=True).start()
+    # Enquanto a extração corre, renderiza as imagens das páginas para o viewer
+    # (no pool de extração, ou sob o lock do PDFium se estiver desativado)
+    job['preview_pages'] = store_previews(filepath, os.path.basename(filepath))
+    fast_ready.wait(timeout=FAST_PATH_TIMEOUT)
+    return job
+
+
+def apply_llm_result(access_token, workflow_result):
+    """Junta o resultado do LLM à entrada publicada com os dados determinísticos"""
+    from src.rule_extractor import merge_resume_data
+    from src.resume_versions import save_version_record
+
+    with update_metadata() as metadata:
+        curriculo = next((c for c in metadata if c.get('access_token') == access_token), None)
+        if not curriculo:
+            # Eliminado entretanto
+            return
+
+        if workflow_result['success']:
+            llm_data = workflow_result['website_structure'].get('data', {})
+            curriculo['resume_data'] = merge_resume_data(curriculo.get('resume_data', {}), llm_data)
+            curriculo['processed'] = True
+            curriculo['processing_status'] = 'done'
+        else:
+            # Mantém o website com os dados determinísticos
+            curriculo['processing_status'] = 'failed'
+            curriculo['processing_error'] = workflow_result.get('error', 'Erro desconhecido no processamento')
+
+        curriculo['processing_warnings'] = workflow_result.get('errors', [])
+
+    # Competências, experiência e idiomas do LLM ficam pesquisáveis
+    search_index.index_entry(curriculo)
+    if workflow_result['success'] and workflow_result.get('version_record'):
+        save_version_record(access_token, workflow_result['version_record'])
+    print(f"[DEBUG] Resultado do LLM aplicado: {curriculo['processing_status']}")
+
+    if curriculo['processing_status'] == 'done':
+        export_static_site(curriculo)
+
+
+def export_static_site(curriculo):
+    """Atualiza a cópia estática do website (se a exportação estiver configurada)"""
+    if not STATIC_EXPORT_FOLDER:
+        return
+    try:
+        from src.static_export import export_entry
+        if export_entry(curriculo, STATIC_EXPORT_FOLDER):
+            print(f"[DEBUG] Website estático exportado: {curriculo['access_token'][:8]}")
+    except Exception as e:
+        print(f"[WARNING] Erro ao exportar website estático: {e}")
 
 
 # Funções de autenticação
@@ -125,7 +512,8 @@ def authenticate_user(username, password):
         if user['username'] == username and user['password'] == password:
             return {
                 'username': user['username'],
-                'name': user.get('name', username)
+                'name': user.get('name', username),
+                'admin': bool(user.get('admin', False))
             }
     return None
 
@@ -141,6 +529,22 @@ def login_required(f):
     return decorated_function
 
 
+def admin_required(f):
+    """Decorator para rotas só de administradores (\"admin\": true no config.json)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not session.get('user', {}).get('admin'):
+            abort(404)
+        return f(*args, **kwargs)
+    return login_required(decorated_function)
+
+
+def profiling_requested():
+    """Perfil pedido com o header X-Profile: 1 ou ?profile=1 (só administradores)"""
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    return flag == '1' and session.get('user', {}).get('admin', False)
+
+
 # Rotas de autenticação
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -180,16 +584,36 @@ def logout():
 def index():
     """Página principal com formulário de upload"""
     curriculos = load_metadata()
-    return render_template('index.html', curriculos=curriculos)
+    return render_template('index.html', curriculos=curriculos, color_schemes=COLOR_SCHEMES.keys(),
+                           website_templates=WEBSITE_TEMPLATES, default_template=DEFAULT_TEMPLATE)
 
 
 @app.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
     """Processa o upload do PDF"""
+    # Com a fila do LLM cheia, rejeita logo (antes de receber o PDF)
+    ticket = admission.try_enter_queue()
+    if ticket is None:
+        return admission_rejected()
+
+    # Modo de profiling (src/profiling.py): nada é importado nem medido sem o pedido
+    profile = None
+    if profiling_requested():
+        from src.profiling import ProfileSession
+        profile = ProfileSession('upload')
+
     try:
         print("=== INÍCIO DO UPLOAD ===")
 
+        # Lê o corpo multipart (o PDF é validado enquanto é recebido)
+        try:
+            request.files
+        except UploadRejected as e:
+            print(f"[DEBUG] Upload rejeitado durante a receção: {e.description}")
+            flash(f'❌ {e.description}', 'error')
+            return redirect(url_for('index'))
+
         # Verifica se o ficheiro foi enviado
         if 'pdf' not in request.files:
             flash('Nenhum ficheiro foi selecionado', 'error')
@@ -197,6 +621,8 @@ def upload_file():
 
         file = request.files['pdf']
         username = request.form.get('username', '').strip()
+        # Opcional: token do currículo do qual este PDF é uma nova versão
+        update_token = request.form.get('update_token', '').strip()
         print(f"[DEBUG] Username: {username}, File: {file.filename}")
 
         # Validações
@@ -212,72 +638,83 @@ def upload_file():
             flash('Apenas ficheiros PDF são permitidos', 'error')
             return redirect(url_for('index'))
 
-        # Guarda o ficheiro PDF
+        # Confirma o número de páginas antes de aceitar o ficheiro
+        try:
+            num_pages = file.stream.verify()
+        except UploadRejected as e:
+            flash(f'❌ {e.description}', 'error')
+            return redirect(url_for('index'))
+        content_hash = file.stream.sha256
+
+        # Guarda o ficheiro PDF (o temporário já está na pasta de uploads)
         print("[DEBUG] Salvando PDF...")
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         unique_filename = f"{timestamp}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
 
-        # Garante que diretório existe
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(filepath)
-        print(f"[DEBUG] PDF salvo em: {filepath}")
+        file.stream.commit(filepath)
+        print(f"[DEBUG] PDF salvo em: {filepath} ({num_pages} páginas, sha256 {content_hash[:12]})")
 
         # Processa foto de perfil (opcional)
         profile_photo_path = None
         try:
-            if 'profile_photo' in request.files:
-                photo = request.files['profile_photo']
-                if photo and photo.filename and allowed_image(photo.filename):
-                    print("[DEBUG] Salvando foto de perfil...")
-                    photo_filename = secure_filename(photo.filename)
-                    unique_photo = f"{timestamp}_{photo_filename}"
-
-                    # Garante que diretório existe
-                    os.makedirs(app.config['PHOTOS_FOLDER'], exist_ok=True)
-
-                    photo_path_full = os.path.join(app.config['PHOTOS_FOLDER'], unique_photo)
-                    photo.save(photo_path_full)
-                    # Caminho relativo para o template
-                    profile_photo_path = f"photos/{unique_photo}"
-                    print(f"[DEBUG] Foto salva: {profile_photo_path}")
+            profile_photo_path = save_profile_photo(request.files.get('profile_photo'), timestamp)
         except Exception as e:
             print(f"[WARNING] Erro ao salvar foto (continuando): {e}")
 
-        # Processa esquema de cores (opcional)
-        color_scheme_name = request.form.get('color_scheme', 'blue')
+        # Nova versão de um currículo existente (só com update_token)? Um
+        # currículo com o mesmo nome serve apenas para reaproveitar páginas e secções iguais
+        metadata = load_metadata()
+        previous_entry = find_replaced_entry(metadata, update_token)
+        compared_entry = previous_entry or find_previous_version(metadata, update_token, username)
+        previous_version = None
+        if compared_entry:
+            from src.resume_versions import load_version_record
+            previous_version = load_version_record(compared_entry['access_token'])
+        if previous_entry:
+            print(f"[DEBUG] Nova versão do currículo ID {previous_entry['id']}")
+        elif compared_entry:
+            print(f"[DEBUG] Comparado com o currículo ID {compared_entry['id']} (mesmo nome)")
+
+        # Processa esquema de cores (opcional; numa nova versão mantém o anterior)
+        default_scheme = previous_entry.get('color_scheme', 'blue') if previous_entry else 'blue'
+        color_scheme_name = request.form.get('color_scheme', default_scheme)
         color_scheme = get_color_scheme(color_scheme_name)
         print(f"[DEBUG] Esquema de cores: {color_scheme_name}")
 
-        # Gera token de acesso único
-        access_token = generate_access_token()
+        # Gera token de acesso único (uma nova versão mantém o link)
+        access_token = previous_entry['access_token'] if previous_entry else generate_access_token()
 
         # === PROCESSAMENTO COM LANGGRAPH WORKFLOW ===
-        flash('🚀 Processando currículo com LangGraph... Aguarde 30-60 segundos.', 'info')
+        # Espera só pela extração determinística; o LLM continua em segundo plano
         print("[DEBUG] Iniciando workflow...")
-
-        # Processa com o workflow LangGraph
-        workflow_result = process_resume_with_langgraph(filepath)
-        print(f"[DEBUG] Workflow concluído: {workflow_result.get('success')}")
-
-        if not workflow_result['success']:
-            # IA é obrigatória - remove o PDF e retorna erro
+        job = start_resume_processing(
+            filepath, access_token, previous_version=previous_version, content_hash=content_hash,
+            ticket=ticket, profile=profile
+        )
+
+        if not job.get('pdf_text'):
+            # Sem texto não há website - remove o PDF e retorna erro
+            job['entry_saved'].set()
             if os.path.exists(filepath):
                 os.remove(filepath)
-            error_msg = workflow_result.get('error', 'Erro desconhecido no processamento')
-            flash(f'❌ Erro ao processar currículo com IA: {error_msg}', 'error')
-            flash('💡 Verifique se a API GROQ_API_KEY está configurada corretamente.', 'info')
+            delete_previews(unique_filename, job['preview_pages'])
+            if profile_photo_path:
+                get_storage().delete(upload_key(profile_photo_path))
+            workflow_result = job.get('result') or {}
+            error_msg = workflow_result.get('error') or '; '.join(workflow_result.get('errors', [])) \
+                or 'Não foi possível extrair texto do PDF'
+            flash(f'❌ Erro ao processar currículo: {error_msg}', 'error')
             return redirect(url_for('index'))
 
-        # Extrai dados do website gerado pelo workflow
-        website_structure = workflow_result['website_structure']
-        resume_data = website_structure.get('data', {})
-
-        # Mostra avisos se houver
-        if workflow_result.get('errors'):
-            for error in workflow_result['errors']:
-                flash(f'⚠️ {error}', 'warning')
+        # Dados provisórios (regex + secções); os resumos do LLM chegam depois.
+        # Numa nova versão, a análise anterior fica visível até ser atualizada
+        resume_data = dict(previous_entry.get('resume_data', {})) if previous_entry else {}
+        resume_data.update(job['fast_data'])
+        if previous_entry and not profile_photo_path:
+            profile_photo_path = previous_entry.get('profile_photo')
+        print(f"[DEBUG] Dados determinísticos prontos: {', '.join(resume_data) or 'nenhum'}")
 
         # Garante que full_name existe
         if 'full_name' not in resume_data or not resume_data['full_name']:
@@ -291,24 +728,44 @@ def upload_file():
 
         # Guarda metadados
         print("[DEBUG] Salvando metadados...")
-        metadata = load_metadata()
         new_entry = {
-            'id': len(metadata) + 1,
+            'id': None,
             'username': username,
+            'uploaded_by': session['user']['username'],
             'filename': unique_filename,
             'original_filename': filename,
+            'content_hash': content_hash,
+            'num_pages': num_pages,
+            'preview_pages': job['preview_pages'],
             'upload_date': datetime.now().isoformat(),
             'access_token': access_token,
             'resume_data': resume_data,
             'profile_photo': profile_photo_path,
             'color_scheme': color_scheme_name,
-            'processed': True
+            'template': previous_entry.get('template', DEFAULT_TEMPLATE) if previous_entry else DEFAULT_TEMPLATE,
+            'processed': False,
+            'processing_status': 'pending',
+            'version': previous_entry.get('version', 1) + 1 if previous_entry else 1
         }
-        metadata.append(new_entry)
-        save_metadata(metadata)
+        # PDF no armazenamento (em streaming; no disco local já está no sítio)
+        get_storage().put_file(upload_key(unique_filename), filepath)
+
+        # Substitui a versão anterior (mesmo token e id) e remove o PDF antigo
+        save_resume_entry(new_entry, replace=bool(previous_entry), text=job['pdf_text'])
+        if job.get('superseded'):
+            job['superseded'].cancel('substituído por uma nova versão')
+        if previous_entry and previous_entry['filename'] != unique_filename:
+            get_storage().delete(upload_key(previous_entry['filename']))
+            delete_previews(previous_entry['filename'], previous_entry.get('preview_pages', 0))
+        if previous_entry and previous_entry.get('profile_photo') not in (None, profile_photo_path):
+            get_storage().delete(upload_key(previous_entry['profile_photo']))
+        job['saved'] = True
+        job['entry_saved'].set()
         print("[DEBUG] Metadados salvos")
+        if storage_manager.QUOTA_BYTES:
+            storage_manager.request_maintenance()
 
-        flash(f'Website de {username} gerado com sucesso!', 'success')
+        flash(f'Website de {username} publicado! A IA está a completar os resumos (30-60 segundos).', 'success')
         print("=== UPLOAD CONCLUÍDO COM SUCESSO ===")
         return redirect(url_for('website', token=access_token))
 
@@ -321,6 +778,23 @@ def upload_file():
         flash(f'❌ Erro ao processar currículo: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+    finally:
+        # Se o workflow não chegou a arrancar, o lugar na fila fica livre
+        if not ticket.handed_off:
+            ticket.release()
+        if profile:
+            profile.release()
+
+
+@app.route('/search')
+@login_required
+def search():
+    """Pesquisa nos currículos (índice FTS5, ordenada por relevância)"""
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', search_index.DEFAULT_LIMIT, type=int), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify(search_index.search(query, limit=limit, offset=offset))
+
 
 @app.route('/viewer/<token>')
 def viewer(token):
@@ -345,38 +819,32 @@ def website(token):
         flash('Website não encontrado ou token inválido', 'error')
         return redirect(url_for('index'))
 
-    # Extrai dados do currículo analisado
-    resume_data = curriculo.get('resume_data', {})
+    # Extrai dados do currículo analisado (adaptados ao template escolhido)
+    template = curriculo.get('template', 'simple')
+    context = build_template_context(curriculo.get('resume_data', {}), template)
 
-    # Adiciona ano atual
-    resume_data['current_year'] = datetime.now().year
+    # Enquanto o LLM não termina, a página mostra os dados provisórios e recarrega
+    processing = curriculo.get('processing_status') == 'pending'
 
-    return render_template('website_simple.html', **resume_data)
+    return render_template(template_file(template), processing=processing, **context)
 
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve os ficheiros PDF"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return get_storage().send(upload_key(filename), mimetype='application/pdf')
 
 
 @app.route('/delete/<token>', methods=['POST'])
 @login_required
 def delete_curriculo(token):
     """Elimina um currículo"""
-    metadata = load_metadata()
-    curriculo = next((c for c in metadata if c.get('access_token') == token), None)
+    cancel_processing(token, 'currículo eliminado')
+    curriculo = remove_resume_entry(token)
 
     if curriculo:
-        # Remove o ficheiro
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], curriculo['filename'])
-        if os.path.exists(filepath):
-            os.remove(filepath)
-
-        # Remove dos metadados
-        metadata = [c for c in metadata if c.get('access_token') != token]
-        save_metadata(metadata)
-
+        # Remove o PDF, a foto, as imagens das páginas, o registo de versões e o site exportado
+        storage_manager.purge_entry(curriculo, STATIC_EXPORT_FOLDER)
         flash('Currículo eliminado com sucesso', 'success')
     else:
         flash('Currículo não encontrado ou token inválido', 'error')
@@ -384,10 +852,194 @@ def delete_curriculo(token):
     return redirect(url_for('index'))
 
 
+@app.route('/edit/<token>', methods=['POST'])
+@login_required
+def edit_curriculo(token):
+    """
+    Altera as cores, a foto e o template de um website já publicado
+
+    Usa o resume_data guardado: não há nova extração nem chamada ao LLM. Só
+    a cópia estática deste site é reexportada.
+    """
+    color_scheme_name = request.form.get('color_scheme', '').strip()
+    template = request.form.get('template', '').strip()
+    if color_scheme_name and color_scheme_name not in COLOR_SCHEMES:
+        flash('Esquema de cores desconhecido', 'error')
+        return redirect(url_for('index'))
+    if template and template not in WEBSITE_TEMPLATES:
+        flash('Template desconhecido', 'error')
+        return redirect(url_for('index'))
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    try:
+        new_photo = save_profile_photo(request.files.get('profile_photo'), timestamp)
+    except Exception as e:
+        print(f"[WARNING] Erro ao salvar foto: {e}")
+        flash(f'❌ Erro ao guardar a foto: {e}', 'error')
+        return redirect(url_for('index'))
+    remove_photo = request.form.get('remove_photo') == '1'
+
+    with update_metadata() as metadata:
+        curriculo = next((c for c in metadata if c.get('access_token') == token), None)
+        if curriculo:
+            old_photo = curriculo.get('profile_photo')
+            resume_data = curriculo.setdefault('resume_data', {})
+            if color_scheme_name:
+                color_scheme = get_color_scheme(color_scheme_name)
+                curriculo['color_scheme'] = color_scheme_name
+                resume_data['color_primary'] = color_scheme['primary']
+                resume_data['color_secondary'] = color_scheme['secondary']
+                resume_data['color_gradient'] = color_scheme['gradient']
+            if template:
+                curriculo['template'] = template
+            if new_photo or remove_photo:
+                curriculo['profile_photo'] = resume_data['profile_photo'] = new_photo
+
+    if not curriculo:
+        if new_photo:
+            get_storage().delete(upload_key(new_photo))
+        flash('Currículo não encontrado ou token inválido', 'error')
+        return redirect(url_for('index'))
+
+    if old_photo and old_photo != curriculo.get('profile_photo'):
+        get_storage().delete(upload_key(old_photo))
+    print(f"[DEBUG] Website {token[:8]} alterado: cores={curriculo.get('color_scheme')}, "
+          f"template={curriculo.get('template', 'simple')}, foto={curriculo.get('profile_photo')}")
+
+    # A análise ainda em curso reexporta o site quando terminar
+    if curriculo.get('processing_status') == 'done':
+        export_static_site(curriculo)
+
+    flash('Website atualizado', 'success')
+    return redirect(url_for('website', token=token))
+
+
+@app.route('/uploads/previews/<filename>/<image>')
+def uploaded_preview(filename, image):
+    """Serve as imagens das páginas de um PDF (src/pdf_preview.py)"""
+    if filename != secure_filename(filename) or not re.fullmatch(r'(page-\d+|thumb)\.webp', image):
+        abort(404)
+    return get_storage().send(preview_key(filename, image), mimetype='image/webp')
+
+
 @app.route('/uploads/photos/<filename>')
 def uploaded_photo(filename):
     """Serve as fotos de perfil"""
-    return send_from_directory(app.config['PHOTOS_FOLDER'], filename)
+    return get_storage().send(upload_key(f"photos/{filename}"))
+
+
+@app.route('/debug/admission')
+@admin_required
+def debug_admission():
+    """Análises com o LLM em curso e em fila (todos os workers) e corrotinas neste worker"""
+    return jsonify({**admission.counts(), 'async_tasks': async_loop.running_tasks()})
+
+
+@app.route('/debug/storage')
+@admin_required
+def debug_storage():
+    """Uso do disco de uploads por currículo e por utilizador e última manutenção"""
+    return jsonify({**storage_manager.usage_report(), 'last_maintenance': storage_manager.last_run()})
+
+
+@app.route('/debug/llm-cache')
+@admin_required
+def debug_llm_cache():
+    """Hits, misses e tamanho da cache de respostas do LLM (todos os workers)"""
+    return jsonify(llm_cache.stats())
+
+
+@app.route('/debug/profiles')
+@admin_required
+def debug_profiles():
+    """Perfis de CPU e memória gravados (uploads com X-Profile: 1 ou ?profile=1)"""
+    from src.profiling import list_profiles
+
+    rows = ''.join(
+        f"""<tr><td><a href="{url_for('debug_profile', name=p['name'])}" style="color: #60a5fa;">{escape(p['name'])}</a></td>
+            <td>{p['total_seconds']:.2f}s</td><td>{max((n['peak_mb'] for n in p['nodes']), default=0):.1f} MB</td>
+            <td>{p['samples']}</td></tr>"""
+        for p in list_profiles()
+    )
+    return f"""
+    <html>
+    <head><title>Debug - Perfis</title></head>
+    <body style="font-family: monospace; padding: 20px; background: #1a1a2e; color: #eee;">
+        <h1>🔬 Perfis de upload</h1>
+        <p>Para gravar um perfil, envie um upload com <code>?profile=1</code> ou o header <code>X-Profile: 1</code>.</p>
+        <table cellpadding="6">
+            <tr><th>Perfil</th><th>Duração</th><th>Pico (node)</th><th>Amostras</th></tr>
+            {rows or '<tr><td colspan="4">Nenhum perfil gravado</td></tr>'}
+        </table>
+        <p><a href="/" style="color: #60a5fa;">← Voltar</a></p>
+    </body>
+    </html>
+    """
+
+
+@app.route('/debug/profiles/<name>')
+@admin_required
+def debug_profile(name):
+    """Detalhe de um perfil: nodes, funções mais amostradas e alocações"""
+    from src.profiling import load_profile
+
+    profile = load_profile(name)
+    if not profile:
+        abort(404)
+
+    nodes = ''.join(
+        f"<tr><td>{escape(n['node'])}</td><td>{n['seconds']:.3f}s</td><td>{n['peak_mb']:.2f} MB</td>"
+        f"<td>{n['current_mb']:.2f} MB</td><td>{n['rss_mb'] or 0:.1f} MB</td></tr>"
+        for n in profile['nodes']
+    )
+    functions = ''.join(
+        f"<tr><td>{f['total_pct']}%</td><td>{f['self_pct']}%</td><td>{escape(f['function'])}</td></tr>"
+        for f in profile['top_functions']
+    )
+    allocations = ''.join(
+        f"<tr><td>{a['size_kb']:.1f} KB</td><td>{a['count']}</td>"
+        f"<td>{'<br>'.join(str(escape(line)) for line in a['traceback'])}</td></tr>"
+        for a in profile['top_allocations']
+    )
+    return f"""
+    <html>
+    <head><title>Debug - Perfil {escape(name)}</title></head>
+    <body style="font-family: monospace; padding: 20px; background: #1a1a2e; color: #eee;">
+        <h1>🔬 {escape(name)}</h1>
+        <p>Token: {escape(profile.get('token', '-'))} · Duração: {profile['total_seconds']:.2f}s ·
+           {profile['samples']} amostras a cada {profile['sample_interval_ms']:.0f} ms ·
+           <a href="{url_for('debug_profile_stacks', name=name)}" style="color: #60a5fa;">stacks.folded</a></p>
+        <h2>Nodes do workflow</h2>
+        <table cellpadding="6">
+            <tr><th>Node</th><th>Tempo</th><th>Pico tracemalloc</th><th>No fim</th><th>RSS</th></tr>
+            {nodes}
+        </table>
+        <h2>CPU (amostras)</h2>
+        <table cellpadding="6">
+            <tr><th>Total</th><th>Próprio</th><th>Função</th></tr>
+            {functions}
+        </table>
+        <h2>Maiores alocações (no fim de {escape(profile.get('allocations_node') or 'perfil')})</h2>
+        <table cellpadding="6">
+            <tr><th>Tamanho</th><th>Blocos</th><th>Traceback</th></tr>
+            {allocations}
+        </table>
+        <p><a href="{url_for('debug_profiles')}" style="color: #60a5fa;">← Perfis</a></p>
+    </body>
+    </html>
+    """
+
+
+@app.route('/debug/profiles/<name>/stacks.folded')
+@admin_required
+def debug_profile_stacks(name):
+    """Stacks no formato collapsed (flamegraph.pl, speedscope.app)"""
+    from flask import send_from_directory
+    from src.profiling import PROFILES_FOLDER
+
+    return send_from_directory(os.path.join(PROFILES_FOLDER, os.path.basename(name)), 'stacks.folded',
+                               mimetype='text/plain', as_attachment=True,
+                               download_name=f"{os.path.basename(name)}.folded")
 
 
 @app.route('/debug/config')
@@ -433,6 +1085,18 @@ GROQ_API_KEY=gsk_xxxxxx
     """
 
 
+# Compila os templates no arranque de cada worker (lidos do bytecode cache se já existir)
+precompile_templates(app.jinja_env)
+
+# Pré-carrega o workflow em segundo plano (desativado no modo de profiling de arranque)
+if config['app'].get('warmup_workflow', True) and not os.getenv('STARTUP_PROFILE'):
+    start_workflow_warmup()
+
+# Limpeza dos órfãos e quota em segundo plano (storage_gc_interval_min 0 desativa)
+if storage_manager.GC_INTERVAL_SECONDS and not os.getenv('STARTUP_PROFILE'):
+    storage_manager.start_maintenance_thread(STATIC_EXPORT_FOLDER)
+
+
 if __name__ == '__main__':
     # Cria diretórios se não existirem
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
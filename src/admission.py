@@ -0,0 +1,184 @@
+"""
+Controlo de admissão do trabalho que usa o LLM
+
+Limita, entre todos os workers da instância, as análises com o LLM a correr
+ao mesmo tempo (max_concurrent) e os uploads à espera de vez (max_queue).
+Cada lugar é um ficheiro em data/admission/ com um lock fcntl.flock: o
+sistema operativo liberta-o se o processo morrer, por isso não há contadores
+a corrigir depois de um crash.
+
+- try_enter_queue(): reserva um lugar na fila sem esperar; None se a fila
+  estiver cheia (o pedido é rejeitado logo com 503 + Retry-After)
+- Ticket: context manager (também 'async with') usado à volta da chamada ao
+  LLM; espera por um lugar de execução (até wait_timeout) e liberta o lugar na fila
+- counts(): análises em curso e em fila, para monitorização
+"""
+import os
+import math
+import asyncio
+import time
+import threading
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (desenvolvimento local): sem limite entre processos
+    fcntl = None
+
+
+ADMISSION_FOLDER = os.path.join('data', 'admission')
+
+
+class AdmissionTimeout(RuntimeError):
+    """Não houve lugar livre para o LLM dentro do tempo de espera"""
+
+
+class _SlotPool:
+    """Conjunto de lugares (ficheiros com flock) partilhado entre processos"""
+
+    def __init__(self, folder: str, prefix: str, size: int):
+        os.makedirs(folder, exist_ok=True)
+        self.paths = [os.path.join(folder, f"{prefix}-{i}.lock") for i in range(size)]
+
+    def try_acquire(self):
+        """Ocupa um lugar livre sem esperar; devolve o ficheiro aberto ou None"""
+        for path in self.paths:
+            handle = open(path, 'a')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except BlockingIOError:
+                handle.close()
+        return None
+
+    @staticmethod
+    def release(handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    def busy(self) -> int:
+        """Lugares ocupados neste momento (por qualquer processo)"""
+        busy = 0
+        for path in self.paths:
+            with open(path, 'a') as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                except BlockingIOError:
+                    busy += 1
+        return busy
+
+
+class Ticket:
+    """Lugar na fila de um upload; dá acesso ao LLM quando usado com 'with'"""
+
+    def __init__(self, controller: 'AdmissionController', queue_handle):
+        self.controller = controller
+        self._queue_handle = queue_handle
+        self._run_handle = None
+        self._lock = threading.Lock()
+        # Passa a True quando o workflow fica responsável por libertar o ticket
+        self.handed_off = False
+        # Prazo do upload (src/deadline.py): limita também a espera na fila
+        self.deadline = None
+
+    def _wait_times(self):
+        """Intervalos de espera entre tentativas; AdmissionTimeout quando o tempo acaba"""
+        wait_timeout = self.controller.wait_timeout
+        if self.deadline is not None:
+            wait_timeout = self.deadline.timeout(wait_timeout)
+        deadline = time.monotonic() + wait_timeout
+        delay = 0.05
+        while True:
+            if time.monotonic() > deadline or (self.deadline is not None and self.deadline.cancelled):
+                raise AdmissionTimeout(f"Sem lugar livre para o LLM após {wait_timeout:.0f}s em fila")
+            yield delay
+            delay = min(delay * 2, 1.0)
+
+    def _entered(self, handle):
+        with self._lock:
+            self._run_handle = handle
+            self._release_queue()
+        return self
+
+    def __enter__(self):
+        if self.controller.disabled:
+            return self
+        waits = self._wait_times()
+        while True:
+            handle = self.controller.run_slots.try_acquire()
+            if handle is not None:
+                return self._entered(handle)
+            time.sleep(next(waits))
+
+    def __exit__(self, *exc):
+        with self._lock:
+            if self._run_handle is not None:
+                _SlotPool.release(self._run_handle)
+                self._run_handle = None
+        return False
+
+    async def __aenter__(self):
+        """Como __enter__, mas a espera na fila não bloqueia o event loop (modo assíncrono)"""
+        if self.controller.disabled:
+            return self
+        waits = self._wait_times()
+        while True:
+            handle = self.controller.run_slots.try_acquire()
+            if handle is not None:
+                return self._entered(handle)
+            await asyncio.sleep(next(waits))
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+    def _release_queue(self):
+        if self._queue_handle is not None:
+            _SlotPool.release(self._queue_handle)
+            self._queue_handle = None
+
+    def release(self):
+        """Liberta o lugar na fila (idempotente; o lugar de execução sai no __exit__)"""
+        with self._lock:
+            self._release_queue()
+
+
+class AdmissionController:
+    """Limite global de análises com o LLM e fila de espera limitada"""
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 8, wait_timeout: float = 300,
+                 avg_seconds: float = 30, folder: str = ADMISSION_FOLDER):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self.avg_seconds = avg_seconds
+        self.disabled = fcntl is None
+        if not self.disabled:
+            self.run_slots = _SlotPool(folder, 'run', max_concurrent)
+            # A fila inclui os uploads admitidos que ainda não chegaram ao LLM
+            # (também os que estão na extração do PDF)
+            self.queue_slots = _SlotPool(folder, 'queue', max_queue)
+
+    def try_enter_queue(self) -> Optional[Ticket]:
+        """Reserva um lugar para um upload; None se a fila estiver cheia"""
+        if self.disabled:
+            return Ticket(self, None)
+        handle = self.queue_slots.try_acquire()
+        return Ticket(self, handle) if handle is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        if self.disabled:
+            return {'in_flight': 0, 'queued': 0, 'max_concurrent': self.max_concurrent,
+                    'max_queue': self.max_queue}
+        return {
+            'in_flight': self.run_slots.busy(),
+            'queued': self.queue_slots.busy(),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+        }
+
+    def retry_after(self) -> int:
+        """Segundos sugeridos no Retry-After: tempo para a fila atual escoar"""
+        queued = self.counts()['queued']
+        return max(1, math.ceil(self.avg_seconds * max(queued, 1) / self.max_concurrent))
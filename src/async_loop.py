@@ -0,0 +1,58 @@
+"""
+Event loop partilhado para o modo assíncrono do processamento (app.async_llm)
+
+No modo normal cada upload em análise ocupa uma thread do worker que passa
+quase todo o tempo à espera da resposta do Groq/Ollama. No modo assíncrono o
+workflow corre como corrotina neste loop (uma única thread por processo): a
+chamada ao LLM é feita com os clientes HTTP assíncronos (httpx) do Groq e do
+Ollama e a espera não ocupa nenhuma thread. Os passos síncronos (extração do
+PDF, metadados) correm no executor do loop.
+
+O loop é criado na primeira utilização, já dentro do worker do gunicorn
+(nunca no processo master antes do fork).
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Coroutine, Optional
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_running = 0
+_running_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Devolve o loop partilhado, arrancando a thread na primeira chamada"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-loop', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """Agenda uma corrotina no loop partilhado (pode ser chamado de qualquer thread)"""
+    global _running
+    with _running_lock:
+        _running += 1
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    future.add_done_callback(_task_done)
+    return future
+
+
+def _task_done(future: Future):
+    global _running
+    with _running_lock:
+        _running -= 1
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[WARNING] Erro numa tarefa do loop assíncrono: {future.exception()}")
+
+
+def running_tasks() -> int:
+    """Corrotinas submetidas que ainda não terminaram (para monitorização)"""
+    return _running
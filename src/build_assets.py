@@ -0,0 +1,155 @@
+"""
+Build dos assets dos websites gerados
+
+Minifica o CSS/JS partilhado dos templates (static/site/) e grava-o em
+static/dist/ com o hash do conteúdo no nome, para poder ser servido com
+cache imutável. O manifesto static/dist/manifest.json liga o caminho de
+origem ao ficheiro gerado (usado pelo helper asset_url dos templates).
+Opcionalmente descarrega as fontes do Google Fonts para static/fonts/.
+
+Uso:
+    python -m src.build_assets
+    python -m src.build_assets --fetch-fonts
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+from typing import Dict
+
+
+STATIC_FOLDER = 'static'
+SOURCE_FOLDER = os.path.join(STATIC_FOLDER, 'site')
+DIST_FOLDER = os.path.join(STATIC_FOLDER, 'dist')
+FONTS_FOLDER = os.path.join(STATIC_FOLDER, 'fonts')
+MANIFEST_FILE = os.path.join(DIST_FOLDER, 'manifest.json')
+
+GOOGLE_FONTS_URL = ('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700'
+                    '&family=Playfair+Display:wght@700&display=swap')
+# O Google Fonts só devolve woff2 a browsers que o suportam
+FONTS_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+
+def minify_css(css: str) -> str:
+    """Remove comentários e espaços desnecessários do CSS"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'([;{])\s*([\w-]+)\s*:\s*', r'\1\2:', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(js: str) -> str:
+    """
+    Minificação conservadora: remove comentários de linha inteira, indentação
+    e linhas vazias (mantém as quebras de linha por causa do ASI)
+    """
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(source_folder: str = SOURCE_FOLDER, dist_folder: str = DIST_FOLDER) -> Dict[str, str]:
+    """
+    Gera os ficheiros minificados com hash e o manifesto
+
+    Returns:
+        Manifesto {caminho relativo a static/: caminho relativo a static/dist/}
+    """
+    os.makedirs(dist_folder, exist_ok=True)
+    manifest = {}
+
+    for name in sorted(os.listdir(source_folder)):
+        stem, ext = os.path.splitext(name)
+        if ext not in MINIFIERS:
+            continue
+        with open(os.path.join(source_folder, name), 'r', encoding='utf-8') as f:
+            minified = MINIFIERS[ext](f.read())
+
+        digest = hashlib.sha256(minified.encode('utf-8')).hexdigest()[:10]
+        built_name = f"{stem}.{digest}.min{ext}"
+        with open(os.path.join(dist_folder, built_name), 'w', encoding='utf-8') as f:
+            f.write(minified)
+
+        source_key = os.path.relpath(os.path.join(source_folder, name), STATIC_FOLDER).replace(os.sep, '/')
+        manifest[source_key] = built_name
+        print(f"✓ {source_key} → dist/{built_name} ({len(minified)} bytes)")
+
+    # Remove builds antigos que já não estão no manifesto
+    current = set(manifest.values()) | {os.path.basename(MANIFEST_FILE)}
+    for name in os.listdir(dist_folder):
+        if name not in current:
+            os.remove(os.path.join(dist_folder, name))
+
+    with open(os.path.join(dist_folder, os.path.basename(MANIFEST_FILE)), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_asset_manifest(manifest_file: str = MANIFEST_FILE) -> Dict[str, str]:
+    """Carrega o manifesto (vazio se o build ainda não foi feito)"""
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fetch_fonts(fonts_folder: str = FONTS_FOLDER) -> int:
+    """
+    Descarrega os .woff2 (subset latin) usados em static/site/fonts.css
+
+    Returns:
+        Número de ficheiros descarregados
+    """
+    import requests
+
+    css = requests.get(GOOGLE_FONTS_URL, headers={'User-Agent': FONTS_USER_AGENT}, timeout=30).text
+    os.makedirs(fonts_folder, exist_ok=True)
+    count = 0
+
+    for block in re.finditer(r'/\*\s*latin\s*\*/\s*@font-face\s*\{(.*?)\}', css, re.S):
+        body = block.group(1)
+        family = re.search(r"font-family:\s*'([^']+)'", body).group(1)
+        weight = re.search(r'font-weight:\s*(\d+)', body).group(1)
+        url = re.search(r'url\((https://[^)]+\.woff2)\)', body).group(1)
+
+        slug = family.lower().replace(' ', '-')
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(fonts_folder, f"{slug}-{weight}.woff2"), 'wb') as f:
+            f.write(response.content)
+        count += 1
+        print(f"✓ fonts/{slug}-{weight}.woff2")
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build dos assets (CSS/JS) dos websites gerados")
+    parser.add_argument('--fetch-fonts', action='store_true',
+                        help='Descarrega as fontes do Google Fonts para static/fonts/')
+    args = parser.parse_args()
+
+    if args.fetch_fonts:
+        try:
+            fetch_fonts()
+        except Exception as e:
+            # Sem as fontes, os browsers usam as fontes de recurso do font-family
+            print(f"⚠️  Não foi possível descarregar as fontes: {e}")
+
+    manifest = build()
+    print(f"\n✅ {len(manifest)} asset(s) gerado(s) em {DIST_FOLDER}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Análise em partes (map-reduce) de currículos longos
+
+Um CV académico com dezenas de páginas de publicações não cabe no contexto
+do llama3 no Ollama (8k tokens) e torna as chamadas ao Groq lentas e caras.
+Acima de THRESHOLD_TOKENS o texto é dividido em partes de até CHUNK_TOKENS,
+pelas secções do currículo (src/section_segmenter.py) e, numa secção grande
+demais, pelas linhas. Cada parte é analisada em paralelo (map) e os dados
+parciais são juntos num só resultado (reduce), sem experiências, formações,
+competências ou projetos repetidos. Os resumos são pedidos no fim, numa
+chamada curta sobre os dados juntos (ver src/workflow_langgraph.py).
+
+    python -m src.chunked_analysis cv.pdf      # mostra as partes
+"""
+import re
+import sys
+from typing import Dict, List, Optional
+
+from src.section_segmenter import fold, segment_sections
+
+
+# Acima deste tamanho estimado (tokens) o texto é analisado em partes
+THRESHOLD_TOKENS = 6000
+# Tamanho máximo (tokens) de cada parte
+CHUNK_TOKENS = 3000
+# Partes analisadas em simultâneo no mesmo upload
+CONCURRENCY = 3
+
+# Estimativa grosseira para texto europeu (o tokenizer do llama3 dá ~4 caracteres por token)
+CHARS_PER_TOKEN = 4
+
+# Campos com resumos: precisam do currículo inteiro e são gerados no reduce
+SUMMARY_FIELDS = ['about_summary', 'experience_summary', 'education_summary', 'skills_summary']
+
+
+def configure(threshold_tokens: Optional[int] = None, chunk_tokens: Optional[int] = None,
+              concurrency: Optional[int] = None):
+    """Altera os limites da análise em partes (chamado pela aplicação)"""
+    global THRESHOLD_TOKENS, CHUNK_TOKENS, CONCURRENCY
+    if threshold_tokens is not None:
+        THRESHOLD_TOKENS = threshold_tokens
+    if chunk_tokens is not None:
+        CHUNK_TOKENS = chunk_tokens
+    if concurrency is not None:
+        CONCURRENCY = concurrency
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def needs_chunking(text: str) -> bool:
+    """O texto passa do limite a partir do qual é analisado em partes (0 desativa)"""
+    return THRESHOLD_TOKENS > 0 and estimate_tokens(text) > THRESHOLD_TOKENS
+
+
+def _split_lines(text: str, max_chars: int, heading: str, first_chars: int) -> List[str]:
+    """
+    Divide uma secção grande demais pelas linhas; as partes seguintes repetem o título
+
+    A primeira parte tem até first_chars (o espaço que resta na parte em curso).
+    """
+    pieces, current, limit = [], '', first_chars
+    for line in text.split('\n'):
+        if len(current) + len(line) + 1 > limit and (current or limit < max_chars):
+            pieces.append(current)
+            current = f"{heading} (continuação)\n" if heading and current else ''
+            limit = max_chars
+        # Uma linha sozinha maior do que a parte (raro) é cortada à força
+        while len(current) + len(line) + 1 > max_chars:
+            cut = max(max_chars - len(current) - 1, 1)
+            pieces.append(current + line[:cut])
+            line, current = line[cut:], ''
+        current += line + '\n'
+    if current.strip():
+        pieces.append(current)
+    return [piece.strip('\n') for piece in pieces]
+
+
+def split_chunks(text: str, chunk_tokens: Optional[int] = None) -> List[str]:
+    """
+    Divide o texto em partes de até chunk_tokens, sem partir secções que caibam numa parte
+
+    O cabeçalho (nome, contactos - o texto antes da primeira secção) fica
+    no início da primeira parte.
+    """
+    max_chars = (chunk_tokens or CHUNK_TOKENS) * CHARS_PER_TOKEN
+    boundaries = [0] + [span.header_start for span in segment_sections(text)] + [len(text)]
+
+    chunks, current = [], ''
+    for start, end in zip(boundaries, boundaries[1:]):
+        unit = text[start:end].strip('\n')
+        if not unit.strip():
+            continue
+        if len(current) + len(unit) + 2 <= max_chars:
+            current = f"{current}\n\n{unit}" if current else unit
+            continue
+        if len(unit) <= max_chars:
+            chunks.append(current)
+            current = unit
+            continue
+        # Secção maior do que uma parte: começa no espaço que resta da parte em curso
+        heading = unit.split('\n', 1)[0].strip() if start > 0 else ''
+        pieces = _split_lines(unit, max_chars, heading, max_chars - len(current) - 2 if current else max_chars)
+        if current:
+            pieces[0] = f"{current}\n\n{pieces[0]}" if pieces[0] else current
+        chunks.extend(pieces[:-1])
+        current = pieces[-1]
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+# === REDUCE ===
+def _norm(value) -> str:
+    """Chave de comparação: sem acentos, maiúsculas nem pontuação"""
+    return ' '.join(re.findall(r'\w+', fold(str(value or '')).lower()))
+
+
+def _dedup_items(items: List[Dict], key_fields: List[str]) -> List[Dict]:
+    """
+    Junta os itens com a mesma chave (p.ex. empresa + cargo)
+
+    O item repetido completa os campos vazios do primeiro e a descrição mais
+    longa prevalece. Itens sem nenhum campo de chave preenchido são mantidos.
+    """
+    merged, index = [], {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        key = tuple(_norm(item.get(field)) for field in key_fields)
+        if not any(key):
+            merged.append(dict(item))
+            continue
+        if key not in index:
+            index[key] = dict(item)
+            merged.append(index[key])
+            continue
+        existing = index[key]
+        for field, value in item.items():
+            if not value:
+                continue
+            if not existing.get(field) or (field == 'description' and len(str(value)) > len(str(existing[field]))):
+                existing[field] = value
+    return merged
+
+
+def _dedup_values(values: List) -> List:
+    seen, result = set(), []
+    for value in values:
+        key = _norm(value)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+
+# Campos de lista e a chave que identifica um item repetido
+ITEM_KEYS = {
+    'experience_items': ['company', 'position'],
+    'education_items': ['institution', 'degree'],
+    'languages': ['language'],
+    'projects': ['name'],
+}
+
+
+def merge_partials(partials: List[Dict]) -> Dict:
+    """
+    Junta os dados parciais das partes num só resultado (pela ordem das partes)
+
+    Campos simples: o primeiro valor preenchido. Listas: concatenadas sem
+    repetidos (ITEM_KEYS para os itens estruturados; texto normalizado para
+    competências e certificações).
+    """
+    merged = {}
+    for partial in partials:
+        for field, value in partial.items():
+            if isinstance(value, list):
+                if not isinstance(merged.get(field), list):
+                    merged[field] = []
+                merged[field].extend(value)
+            elif value and not merged.get(field):
+                merged[field] = value
+            else:
+                merged.setdefault(field, value)
+
+    for field, value in merged.items():
+        if not isinstance(value, list):
+            continue
+        if field in ITEM_KEYS:
+            merged[field] = _dedup_items(value, ITEM_KEYS[field])
+        else:
+            merged[field] = _dedup_values(value)
+    return merged
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Uso: python -m src.chunked_analysis <ficheiro .pdf ou .txt>")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    if path.lower().endswith('.pdf'):
+        from src.pdf_extractor import extract_text_from_pdf
+        text = extract_text_from_pdf(path).get('text', '')
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    mode = 'em partes' if needs_chunking(text) else 'numa só chamada'
+    print(f"📄 ~{estimate_tokens(text)} tokens (limite {THRESHOLD_TOKENS}): análise {mode}")
+    for i, chunk in enumerate(split_chunks(text), 1):
+        first_line = chunk.split('\n', 1)[0].strip()
+        print(f"   parte {i}: ~{estimate_tokens(chunk)} tokens, começa em {first_line[:60]!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Prazo e cancelamento do processamento de um currículo
+
+Cada upload recebe um Deadline que viaja no estado do workflow. Os nodes
+verificam o orçamento restante antes de começar, o timeout dos pedidos ao LLM
+é derivado dele e a geração em streaming é interrompida entre chunks quando o
+prazo expira ou o processamento é cancelado (currículo eliminado ou
+substituído por uma nova versão), para não gastar o LLM em respostas que já
+ninguém vai usar.
+"""
+import time
+import threading
+from typing import Optional
+
+
+class DeadlineExceeded(RuntimeError):
+    """O prazo expirou ou o processamento foi cancelado"""
+
+
+class Deadline:
+    """Prazo absoluto (relógio monotónico) com cancelamento explícito"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+        self.reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        """Segundos que faltam (0 se expirou ou foi cancelado)"""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str):
+        """Cancela o processamento (os nodes e o streaming do LLM param no próximo ponto de verificação)"""
+        self.reason = reason
+        self._cancelled.set()
+
+    def check(self, stage: str, min_seconds: float = 0.0):
+        """
+        Lança DeadlineExceeded se foi cancelado ou se restam menos de min_seconds
+
+        Args:
+            stage: Nome da etapa (para a mensagem de erro)
+            min_seconds: Orçamento mínimo para valer a pena começar a etapa
+        """
+        if self._cancelled.is_set():
+            raise DeadlineExceeded(f"Processamento cancelado em {stage}: {self.reason}")
+        remaining = self.remaining()
+        if remaining <= min_seconds:
+            raise DeadlineExceeded(
+                f"Prazo de {self.seconds:.0f}s esgotado em {stage} (restavam {remaining:.1f}s)"
+            )
+
+    def timeout(self, default: float) -> float:
+        """Timeout para um pedido: o menor entre o default e o tempo restante"""
+        return min(default, self.remaining())
@@ -0,0 +1,128 @@
+"""
+Cache em disco dos resultados de extract_text_from_pdf
+
+A extração só depende dos bytes do PDF, por isso o resultado é guardado
+(JSON comprimido com gzip) com a chave hash do conteúdo + versão do extrator
++ motor de extração (src/pdf_engines.py: os motores não dão o mesmo texto).
+Retries, experiências com prompts e reprocessamentos não voltam a abrir o PDF.
+O tamanho total é limitado; quando passa o limite saem primeiro as entradas
+usadas há mais tempo (LRU pela data de modificação, atualizada em cada hit).
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from src import pdf_engines
+from src.pdf_extractor import EXTRACTOR_VERSION
+
+
+CACHE_FOLDER = os.path.join('data', 'extraction_cache')
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+CACHE_SUFFIX = '.json.gz'
+
+_evict_lock = threading.Lock()
+
+
+def configure(folder: Optional[str] = None, max_bytes: Optional[int] = None):
+    """Altera a pasta e o tamanho máximo da cache (chamado pela aplicação)"""
+    global CACHE_FOLDER, MAX_CACHE_BYTES
+    if folder:
+        CACHE_FOLDER = folder
+    if max_bytes is not None:
+        MAX_CACHE_BYTES = max_bytes
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash SHA-256 de um ficheiro lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(content_hash: str) -> str:
+    # Mudar app.pdf_engine volta a extrair os PDFs já em cache
+    return os.path.join(CACHE_FOLDER, f"{content_hash}-v{EXTRACTOR_VERSION}-{pdf_engines.ENGINE}{CACHE_SUFFIX}")
+
+
+def get_cached_extraction(content_hash: str) -> Optional[Dict]:
+    """
+    Devolve o resultado da extração guardado para este conteúdo
+
+    Returns:
+        Dict igual ao de extract_text_from_pdf, ou None se não estiver em cache
+    """
+    path = _cache_path(content_hash)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        # Entrada corrompida (p.ex. escrita interrompida) - descarta
+        _remove(path)
+        return None
+
+    # Marca como usada recentemente para a política LRU
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def put_cached_extraction(content_hash: str, result: Dict):
+    """Guarda o resultado de uma extração bem-sucedida e aplica o limite de tamanho"""
+    if not result.get('success'):
+        return
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    path = _cache_path(content_hash)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(result, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+    evict_to_limit()
+
+
+def evict_to_limit(max_bytes: Optional[int] = None) -> int:
+    """
+    Remove as entradas menos usadas até a cache caber no limite
+
+    Returns:
+        Número de entradas removidas
+    """
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        total = 0
+        try:
+            with os.scandir(CACHE_FOLDER) as it:
+                for entry in it:
+                    if entry.name.endswith(CACHE_SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,311 @@
+"""
+Extração dos PDFs em processos auxiliares com limites de recursos
+
+O pdfplumber corria no próprio processo do worker web: um PDF patológico
+(objetos profundamente aninhados, content streams enormes) podia pendurar o
+worker ou esgotar a memória de todos os pedidos. A extração passa a correr
+num conjunto de processos auxiliares de longa duração, criados de antemão
+(forkserver com o pdfplumber já importado) e reutilizados entre uploads:
+
+- limite de tempo de CPU por trabalho (RLIMIT_CPU: o processo recebe SIGXCPU)
+- limite de espaço de endereçamento (RLIMIT_AS: as alocações falham com MemoryError)
+- timeout de relógio: o processo é morto e substituído
+- reciclagem ao fim de MAX_JOBS trabalhos (ou depois de uma falha), para a
+  fragmentação da memória não crescer sem limite
+
+As imagens de pré-visualização das páginas (src/pdf_preview.py) também são
+renderizadas nestes processos, com os mesmos limites.
+
+Com WORKERS = 0 (ou sem o módulo resource, p.ex. no Windows) a extração
+corre no próprio processo, como antes.
+"""
+import os
+import time
+import signal
+import queue
+import argparse
+import threading
+import multiprocessing
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from src import pdf_engines, pdf_preview
+from src.pdf_extractor import extract_text_from_pdf, extraction_failure
+
+
+WORKERS = 0
+CPU_SECONDS = 20
+MEMORY_MB = 1024
+TIMEOUT_SECONDS = 30
+MAX_JOBS = 50
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class WorkerDied(RuntimeError):
+    """O processo auxiliar terminou a meio do trabalho (limite de CPU, memória, crash)"""
+
+
+def configure(workers: Optional[int] = None, cpu_seconds: Optional[float] = None,
+              memory_mb: Optional[int] = None, timeout_seconds: Optional[float] = None,
+              max_jobs: Optional[int] = None):
+    """Altera o tamanho e os limites do pool (antes de ser criado; chamado pela aplicação)"""
+    global WORKERS, CPU_SECONDS, MEMORY_MB, TIMEOUT_SECONDS, MAX_JOBS
+    if workers is not None:
+        WORKERS = workers
+    if cpu_seconds is not None:
+        CPU_SECONDS = cpu_seconds
+    if memory_mb is not None:
+        MEMORY_MB = memory_mb
+    if timeout_seconds is not None:
+        TIMEOUT_SECONDS = timeout_seconds
+    if max_jobs is not None:
+        MAX_JOBS = max_jobs
+
+
+def _job_failure(kind: str, error: str) -> Dict:
+    """Resultado falhado de um trabalho ('extract' ou 'previews')"""
+    if kind == 'previews':
+        return {'success': False, 'error': error, 'images': []}
+    return extraction_failure(error)
+
+
+def _run_job(kind: str, pdf_path: str, options: Dict) -> Dict:
+    """Executa um trabalho no processo atual"""
+    if kind == 'previews':
+        try:
+            return {'success': True, 'images': pdf_preview.render_previews(pdf_path, **options)}
+        except MemoryError:
+            raise
+        except Exception as e:
+            return _job_failure(kind, str(e))
+    return extract_text_from_pdf(pdf_path, **options)
+
+
+def _worker_main(conn, memory_bytes: int):
+    """Ciclo do processo auxiliar: recebe (tipo, pdf, opções, CPU) e devolve o resultado"""
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, resource.RLIM_INFINITY))
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        kind, pdf_path, options, cpu_seconds = request
+
+        # O RLIMIT_CPU conta o CPU de toda a vida do processo: o limite é o já
+        # usado mais o orçamento deste trabalho
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        limit = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, resource.RLIM_INFINITY))
+        try:
+            result = _run_job(kind, pdf_path, options)
+        except MemoryError:
+            result = _job_failure(kind, f"PDF excede o limite de memória da extração ({memory_bytes // 2**20} MB)")
+            result['recycle'] = True
+        conn.send(result)
+
+
+class _Worker:
+    """Um processo auxiliar e a ponta do pipe do lado do worker web"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, MEMORY_MB * 1024 * 1024),
+            name='pdf-extraction', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def run(self, kind: str, pdf_path: str, options: Dict, timeout: float) -> Dict:
+        self.jobs += 1
+        # Um processo morto (OOM killer, SIGKILL) fecha o pipe: BrokenPipeError
+        # no envio, EOFError ou ConnectionResetError na receção
+        try:
+            self.conn.send((kind, pdf_path, options, CPU_SECONDS))
+            if self.conn.poll(timeout):
+                return self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(timeout=1)
+            if self.process.exitcode == -signal.SIGXCPU:
+                raise WorkerDied(f"PDF excede o limite de CPU da extração ({CPU_SECONDS}s)")
+            if self.process.exitcode is None:
+                raise WorkerDied(f"Pipe do processo de extração falhou: {e!r}")
+            raise WorkerDied(f"Processo de extração terminou (código {self.process.exitcode})")
+        # Fora do try: TimeoutError é um OSError
+        raise TimeoutError(f"Extração do PDF excedeu {timeout:.0f}s")
+
+    def stop(self):
+        """Termina o processo (pedido normal; à força se não sair)"""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """Processos auxiliares de extração, criados de antemão e reutilizados"""
+
+    def __init__(self, size: int):
+        context = multiprocessing.get_context('forkserver')
+        # O forkserver importa o extrator uma vez; cada processo novo já o tem
+        context.set_forkserver_preload(['src.pdf_extractor'])
+        self.context = context
+        self.size = size
+        # Processos livres; None é um lugar cujo processo ainda não foi criado
+        self._idle = queue.Queue()
+        self.stats = {'jobs': 0, 'timeouts': 0, 'died': 0, 'recycled': 0, 'spawn_errors': 0}
+        for _ in range(size):
+            self._idle.put(_Worker(context))
+
+    def _spawn(self) -> Optional[_Worker]:
+        """Cria um processo novo (None se falhar: fica para o próximo trabalho)"""
+        try:
+            return _Worker(self.context)
+        except Exception as e:
+            self.stats['spawn_errors'] += 1
+            print(f"[WARNING] Não foi possível criar um processo de extração: {e}")
+            return None
+
+    def extract(self, pdf_path: str, previous_pages: Optional[Dict] = None,
+                timeout: Optional[float] = None) -> Dict:
+        """Extrai o PDF num processo auxiliar (mesmo resultado de extract_text_from_pdf)"""
+        # O motor configurado na aplicação não chega aos processos do forkserver
+        options = {'previous_pages': previous_pages, 'engine': pdf_engines.ENGINE}
+        return self.run('extract', pdf_path, options, timeout)
+
+    def render_previews(self, pdf_path: str, timeout: Optional[float] = None) -> Dict:
+        """Renderiza as imagens das páginas num processo auxiliar ('images': [(nome, bytes WebP)])"""
+        return self.run('previews', pdf_path, {}, timeout)
+
+    def run(self, kind: str, pdf_path: str, options: Dict, timeout: Optional[float] = None) -> Dict:
+        """Executa um trabalho ('extract' ou 'previews') no primeiro processo livre"""
+        timeout = TIMEOUT_SECONDS if timeout is None else timeout
+        # O timeout é de todo o trabalho: a espera por um processo livre conta
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return _job_failure(kind, "Sem processo de extração livre")
+        if worker is not None and not worker.process.is_alive():
+            # Morreu enquanto estava livre: substituído antes de receber o trabalho
+            self.stats['died'] += 1
+            print(f"[WARNING] Processo de extração livre terminou (código {worker.process.exitcode}); substituído")
+            worker.stop()
+            worker = None
+        if worker is None:
+            worker = self._spawn()
+        remaining = deadline - time.monotonic()
+        if worker is None or remaining <= 0:
+            self._idle.put(worker)
+            return _job_failure(kind, "Sem processo de extração livre")
+
+        replace = False
+        try:
+            result = worker.run(kind, pdf_path, options, remaining)
+            # Depois de uma falha (p.ex. memória esgotada dentro do pdfminer) o
+            # estado do processo não é de confiança
+            replace = result.pop('recycle', False) or not result['success'] or worker.jobs >= MAX_JOBS
+        except TimeoutError as e:
+            self.stats['timeouts'] += 1
+            result, replace = _job_failure(kind, str(e)), True
+        except WorkerDied as e:
+            self.stats['died'] += 1
+            result, replace = _job_failure(kind, str(e)), True
+        finally:
+            self.stats['jobs'] += 1
+            if replace:
+                self.stats['recycled'] += 1
+                worker.stop()
+                worker = self._spawn()
+            # Sempre devolvido (mesmo None): o pool não perde lugares e close() não bloqueia
+            self._idle.put(worker)
+
+        if not result['success']:
+            action = 'Pré-visualização' if kind == 'previews' else 'Extração'
+            print(f"[WARNING] {action} de {os.path.basename(pdf_path)} falhou: {result['error']}")
+        return result
+
+    def close(self):
+        for _ in range(self.size):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.stop()
+
+
+def get_pool() -> Optional[ExtractionPool]:
+    """Pool em uso, criado na primeira chamada (None se desativado)"""
+    global _pool
+    if _pool is None and WORKERS > 0 and resource is not None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool(WORKERS)
+                print(f"[DEBUG] Pool de extração: {WORKERS} processo(s), {CPU_SECONDS}s CPU, "
+                      f"{MEMORY_MB} MB, timeout {TIMEOUT_SECONDS}s, reciclados a cada {MAX_JOBS}")
+    return _pool
+
+
+def extract(pdf_path: str, previous_pages: Optional[Dict] = None, timeout: Optional[float] = None) -> Dict:
+    """Extrai o PDF no pool ou, se estiver desativado, no próprio processo"""
+    pool = get_pool()
+    if pool is None:
+        return extract_text_from_pdf(pdf_path, previous_pages=previous_pages)
+    return pool.extract(os.path.abspath(pdf_path), previous_pages, timeout)
+
+
+def render_previews(pdf_path: str, timeout: Optional[float] = None) -> Dict:
+    """
+    Imagens das páginas renderizadas no pool ou, se estiver desativado, no próprio processo
+
+    Returns:
+        Dict com 'success', 'images' ([(nome, bytes WebP)]) e 'error' em caso de falha
+    """
+    pool = get_pool()
+    if pool is None:
+        try:
+            return _run_job('previews', pdf_path, {})
+        except MemoryError:
+            return _job_failure('previews', "Memória esgotada ao renderizar o PDF")
+    return pool.render_previews(os.path.abspath(pdf_path), timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrai PDFs no pool de processos com limites (p.ex. PDFs suspeitos)")
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--cpu', type=float, default=CPU_SECONDS, help='Segundos de CPU por PDF')
+    parser.add_argument('--memory-mb', type=int, default=MEMORY_MB)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    configure(workers=args.workers, cpu_seconds=args.cpu, memory_mb=args.memory_mb,
+              timeout_seconds=args.timeout)
+    pool = get_pool()
+    if pool is None:
+        parser.error('o pool precisa do módulo resource (Linux/macOS)')
+    for pdf_path in args.pdfs:
+        started = time.perf_counter()
+        result = extract(pdf_path)
+        status = f"✅ {result['num_pages']} página(s), {len(result['text'])} caracteres" if result['success'] \
+            else f"❌ {result['error']}"
+        print(f"{os.path.basename(pdf_path)}: {status} ({time.perf_counter() - started:.2f}s)")
+    print(pool.stats)
+    pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Cache das respostas do LLM (SQLite em data/llm_cache.sqlite)
+
+Além dos PDFs repetidos (cache de extrações), o mesmo texto volta muitas vezes
+ao LLM: um PDF reexportado com outros bytes, um retry depois de um erro, uma
+nova submissão só para mudar as cores. A resposta é guardada com a chave:
+
+    sha256(prompt normalizado + versão do prompt + modelo + temperatura)
+
+O prompt é normalizado (espaços e quebras de linha colapsados) para que
+diferenças de formatação da extração não contem como texto novo. Só são
+guardadas respostas que deram JSON válido.
+
+- TTL: entradas mais antigas do que MAX_AGE_SECONDS são ignoradas e removidas
+- Tamanho: acima de MAX_CACHE_BYTES saem primeiro as menos usadas recentemente
+- Contadores de hits/misses partilhados por todos os processos (stats())
+
+O SQLite (modo WAL) aguenta vários workers e os scripts em src/ em simultâneo.
+"""
+import os
+import re
+import json
+import time
+import argparse
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+
+CACHE_PATH = os.path.join('data', 'llm_cache.sqlite')
+MAX_AGE_SECONDS = 7 * 24 * 3600
+MAX_CACHE_BYTES = 20 * 1024 * 1024
+# Grava as respostas novas mas não usa as guardadas (reprocessamento com --force)
+SKIP_READS = False
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def configure(path: Optional[str] = None, max_age_seconds: Optional[float] = None,
+              max_bytes: Optional[int] = None, skip_reads: Optional[bool] = None):
+    """Altera o ficheiro, o TTL e o tamanho máximo da cache (chamado pela aplicação)"""
+    global CACHE_PATH, MAX_AGE_SECONDS, MAX_CACHE_BYTES, SKIP_READS
+    if path:
+        CACHE_PATH = path
+    if max_age_seconds is not None:
+        MAX_AGE_SECONDS = max_age_seconds
+    if max_bytes is not None:
+        MAX_CACHE_BYTES = max_bytes
+    if skip_reads is not None:
+        SKIP_READS = skip_reads
+
+
+def enabled() -> bool:
+    """TTL ou tamanho 0 desativam a cache"""
+    return MAX_AGE_SECONDS > 0 and MAX_CACHE_BYTES > 0
+
+
+@contextmanager
+def _connect():
+    path = CACHE_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        if path not in _schema_ready:
+            with _schema_lock:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                _schema_ready.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def normalize_prompt(text: str) -> str:
+    """Colapsa espaços em branco (incluindo quebras de linha) e remove-os das pontas"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def cache_key(prompt_parts: Iterable[str], prompt_version: str, model: str,
+              temperature: Optional[float]) -> str:
+    """
+    Chave da resposta
+
+    Args:
+        prompt_parts: Textos enviados ao LLM (p.ex. prompt de sistema e do utilizador)
+        prompt_version: Versão do template do prompt
+        model: Identificação do provider e modelo (p.ex. 'groq:llama-3.3-70b-versatile')
+        temperature: Temperatura da geração (None se for a do servidor)
+    """
+    material = json.dumps({
+        'prompt': [normalize_prompt(part) for part in prompt_parts],
+        'prompt_version': prompt_version,
+        'model': model,
+        'temperature': temperature,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _count(conn, name: str):
+    conn.execute(
+        'INSERT INTO counters (name, value) VALUES (?, 1) '
+        'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+        (name,)
+    )
+
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Resposta guardada para a chave (None se não existir ou tiver expirado)"""
+    if not enabled() or SKIP_READS:
+        return None
+    now = time.time()
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                'SELECT response, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row and now - row[1] > MAX_AGE_SECONDS:
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                _count(conn, 'misses')
+                return None
+            conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+            _count(conn, 'hits')
+            return row[0]
+    except sqlite3.Error as e:
+        # A cache nunca impede a análise
+        print(f"[WARNING] Cache do LLM indisponível: {e}")
+        return None
+
+
+def put_cached_response(key: str, model: str, response: str):
+    """Guarda uma resposta e aplica o TTL e o limite de tamanho"""
+    if not enabled():
+        return
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, response, len(response.encode('utf-8')), now, now)
+            )
+            _evict(conn, now)
+    except sqlite3.Error as e:
+        print(f"[WARNING] Não foi possível guardar na cache do LLM: {e}")
+
+
+def _evict(conn, now: float):
+    """Remove as expiradas e, acima do limite, as usadas há mais tempo"""
+    expired = conn.execute('DELETE FROM responses WHERE created_at < ?', (now - MAX_AGE_SECONDS,)).rowcount
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    evicted = 0
+    if total > MAX_CACHE_BYTES:
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_used').fetchall():
+            if total <= MAX_CACHE_BYTES:
+                break
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+    for name, value in (('expired', expired), ('evicted', evicted)):
+        if value:
+            conn.execute(
+                'INSERT INTO counters (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+                (name, value)
+            )
+
+
+def stats() -> Dict:
+    """Hits, misses, entradas e tamanho da cache (todos os processos)"""
+    with _connect() as conn:
+        counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+    hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+    return {
+        'enabled': enabled(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'expired': counters.get('expired', 0),
+        'evicted': counters.get('evicted', 0),
+        'entries': entries,
+        'size_bytes': size,
+        'max_bytes': MAX_CACHE_BYTES,
+        'ttl_seconds': MAX_AGE_SECONDS,
+    }
+
+
+def clear():
+    """Apaga todas as respostas e os contadores"""
+    with _connect() as conn:
+        conn.execute('DELETE FROM responses')
+        conn.execute('DELETE FROM counters')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estatísticas da cache de respostas do LLM")
+    parser.add_argument('--clear', action='store_true', help='Apaga as respostas e os contadores')
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        print("🗑️  Cache do LLM apagada")
+    print(json.dumps(stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Gravação e reprodução das chamadas ao LLM (cassetes)
+
+Os tempos do workflow são dominados pela variância do LLM, o que esconde as
+regressões no nosso código. Em modo 'record' cada chamada ao LLM do
+analyze_and_summarize_node e do src/ollama_ai.py é gravada (prompt, resposta
+e latência) numa cassete JSONL; em modo 'replay' as respostas são servidas da
+cassete, sem rede, com a latência gravada ou sem latência. Um prompt que não
+está na cassete é um erro (CassetteMiss): a reprodução nunca chama o LLM.
+
+Com uma cassete ativa a cache de respostas do LLM (src/llm_cache.py) não é
+consultada, para todas as chamadas passarem pela cassete.
+
+Modo, cassete e latência vêm de variáveis de ambiente (também na aplicação):
+
+    LLM_CASSETTE_MODE=record LLM_CASSETTE=data/cassettes/base.jsonl gunicorn app:app
+    LLM_CASSETTE_MODE=replay LLM_CASSETTE_LATENCY=recorded ...
+
+Benchmark do workflow (extração, regras, análise, merge, metadados e
+renderização) com as respostas gravadas:
+
+    python -m src.llm_cassette --record data/cassettes/base.jsonl cv1.pdf cv2.pdf
+    python -m src.llm_cassette --replay data/cassettes/base.jsonl cv1.pdf cv2.pdf --runs 5
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.llm_cache import cache_key
+
+
+# '' (desligado), 'record' ou 'replay'
+MODE = os.getenv('LLM_CASSETTE_MODE', '').lower()
+CASSETTE_PATH = os.getenv('LLM_CASSETTE', '')
+# Na reprodução: 'zero' responde logo, 'recorded' espera a latência gravada
+REPLAY_LATENCY = os.getenv('LLM_CASSETTE_LATENCY', 'zero').lower()
+
+_lock = threading.Lock()
+# Cassete carregada para reprodução: (caminho, {chave: gravação})
+_loaded = (None, {})
+
+
+class CassetteMiss(RuntimeError):
+    """O prompt não foi gravado na cassete em reprodução"""
+
+
+def configure(mode: Optional[str] = None, path: Optional[str] = None, latency: Optional[str] = None):
+    """Altera o modo, a cassete e a latência da reprodução (usado pelo benchmark)"""
+    global MODE, CASSETTE_PATH, REPLAY_LATENCY, _loaded
+    if mode is not None:
+        MODE = mode
+    if path is not None:
+        CASSETTE_PATH = path
+    if latency is not None:
+        REPLAY_LATENCY = latency
+    with _lock:
+        _loaded = (None, {})
+
+
+def active() -> bool:
+    return MODE in ('record', 'replay') and bool(CASSETTE_PATH)
+
+
+def replaying() -> bool:
+    return MODE == 'replay' and bool(CASSETTE_PATH)
+
+
+def cassette_key(prompt_parts: List[str], model: str) -> str:
+    """Chave de uma chamada: prompt normalizado e modelo (como na cache de respostas)"""
+    return cache_key(prompt_parts, '', model, None)
+
+
+def _recordings() -> Dict[str, Dict]:
+    global _loaded
+    with _lock:
+        path, recordings = _loaded
+        if path != CASSETTE_PATH:
+            recordings = {}
+            with open(CASSETTE_PATH, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        recording = json.loads(line)
+                        # Prompt gravado mais de uma vez: fica a última resposta
+                        recordings[recording['key']] = recording
+            _loaded = (CASSETTE_PATH, recordings)
+        return recordings
+
+
+def replay(prompt_parts: List[str], model: str) -> Optional[Dict]:
+    """
+    Gravação do prompt (None se não estiver em reprodução)
+
+    Returns:
+        Dict com 'response' e 'latency' (segundos a esperar antes de responder)
+
+    Raises:
+        CassetteMiss: o prompt não está na cassete
+    """
+    if not replaying():
+        return None
+    recording = _recordings().get(cassette_key(prompt_parts, model))
+    if recording is None:
+        raise CassetteMiss(f"Prompt não gravado em {CASSETTE_PATH} (modelo {model})")
+    return {
+        'response': recording['response'],
+        'latency': recording['latency'] if REPLAY_LATENCY == 'recorded' else 0.0,
+    }
+
+
+def record(prompt_parts: List[str], model: str, response: str, latency: float):
+    """Acrescenta uma chamada à cassete (só em modo 'record')"""
+    if MODE != 'record' or not CASSETTE_PATH:
+        return
+    line = json.dumps({
+        'key': cassette_key(prompt_parts, model),
+        'model': model,
+        'prompt': prompt_parts,
+        'response': response,
+        'latency': round(latency, 3),
+        'recorded_at': datetime.now().isoformat(),
+    }, ensure_ascii=False)
+    with _lock:
+        os.makedirs(os.path.dirname(CASSETTE_PATH) or '.', exist_ok=True)
+        with open(CASSETTE_PATH, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+# === BENCHMARK ===
+def _benchmark_run(pdf_path: str, work_dir: str) -> Dict[str, float]:
+    """Um processamento completo com caches frias; devolve os segundos de cada etapa"""
+    from src import extraction_cache, storage
+    from src.workflow_langgraph import process_resume_with_langgraph
+    from src.metadata_store import update_metadata, next_id
+    from src.static_export import render_site
+
+    # Caches e metadados numa pasta nova: todas as execuções medem o mesmo trabalho
+    extraction_cache.configure(folder=os.path.join(work_dir, 'extraction_cache'))
+    storage.configure(storage.LocalStorage(work_dir))
+
+    timings = {}
+    last = [time.perf_counter()]
+
+    def on_progress(node_name, state):
+        now = time.perf_counter()
+        timings[node_name] = now - last[0]
+        last[0] = now
+
+    result = process_resume_with_langgraph(pdf_path, on_progress=on_progress)
+    if not result['success']:
+        raise RuntimeError(result.get('error'))
+
+    started = time.perf_counter()
+    entry = {
+        'username': 'benchmark',
+        'filename': os.path.basename(pdf_path),
+        'access_token': f"bench-{time.time_ns()}",
+        'resume_data': result['website_structure']['data'],
+        'upload_date': datetime.now().isoformat(),
+    }
+    with update_metadata() as metadata:
+        entry['id'] = next_id(metadata)
+        metadata.append(entry)
+    timings['metadata'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    render_site(entry, 'simple', None)
+    timings['render'] = time.perf_counter() - started
+    return timings
+
+
+def benchmark(pdf_paths: List[str], runs: int = 3) -> List[Dict]:
+    """
+    Mede cada etapa do processamento dos PDFs (mediana e mínimo das execuções)
+
+    A primeira execução de cada PDF aquece os imports e não é contada.
+    """
+    from src import extraction_cache, llm_cache, storage
+
+    saved_storage = storage.get_storage()
+    saved_extraction_folder = extraction_cache.CACHE_FOLDER
+    saved_llm_cache = llm_cache.MAX_AGE_SECONDS
+    # Sem cache de respostas (nem leituras nem escritas na cache real)
+    llm_cache.configure(max_age_seconds=0)
+
+    rows = []
+    try:
+        for pdf_path in pdf_paths:
+            samples = {}
+            for run in range(runs + 1):
+                with tempfile.TemporaryDirectory() as work_dir:
+                    timings = _benchmark_run(pdf_path, work_dir)
+                if run == 0:
+                    continue
+                for stage, seconds in timings.items():
+                    samples.setdefault(stage, []).append(seconds)
+            for stage, values in samples.items():
+                rows.append({
+                    'pdf': os.path.basename(pdf_path),
+                    'stage': stage,
+                    'median_ms': statistics.median(values) * 1000,
+                    'min_ms': min(values) * 1000,
+                })
+    finally:
+        storage.configure(saved_storage)
+        extraction_cache.configure(folder=saved_extraction_folder)
+        llm_cache.configure(max_age_seconds=saved_llm_cache)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do workflow com as chamadas ao LLM gravadas")
+    parser.add_argument('pdfs', nargs='+', help='PDFs a processar')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--record', metavar='CASSETE', help='Chama o LLM e grava as respostas na cassete')
+    mode.add_argument('--replay', metavar='CASSETE', help='Serve as respostas da cassete (sem rede)')
+    parser.add_argument('--runs', type=int, default=3, help='Execuções medidas por PDF (default 3)')
+    parser.add_argument('--latency', choices=['zero', 'recorded'], default='zero',
+                        help='Latência na reprodução: nenhuma ou a gravada (default zero)')
+    args = parser.parse_args()
+
+    if args.record:
+        configure(mode='record', path=args.record)
+        # Uma execução por PDF chega para gravar as respostas
+        args.runs = 0
+    else:
+        configure(mode='replay', path=args.replay, latency=args.latency)
+
+    rows = benchmark(args.pdfs, runs=args.runs)
+    if args.record:
+        with open(CASSETTE_PATH, 'r', encoding='utf-8') as f:
+            recorded = sum(1 for line in f if line.strip())
+        print(f"📼 {recorded} chamada(s) gravada(s) em {CASSETTE_PATH}")
+        return
+    print(f"{'pdf':<32}{'etapa':<24}{'mediana':>12}{'mínimo':>12}")
+    for row in rows:
+        print(f"{row['pdf'][:31]:<32}{row['stage']:<24}{row['median_ms']:>10.1f}ms{row['min_ms']:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
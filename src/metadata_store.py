@@ -0,0 +1,81 @@
+"""
+Metadados dos currículos (data/curriculos.json) seguros entre processos
+
+Vários workers do gunicorn, várias instâncias (com o armazenamento S3) e os
+scripts em src/ leem e escrevem os mesmos metadados. As alterações são feitas
+com update_metadata(), que:
+
+- obtém o lock do armazenamento (fcntl.flock localmente, objeto de lock com
+  escrita condicional no S3) durante todo o ciclo ler-alterar-gravar, para
+  nenhuma escrita se perder;
+- grava de forma atómica, para as leituras sem lock (load_metadata) verem
+  sempre um ficheiro completo;
+- atribui ids monotónicos com next_id() (contador em data/curriculos.seq), que
+  nunca reutiliza o id de um currículo eliminado.
+"""
+import json
+from contextlib import contextmanager
+from typing import Dict, List
+
+from src.storage import get_storage
+
+
+DATA_FOLDER = 'data'
+METADATA_KEY = f'{DATA_FOLDER}/curriculos.json'
+SEQUENCE_KEY = f'{DATA_FOLDER}/curriculos.seq'
+
+
+def load_metadata() -> List[Dict]:
+    """Carrega metadados dos currículos (lista vazia se não existirem)"""
+    data = get_storage().get_bytes(METADATA_KEY)
+    return json.loads(data) if data else []
+
+
+def save_metadata(metadata: List[Dict]):
+    """
+    Guarda metadados de forma atómica
+
+    Sozinho não evita escritas concorrentes perdidas: para ler-alterar-gravar
+    use update_metadata().
+    """
+    get_storage().put_bytes(METADATA_KEY, json.dumps(metadata, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def metadata_exists() -> bool:
+    return get_storage().exists(METADATA_KEY)
+
+
+def metadata_lock():
+    """Lock exclusivo sobre os metadados, entre threads, processos e instâncias"""
+    return get_storage().lock(METADATA_KEY)
+
+
+@contextmanager
+def update_metadata():
+    """
+    Ciclo ler-alterar-gravar sob lock
+
+    Uso:
+        with update_metadata() as metadata:
+            metadata.append(entry)
+
+    A lista é gravada no fim do bloco (não é gravada se o bloco lançar uma exceção).
+    """
+    with metadata_lock():
+        metadata = load_metadata()
+        yield metadata
+        save_metadata(metadata)
+
+
+def next_id(metadata: List[Dict]) -> int:
+    """
+    Próximo id de currículo (chamar dentro de update_metadata)
+
+    O contador começa acima do maior id existente, para continuar os
+    metadados criados antes dele.
+    """
+    storage = get_storage()
+    current = int((storage.get_bytes(SEQUENCE_KEY) or b'0').strip() or 0)
+    current = max([current] + [c.get('id', 0) for c in metadata]) + 1
+    storage.put_bytes(SEQUENCE_KEY, str(current).encode())
+    return current
@@ -0,0 +1,164 @@
+"""
+Teste de stress dos metadados com vários processos
+
+Simula vários workers do gunicorn a fazer uploads, novas versões e
+eliminações ao mesmo tempo (com as funções save_resume_entry e
+remove_resume_entry da aplicação) e um leitor contínuo, numa pasta
+temporária (ou no bucket S3, com STORAGE_BACKEND=s3). No fim verifica que nenhuma escrita se perdeu, que não há ids
+repetidos ou reutilizados e que o leitor nunca viu um ficheiro incompleto.
+
+Uso:
+    python -m src.metadata_stress
+    python -m src.metadata_stress --processes 16 --operations 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _configure_storage(folder):
+    """Pasta temporária, ou o bucket indicado por STORAGE_BACKEND=s3 (prefixo próprio)"""
+    from src import storage
+    if os.getenv('STORAGE_BACKEND', 'local').lower() == 's3':
+        s3 = storage.create_storage_from_env()
+        s3.prefix += f"stress-{os.path.basename(folder)}/"
+        storage.configure(s3)
+    else:
+        storage.configure(storage.LocalStorage(folder))
+
+
+def _load_app(folder):
+    os.environ['STARTUP_PROFILE'] = '1'
+    import app
+    _configure_storage(folder)
+    return app
+
+
+def writer(worker, operations, folder, seed):
+    """
+    Faz uploads, novas versões e eliminações aleatórias dos próprios currículos
+
+    Returns:
+        Dict com os tokens esperados, os eliminados e os ids atribuídos
+    """
+    app = _load_app(folder)
+    rng = random.Random(seed)
+    alive = {}
+    deleted = []
+    assigned_ids = []
+
+    for i in range(operations):
+        action = rng.random()
+        if alive and action < 0.25:
+            token = rng.choice(sorted(alive))
+            if app.remove_resume_entry(token) is None:
+                raise AssertionError(f"{token} desapareceu antes de ser eliminado")
+            del alive[token]
+            deleted.append(token)
+        elif alive and action < 0.4:
+            # Nova versão: mantém o token e o id
+            token = rng.choice(sorted(alive))
+            entry = app.save_resume_entry({'id': None, 'access_token': token, 'version': i}, replace=True)
+            if entry['id'] != alive[token]:
+                raise AssertionError(f"{token} mudou de id: {alive[token]} → {entry['id']}")
+        else:
+            token = f"w{worker}-{i}"
+            entry = app.save_resume_entry({'id': None, 'access_token': token, 'username': f"worker {worker}"})
+            alive[token] = entry['id']
+            assigned_ids.append(entry['id'])
+
+    return {'alive': alive, 'deleted': deleted, 'assigned_ids': assigned_ids}
+
+
+def reader(folder, duration):
+    """Lê os metadados sem lock em ciclo; devolve (leituras, erros de parsing)"""
+    from src import metadata_store
+    _configure_storage(folder)
+
+    reads = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            metadata_store.load_metadata()
+            reads += 1
+        except ValueError:
+            errors += 1
+    return reads, errors
+
+
+def run(processes=8, operations=100, seed=0):
+    """
+    Corre o teste numa pasta temporária
+
+    Returns:
+        Lista de problemas encontrados (vazia se tudo correu bem)
+    """
+    from src import metadata_store
+
+    problems = []
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes + 1) as executor:
+            read_future = executor.submit(reader, folder, 2.0)
+            futures = [executor.submit(writer, w, operations, folder, seed + w) for w in range(processes)]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except AssertionError as e:
+                    problems.append(str(e))
+            reads, read_errors = read_future.result()
+        elapsed = time.perf_counter() - started
+
+        _configure_storage(folder)
+        metadata = metadata_store.load_metadata()
+
+    expected = {}
+    for result in results:
+        expected.update(result['alive'])
+    found = {c['access_token']: c['id'] for c in metadata}
+
+    lost = set(expected) - set(found)
+    if lost:
+        problems.append(f"{len(lost)} currículo(s) perdido(s): {sorted(lost)[:5]}")
+    resurrected = {t for r in results for t in r['deleted']} & set(found)
+    if resurrected:
+        problems.append(f"{len(resurrected)} currículo(s) eliminado(s) voltaram: {sorted(resurrected)[:5]}")
+    wrong_ids = {t for t in expected if t in found and found[t] != expected[t]}
+    if wrong_ids:
+        problems.append(f"{len(wrong_ids)} currículo(s) com id diferente do atribuído")
+
+    all_ids = [i for r in results for i in r['assigned_ids']]
+    if len(all_ids) != len(set(all_ids)):
+        problems.append(f"{len(all_ids) - len(set(all_ids))} id(s) atribuído(s) mais de uma vez")
+    if read_errors:
+        problems.append(f"o leitor viu {read_errors} ficheiro(s) incompleto(s)")
+
+    total_ops = processes * operations
+    print(f"{processes} processo(s) × {operations} operações = {total_ops} em {elapsed:.1f}s "
+          f"({total_ops / elapsed:.0f} ops/s), {reads} leituras concorrentes")
+    print(f"{len(found)} currículo(s) no fim, {len(all_ids)} id(s) atribuído(s)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de stress dos metadados com vários processos")
+    parser.add_argument('--processes', type=int, default=8, help='Processos a escrever (default: 8)')
+    parser.add_argument('--operations', type=int, default=100, help='Operações por processo (default: 100)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    problems = run(args.processes, args.operations, args.seed)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Nenhuma escrita perdida, ids únicos e leituras sempre completas")
+
+
+if __name__ == '__main__':
+    main()
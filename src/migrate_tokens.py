@@ -1,12 +1,9 @@
 """
 Script de migração para adicionar tokens de acesso aos currículos antigos
 """
-import os
-import json
 import secrets
 
-DATA_FOLDER = 'data'
-METADATA_FILE = os.path.join(DATA_FOLDER, 'curriculos.json')
+from src.metadata_store import metadata_exists, update_metadata
 
 
 def generate_access_token():
@@ -16,27 +13,21 @@ def generate_access_token():
 
 def migrate_curriculos():
     """Adiciona tokens aos currículos que não têm"""
-    if not os.path.exists(METADATA_FILE):
+    if not metadata_exists():
         print("Nenhum ficheiro de metadados encontrado.")
         return
 
-    # Carrega metadados
-    with open(METADATA_FILE, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-
     updated_count = 0
 
-    # Adiciona tokens aos currículos sem tokens
-    for curriculo in metadata:
-        if 'access_token' not in curriculo or not curriculo['access_token']:
-            curriculo['access_token'] = generate_access_token()
-            updated_count += 1
-            print(f"✓ Token adicionado ao currículo de {curriculo['username']} (ID: {curriculo['id']})")
+    # Adiciona tokens aos currículos sem tokens (sob lock, com a aplicação a correr)
+    with update_metadata() as metadata:
+        for curriculo in metadata:
+            if 'access_token' not in curriculo or not curriculo['access_token']:
+                curriculo['access_token'] = generate_access_token()
+                updated_count += 1
+                print(f"✓ Token adicionado ao currículo de {curriculo['username']} (ID: {curriculo['id']})")
 
-    # Guarda metadados atualizados
     if updated_count > 0:
-        with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
         print(f"\n✅ Migração completa! {updated_count} currículo(s) atualizado(s).")
     else:
         print("✅ Todos os currículos já têm tokens de acesso.")
@@ -44,4 +35,4 @@ def migrate_curriculos():
 
 if __name__ == '__main__':
     print("🔄 Iniciando migração de currículos...\n")
-    migrate_curriculos()
\ No newline at end of file
+    migrate_curriculos()
@@ -3,11 +3,48 @@ Módulo para integração com Ollama (AI local)
 """
 import requests
 import json
+import time
 from typing import Dict, Optional
 
+from src.deadline import Deadline, DeadlineExceeded
+from src import llm_cassette
+from src.llm_cache import cache_key, get_cached_response, put_cached_response
+
 
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
 DEFAULT_MODEL = "llama3"  # Modelo padrão, pode ser mudado
+# Versão do prompt de analyze_resume_with_ollama; alterar invalida as respostas em cache
+ANALYZE_PROMPT_VERSION = "1"
+
+
+class OllamaError(RuntimeError):
+    """Resposta do Ollama com status diferente de 200"""
+
+
+def _generate(prompt: str, model: str, timeout: float) -> str:
+    """
+    POST ao /api/generate e texto da resposta
+
+    Com uma cassete (src/llm_cassette.py) a chamada é gravada ou servida dela.
+    """
+    replayed = llm_cassette.replay([prompt], f"ollama:{model}")
+    if replayed is not None:
+        time.sleep(replayed['latency'])
+        return replayed['response']
+
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "format": "json"
+    }
+    started = time.perf_counter()
+    response = requests.post(OLLAMA_API_URL, json=payload, timeout=timeout)
+    if response.status_code != 200:
+        raise OllamaError(f'Erro na API do Ollama: {response.status_code}')
+    ai_response = response.json().get('response', '')
+    llm_cassette.record([prompt], f"ollama:{model}", ai_response, time.perf_counter() - started)
+    return ai_response
 
 
 def check_ollama_available() -> bool:
@@ -24,23 +61,19 @@ def check_ollama_available() -> bool:
         return False
 
 
-def analyze_resume_with_ollama(resume_text: str, model: str = DEFAULT_MODEL) -> Dict:
+def analyze_resume_with_ollama(resume_text: str, model: str = DEFAULT_MODEL,
+                               deadline: Optional[Deadline] = None) -> Dict:
     """
     Analisa um currículo usando Ollama e extrai informações estruturadas
 
     Args:
         resume_text: Texto do currículo
         model: Modelo Ollama a usar
+        deadline: Prazo do processamento; o timeout do pedido é o tempo restante
 
     Returns:
         Dict com informações extraídas
     """
-    if not check_ollama_available():
-        return {
-            'success': False,
-            'error': 'Ollama não está em execução. Execute: ollama serve'
-        }
-
     prompt = f"""Analisa o seguinte currículo e extrai informações estruturadas em formato JSON.
 
 Currículo:
@@ -95,49 +128,61 @@ Por favor, extrai e estrutura as seguintes informações em JSON:
 
 Responde APENAS com o JSON válido, sem texto adicional."""
 
-    try:
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "format": "json"
+    # Texto já analisado com o mesmo modelo: não chama o Ollama
+    response_key = cache_key([prompt], ANALYZE_PROMPT_VERSION, f"ollama:{model}", None)
+    cached = None if llm_cassette.active() else get_cached_response(response_key)
+    if cached is not None:
+        return {
+            'success': True,
+            'data': json.loads(cached),
+            'raw_response': cached,
+            'cached': True
+        }
+
+    if not llm_cassette.replaying() and not check_ollama_available():
+        return {
+            'success': False,
+            'error': 'Ollama não está em execução. Execute: ollama serve'
         }
 
-        response = requests.post(
-            OLLAMA_API_URL,
-            json=payload,
-            timeout=120  # 2 minutos timeout
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            ai_response = result.get('response', '')
-
-            # Tenta fazer parse do JSON
-            try:
-                parsed_data = json.loads(ai_response)
-                return {
-                    'success': True,
-                    'data': parsed_data,
-                    'raw_response': ai_response
-                }
-            except json.JSONDecodeError as e:
-                # Se falhar, tenta extrair JSON da resposta
-                return {
-                    'success': False,
-                    'error': f'Falha ao fazer parse do JSON: {str(e)}',
-                    'raw_response': ai_response
-                }
-        else:
+    try:
+        if deadline:
+            deadline.check("a análise com Ollama")
+        # 2 minutos no máximo
+        ai_response = _generate(prompt, model, deadline.timeout(120) if deadline else 120)
+
+        # Tenta fazer parse do JSON
+        try:
+            parsed_data = json.loads(ai_response)
+            if not llm_cassette.replaying():
+                put_cached_response(response_key, f"ollama:{model}", ai_response)
+            return {
+                'success': True,
+                'data': parsed_data,
+                'raw_response': ai_response
+            }
+        except json.JSONDecodeError as e:
+            # Se falhar, tenta extrair JSON da resposta
             return {
                 'success': False,
-                'error': f'Erro na API do Ollama: {response.status_code}'
+                'error': f'Falha ao fazer parse do JSON: {str(e)}',
+                'raw_response': ai_response
             }
 
+    except OllamaError as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+    except DeadlineExceeded as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
     except requests.Timeout:
         return {
             'success': False,
-            'error': 'Timeout ao comunicar com Ollama (>2min)'
+            'error': 'Timeout ao comunicar com Ollama'
         }
     except Exception as e:
         return {
@@ -146,18 +191,20 @@ Responde APENAS com o JSON válido, sem texto adicional."""
         }
 
 
-def generate_website_content(resume_data: Dict, model: str = DEFAULT_MODEL) -> Dict:
+def generate_website_content(resume_data: Dict, model: str = DEFAULT_MODEL,
+                             deadline: Optional[Deadline] = None) -> Dict:
     """
     Gera conteúdo adicional para o website (bio, headline, etc.)
 
     Args:
         resume_data: Dados estruturados do currículo
         model: Modelo Ollama a usar
+        deadline: Prazo do processamento; o timeout do pedido é o tempo restante
 
     Returns:
         Dict com conteúdo gerado
     """
-    if not check_ollama_available():
+    if not llm_cassette.replaying() and not check_ollama_available():
         return {
             'success': False,
             'error': 'Ollama não está em execução'
@@ -185,38 +232,20 @@ Gera os seguintes conteúdos para um website profissional corporativo em formato
 Responde APENAS com JSON válido."""
 
     try:
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,
-            "format": "json"
-        }
+        if deadline:
+            deadline.check("a geração de conteúdo com Ollama")
+        ai_response = _generate(prompt, model, deadline.timeout(60) if deadline else 60)
 
-        response = requests.post(
-            OLLAMA_API_URL,
-            json=payload,
-            timeout=60
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            ai_response = result.get('response', '')
-
-            try:
-                parsed_data = json.loads(ai_response)
-                return {
-                    'success': True,
-                    'data': parsed_data
-                }
-            except json.JSONDecodeError:
-                return {
-                    'success': False,
-                    'error': 'Falha ao fazer parse do JSON gerado'
-                }
-        else:
+        try:
+            parsed_data = json.loads(ai_response)
+            return {
+                'success': True,
+                'data': parsed_data
+            }
+        except json.JSONDecodeError:
             return {
                 'success': False,
-                'error': f'Erro na API: {response.status_code}'
+                'error': 'Falha ao fazer parse do JSON gerado'
             }
 
     except Exception as e:
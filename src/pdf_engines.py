@@ -0,0 +1,266 @@
+"""
+Motores de extração de texto dos PDFs
+
+O pdfplumber faz análise de layout carácter a carácter (pdfminer), o que é
+lento para o caso mais comum - um currículo numa coluna com camada de texto
+limpa. O pypdfium2 (já instalado como dependência do pdfplumber) lê a camada
+de texto do PDFium, em C, dezenas de vezes mais depressa.
+
+Motores:
+- 'pdfplumber': análise de layout completa (a referência; comportamento anterior)
+- 'pdfium': só o PDFium, sem verificação
+- 'auto' (default): PDFium página a página, com recurso ao pdfplumber nas
+  páginas cujo texto parece partido (caracteres inválidos, palavras coladas
+  ou letras soltas) ou com layout em várias colunas (o PDFium devolve o texto
+  pela ordem do content stream e as regras de extração foram afinadas sobre
+  a saída do pdfplumber)
+
+Comparação de velocidade e de paridade com o pdfplumber:
+
+    python -m src.pdf_engines cv1.pdf cv2.pdf --runs 5
+"""
+import os
+import time
+import argparse
+import difflib
+import threading
+import statistics
+import unicodedata
+from typing import Dict, List, Optional
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+
+ENGINE = 'auto'
+ENGINE_NAMES = ('auto', 'pdfium', 'pdfplumber')
+
+# Texto partido: proporção máxima de caracteres inválidos (U+FFFD, uso privado)
+MAX_BAD_CHAR_RATIO = 0.01
+# Proporção mínima de letras e dígitos no texto sem espaços
+MIN_ALNUM_RATIO = 0.5
+# Comprimento médio máximo das palavras (acima disto faltam espaços)
+MAX_MEAN_WORD_LENGTH = 15
+# Proporção máxima de palavras de uma letra ("J o ã o" - espaços a mais)
+MAX_SINGLE_LETTER_RATIO = 0.3
+# Colunas: largura mínima do corredor vazio entre colunas (pontos) e linhas em cada lado
+MIN_GUTTER_POINTS = 8
+MIN_COLUMN_LINES = 3
+
+# O PDFium não pode ser chamado de várias threads ao mesmo tempo (nem em documentos diferentes)
+pdfium_lock = threading.Lock()
+
+
+def configure(engine: Optional[str] = None):
+    """Escolhe o motor usado por omissão (chamado pela aplicação)"""
+    global ENGINE
+    if engine is not None:
+        if engine not in ENGINE_NAMES:
+            raise ValueError(f"Motor de PDF desconhecido: {engine} (disponíveis: {', '.join(ENGINE_NAMES)})")
+        ENGINE = engine
+
+
+def broken_text_reason(text: str) -> Optional[str]:
+    """Motivo pelo qual o texto de uma página parece mal extraído (None se parece bom)"""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 'sem texto'
+    bad = sum(1 for c in chars if c == '\ufffd' or unicodedata.category(c) == 'Co')
+    if bad / len(chars) > MAX_BAD_CHAR_RATIO:
+        return 'caracteres inválidos'
+    if sum(1 for c in chars if c.isalnum()) / len(chars) < MIN_ALNUM_RATIO:
+        return 'poucas letras'
+    # Japonês, chinês e coreano não separam as palavras com espaços
+    words = [w for w in text.split() if not any(unicodedata.east_asian_width(c) in 'WF' for c in w)]
+    if words and sum(len(w) for w in words) / len(words) > MAX_MEAN_WORD_LENGTH:
+        return 'palavras coladas'
+    if len(words) >= 20 and sum(1 for w in words if len(w) == 1 and w.isalpha()) / len(words) > MAX_SINGLE_LETTER_RATIO:
+        return 'letras soltas'
+    return None
+
+
+def is_multi_column(rects: List[tuple], page_width: float) -> bool:
+    """
+    Deteta um layout em colunas a partir dos retângulos de texto da página
+
+    Há colunas quando existe uma margem esquerda de vários retângulos (a
+    coluna da direita) a que, na mesma faixa vertical, nenhum retângulo da
+    esquerda chega perto, e a esquerda também tem várias linhas. Datas
+    alinhadas à direita não contam: ficam fora da zona central da página ou
+    são atravessadas pelas linhas de texto corrido.
+
+    Args:
+        rects: (esquerda, baixo, direita, cima) de cada segmento de texto
+        page_width: largura da página em pontos
+    """
+    candidates = sorted({round(r[0]) for r in rects if 0.2 * page_width <= r[0] <= 0.7 * page_width})
+    for x in candidates:
+        right_column = [r for r in rects if r[0] >= x - 2]
+        if len(right_column) < MIN_COLUMN_LINES:
+            continue
+        bottom = min(r[1] for r in right_column)
+        top = max(r[3] for r in right_column)
+        band = [r for r in rects if r[0] < x - 2 and r[3] > bottom and r[1] < top]
+        if any(r[2] > x - MIN_GUTTER_POINTS for r in band):
+            continue
+        if len(band) >= MIN_COLUMN_LINES:
+            return True
+    return False
+
+
+def _clean_pdfium_text(text: str) -> str:
+    # Quebras de linha do Windows; hífenes de translineação do PDFium (U+0002, U+FFFE)
+    text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\x02', '-').replace('\ufffe', '-')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip('\n')
+
+
+class PdfplumberEngine:
+    """Análise de layout completa do pdfplumber (lenta, a referência)"""
+    name = 'pdfplumber'
+
+    def extract_pages(self, pdf_path: str, pdf, indices: List[int]) -> Dict[int, Optional[str]]:
+        return {index: pdf.pages[index].extract_text() or '' for index in indices}
+
+
+class PdfiumEngine:
+    """
+    Camada de texto do PDFium
+
+    Com check=True devolve None nas páginas em que o texto parece partido
+    ou o layout tem várias colunas (para outro motor as extrair).
+    """
+    name = 'pdfium'
+
+    def __init__(self, check: bool = True):
+        self.check = check
+        self.rejected = {}
+
+    def extract_pages(self, pdf_path: str, pdf, indices: List[int]) -> Dict[int, Optional[str]]:
+        texts = {}
+        self.rejected = {}
+        with pdfium_lock:
+            document = pdfium.PdfDocument(pdf_path)
+            try:
+                for index in indices:
+                    page = document[index]
+                    textpage = page.get_textpage()
+                    text = _clean_pdfium_text(textpage.get_text_range())
+                    reason = None
+                    if self.check:
+                        reason = broken_text_reason(text)
+                        if reason is None:
+                            rects = [textpage.get_rect(i) for i in range(textpage.count_rects())]
+                            if is_multi_column(rects, page.get_width()):
+                                reason = 'várias colunas'
+                    textpage.close()
+                    page.close()
+                    if reason:
+                        self.rejected[index] = reason
+                        texts[index] = None
+                    else:
+                        texts[index] = text
+            finally:
+                document.close()
+        return texts
+
+
+def extract_pages(pdf_path: str, pdf, indices: List[int], engine: Optional[str] = None) -> Dict[str, any]:
+    """
+    Extrai o texto das páginas indicadas com o motor escolhido
+
+    Args:
+        pdf_path: caminho do PDF (o PDFium abre o ficheiro por si)
+        pdf: documento pdfplumber já aberto
+        indices: páginas a extrair (base 0)
+        engine: 'auto', 'pdfium' ou 'pdfplumber' (default: ENGINE)
+
+    Returns:
+        Dict com 'texts' ({página: texto por normalizar}) e 'engines'
+        ({motor: número de páginas extraídas})
+    """
+    engine = engine or ENGINE
+    if pdfium is None or not indices:
+        engine = 'pdfplumber'
+
+    if engine == 'pdfplumber':
+        texts = PdfplumberEngine().extract_pages(pdf_path, pdf, indices)
+        return {'texts': texts, 'engines': {'pdfplumber': len(indices)} if indices else {}}
+
+    fast = PdfiumEngine(check=(engine == 'auto'))
+    texts = fast.extract_pages(pdf_path, pdf, indices)
+    fallback = [index for index, text in texts.items() if text is None]
+    if fallback:
+        print(f"[DEBUG] pdfplumber em {len(fallback)} página(s): "
+              f"{', '.join(f'{i + 1} ({fast.rejected[i]})' for i in fallback)}")
+        texts.update(PdfplumberEngine().extract_pages(pdf_path, pdf, fallback))
+
+    engines = {'pdfium': len(indices) - len(fallback), 'pdfplumber': len(fallback)}
+    return {'texts': texts, 'engines': {name: count for name, count in engines.items() if count}}
+
+
+# === BENCHMARK ===
+def _lines_similarity(a: str, b: str) -> float:
+    """
+    Semelhança (0-1) das sequências de linhas de dois textos, sem contar os
+    espaços (colunas misturadas partem as linhas; espaços a mais ou a menos não)
+    """
+    def lines(text):
+        return [''.join(line.split()) for line in text.split('\n') if line.strip()]
+    return difflib.SequenceMatcher(None, lines(a), lines(b), autojunk=False).ratio()
+
+
+def benchmark(pdf_paths: List[str], runs: int = 3) -> List[Dict]:
+    """
+    Mede cada motor em cada PDF (mediana das execuções) e compara o texto
+    e as secções encontradas com os do pdfplumber
+    """
+    from src.pdf_extractor import extract_text_from_pdf
+    from src.section_segmenter import segment_sections
+
+    rows = []
+    for pdf_path in pdf_paths:
+        reference = None
+        for engine in ('pdfplumber', 'pdfium', 'auto'):
+            durations = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                result = extract_text_from_pdf(pdf_path, engine=engine)
+                durations.append(time.perf_counter() - started)
+            if not result['success']:
+                raise RuntimeError(f"{pdf_path}: {result['error']}")
+            sections = [span.name for span in segment_sections(result['text'])]
+            if reference is None:
+                reference = (result['text'], sections)
+            rows.append({
+                'pdf': pdf_path,
+                'engine': engine,
+                'pages': result['num_pages'],
+                'median_ms': statistics.median(durations) * 1000,
+                'parity': _lines_similarity(reference[0], result['text']),
+                'same_sections': sections == reference[1],
+                'engines': result['engines'],
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara velocidade e paridade dos motores de extração de PDF")
+    parser.add_argument('pdfs', nargs='+', help='PDFs do corpus de teste')
+    parser.add_argument('--runs', type=int, default=3, help='Execuções por motor e PDF (default 3)')
+    args = parser.parse_args()
+
+    if pdfium is None:
+        parser.error('o pypdfium2 não está instalado')
+
+    rows = benchmark(args.pdfs, runs=args.runs)
+    print(f"{'pdf':<28}{'motor':<12}{'págs':>5}{'mediana':>12}{'paridade':>10}  {'secções':<8} páginas por motor")
+    for row in rows:
+        engines = ', '.join(f"{name}={count}" for name, count in row['engines'].items())
+        print(f"{os.path.basename(row['pdf'])[:27]:<28}{row['engine']:<12}{row['pages']:>5}"
+              f"{row['median_ms']:>10.1f}ms{row['parity']:>9.1%}  {'✅' if row['same_sections'] else '❌':<8} {engines}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,18 @@
 """
-Módulo para extração de texto de PDFs usando pdfplumber
+Módulo para extração de texto de PDFs (pdfplumber/PDFium, ver src/pdf_engines.py)
 """
 import pdfplumber
-from typing import Dict, List
+from typing import Dict, List, Optional
+import hashlib
 import unicodedata
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+
+from src.section_segmenter import segment_sections, section_body
+from src import pdf_engines
+
+
+# Versão do extrator; alterar invalida a cache de extrações (src/extraction_cache.py)
+EXTRACTOR_VERSION = "3"
 
 
 def normalize_text(text: str) -> str:
@@ -50,25 +59,98 @@ def normalize_text(text: str) -> str:
     return text
 
 
-def extract_text_from_pdf(pdf_path: str) -> Dict[str, any]:
+def _object_digest(obj, memo: Dict[int, bytes], visiting: frozenset = frozenset()) -> bytes:
+    """
+    Digest de um objeto do PDF e de tudo o que ele referencia (dicionários,
+    listas e streams, p.ex. fontes com o ToUnicode e XObjects)
+
+    memo guarda o digest dos objetos indiretos já vistos: as fontes são
+    partilhadas pelas páginas do documento.
+    """
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in memo:
+            return memo[obj.objid]
+        if obj.objid in visiting:
+            # Ciclo (p.ex. /Parent): a referência basta
+            return f"ref {obj.objid}".encode()
+        digest = _object_digest(resolve1(obj), memo, visiting | {obj.objid})
+        memo[obj.objid] = digest
+        return digest
+
+    digest = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        digest.update(b'stream')
+        digest.update(_object_digest(obj.attrs, memo, visiting))
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        digest.update(b'dict')
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode())
+            digest.update(_object_digest(obj[key], memo, visiting))
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'list')
+        for item in obj:
+            digest.update(_object_digest(item, memo, visiting))
+    else:
+        digest.update(repr(obj).encode())
+    return digest.digest()
+
+
+def page_content_hash(page, memo: Optional[Dict[int, bytes]] = None) -> str:
+    """
+    Hash dos content streams e dos recursos (fontes, XObjects) de uma página,
+    sem análise de layout
+
+    Permite saber se a página mudou entre versões do mesmo currículo antes
+    de pagar o custo de extract_text. Os recursos contam porque o mesmo
+    content stream com outra fonte (outro ToUnicode) dá outro texto.
+    """
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256()
+    for stream in page.page_obj.contents:
+        stream = resolve1(stream)
+        if hasattr(stream, 'get_data'):
+            digest.update(stream.get_data())
+    digest.update(_object_digest(page.page_obj.resources, memo))
+    return digest.hexdigest()
+
+
+def extract_text_from_pdf(pdf_path: str, previous_pages: Optional[Dict[str, str]] = None,
+                          engine: Optional[str] = None) -> Dict[str, any]:
     """
     Extrai texto de um PDF e retorna informações estruturadas
 
     Args:
         pdf_path: Caminho para o ficheiro PDF
+        previous_pages: Texto já extraído de uma versão anterior, indexado
+            pelo hash da página; páginas com o mesmo hash não são reextraídas
+        engine: 'auto', 'pdfium' ou 'pdfplumber' (default: pdf_engines.ENGINE)
 
     Returns:
         Dict com texto completo, número de páginas e metadados
     """
+    previous_pages = previous_pages or {}
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            # Extrai texto de todas as páginas
+            memo = {}
+            page_hashes = [page_content_hash(page, memo) for page in pdf.pages]
+            pending = [i for i, page_hash in enumerate(page_hashes) if page_hash not in previous_pages]
+            reused_pages = len(page_hashes) - len(pending)
+            extracted = pdf_engines.extract_pages(pdf_path, pdf, pending, engine=engine)
+
+            # Texto de todas as páginas
             pages_text = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
+            page_texts = {}
+            for i, page_hash in enumerate(page_hashes):
+                if page_hash in previous_pages:
+                    text = previous_pages[page_hash]
+                else:
+                    text = extracted['texts'][i]
                     # Normaliza o texto para corrigir problemas de acentos
-                    text = normalize_text(text)
+                    text = normalize_text(text) if text else ''
+
+                page_texts[page_hash] = text
+                if text:
                     pages_text.append(text)
 
             # Texto completo
@@ -82,6 +164,10 @@ def extract_text_from_pdf(pdf_path: str) -> Dict[str, any]:
                 'text': full_text,
                 'num_pages': len(pdf.pages),
                 'pages': pages_text,
+                'page_hashes': page_hashes,
+                'page_texts': page_texts,
+                'reused_pages': reused_pages,
+                'engines': extracted['engines'],
                 'metadata': {
                     'title': metadata.get('Title', ''),
                     'author': metadata.get('Author', ''),
@@ -91,25 +177,34 @@ def extract_text_from_pdf(pdf_path: str) -> Dict[str, any]:
             }
 
     except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'text': '',
-            'num_pages': 0,
-            'pages': [],
-            'metadata': {}
-        }
+        return extraction_failure(str(e))
+
+
+def extraction_failure(error: str) -> Dict[str, any]:
+    """Resultado de uma extração falhada (mesmas chaves de extract_text_from_pdf)"""
+    return {
+        'success': False,
+        'error': error,
+        'text': '',
+        'num_pages': 0,
+        'pages': [],
+        'page_hashes': [],
+        'page_texts': {},
+        'reused_pages': 0,
+        'engines': {},
+        'metadata': {}
+    }
 
 
 def extract_sections_from_text(text: str) -> Dict[str, str]:
     """
-    Tenta identificar secções comuns de um currículo
+    Identifica as secções de um currículo (ver src/section_segmenter.py)
 
     Args:
         text: Texto extraído do PDF
 
     Returns:
-        Dict com secções identificadas
+        Dict com o corpo de cada secção identificada (secções repetidas são juntas)
     """
     sections = {
         'full_text': text,
@@ -120,41 +215,10 @@ def extract_sections_from_text(text: str) -> Dict[str, str]:
         'summary': ''
     }
 
-    # Palavras-chave para identificar secções
-    keywords = {
-        'experience': ['experiência', 'experience', 'trabalho', 'work history', 'employment'],
-        'education': ['educação', 'education', 'formação', 'academic'],
-        'skills': ['competências', 'skills', 'habilidades', 'aptidões', 'conhecimentos'],
-        'summary': ['resumo', 'summary', 'sobre', 'about', 'perfil', 'profile']
-    }
-
-    text_lower = text.lower()
-    lines = text.split('\n')
-
-    # Tenta identificar secções básicas
-    current_section = None
-    section_content = []
-
-    for line in lines:
-        line_lower = line.lower().strip()
-
-        # Verifica se a linha indica o início de uma nova secção
-        for section_name, section_keywords in keywords.items():
-            if any(keyword in line_lower for keyword in section_keywords):
-                # Guarda a secção anterior
-                if current_section and section_content:
-                    sections[current_section] = '\n'.join(section_content)
-
-                current_section = section_name
-                section_content = []
-                break
-        else:
-            # Adiciona a linha à secção atual
-            if current_section and line.strip():
-                section_content.append(line)
-
-    # Guarda a última secção
-    if current_section and section_content:
-        sections[current_section] = '\n'.join(section_content)
+    for span in segment_sections(text):
+        key = 'contact_info' if span.name == 'contact' else span.name
+        body = section_body(text, span)
+        if body:
+            sections[key] = f"{sections[key]}\n{body}" if sections.get(key) else body
 
-    return sections
\ No newline at end of file
+    return sections
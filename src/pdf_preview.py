@@ -0,0 +1,149 @@
+"""
+Pré-visualização dos PDFs: imagens das páginas em baixa resolução
+
+O viewer mostrava o PDF original num iframe: no telemóvel o visitante
+descarrega o ficheiro inteiro e espera pelo motor de PDF do browser antes de
+ver alguma coisa. As páginas são agora renderizadas (pypdfium2, já instalado
+com o pdfplumber) durante o processamento e guardadas como WebP ao lado do PDF:
+
+    uploads/previews/<pdf>/page-1.webp ... page-N.webp   (PAGE_WIDTH px)
+    uploads/previews/<pdf>/thumb.webp                    (1.ª página, THUMB_WIDTH px)
+
+O número de páginas renderizadas fica na entrada do currículo
+('preview_pages'); o viewer e os cartões do index mostram as imagens e o PDF
+só é carregado se o visitante o pedir.
+
+Para gerar as imagens dos currículos carregados antes desta versão:
+
+    python -m src.pdf_preview --missing
+"""
+import io
+import argparse
+from typing import List, Tuple
+
+from src.storage import get_storage
+from src.pdf_engines import pdfium_lock
+
+
+PREVIEW_FOLDER = 'uploads/previews'
+PAGE_WIDTH = 800
+THUMB_WIDTH = 320
+WEBP_QUALITY = 70
+# Páginas seguintes só no PDF completo
+MAX_PREVIEW_PAGES = 10
+
+
+def preview_key(filename: str, image: str) -> str:
+    return f"{PREVIEW_FOLDER}/{filename}/{image}"
+
+
+def page_image_name(page_number: int) -> str:
+    return f"page-{page_number}.webp"
+
+
+def render_previews(pdf_path: str, max_pages: int = MAX_PREVIEW_PAGES) -> List[Tuple[str, bytes]]:
+    """
+    Renderiza as primeiras páginas e a miniatura da primeira
+
+    Returns:
+        Lista de (nome da imagem, bytes WebP)
+    """
+    import pypdfium2 as pdfium
+
+    images = []
+    # Com o pool de extração desativado a renderização corre nas threads do worker web
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in range(min(len(pdf), max_pages)):
+                page = pdf[index]
+                try:
+                    image = page.render(scale=PAGE_WIDTH / page.get_width()).to_pil()
+                finally:
+                    page.close()
+                images.append((page_image_name(index + 1), _to_webp(image)))
+                if index == 0:
+                    image.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 2))
+                    images.append(('thumb.webp', _to_webp(image)))
+        finally:
+            pdf.close()
+    return images
+
+
+def _to_webp(image) -> bytes:
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def store_previews(pdf_path: str, filename: str) -> int:
+    """
+    Renderiza e guarda as imagens de um PDF
+
+    Uma falha (PDF estranho, pypdfium2 em falta) não impede o upload: o viewer
+    volta a mostrar o PDF diretamente.
+
+    Returns:
+        Número de páginas com imagem (0 se não foi possível renderizar)
+    """
+    # No pool de extração (limites de CPU, memória e tempo), como o texto
+    from src import extraction_pool
+
+    result = extraction_pool.render_previews(pdf_path)
+    if not result['success']:
+        print(f"[WARNING] Não foi possível gerar a pré-visualização de {filename}: {result['error']}")
+        return 0
+    images = result['images']
+
+    storage = get_storage()
+    for image, data in images:
+        storage.put_bytes(preview_key(filename, image), data)
+    pages = sum(1 for image, _ in images if image.startswith('page-'))
+    print(f"[DEBUG] Pré-visualização: {pages} página(s) de {filename}")
+    return pages
+
+
+def delete_previews(filename: str, pages: int):
+    """Remove as imagens de um PDF (eliminado ou substituído por uma nova versão)"""
+    if not pages:
+        return
+    storage = get_storage()
+    for image in ['thumb.webp'] + [page_image_name(n) for n in range(1, pages + 1)]:
+        storage.delete(preview_key(filename, image))
+
+
+def generate_missing() -> int:
+    """Gera as imagens dos currículos que ainda não as têm"""
+    from src.metadata_store import load_metadata, update_metadata
+
+    storage = get_storage()
+    generated = 0
+    for entry in load_metadata():
+        if entry.get('preview_pages') or not storage.exists(f"uploads/{entry['filename']}"):
+            continue
+        with storage.local_path(f"uploads/{entry['filename']}") as pdf_path:
+            pages = store_previews(pdf_path, entry['filename'])
+        if not pages:
+            continue
+        with update_metadata() as metadata:
+            for current in metadata:
+                # Só se o PDF não mudou entretanto
+                if current.get('access_token') == entry.get('access_token') \
+                        and current['filename'] == entry['filename']:
+                    current['preview_pages'] = pages
+        generated += 1
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-visualização (imagens das páginas) dos PDFs")
+    parser.add_argument('--missing', action='store_true', help='Gera as imagens dos currículos que não as têm')
+    args = parser.parse_args()
+
+    if not args.missing:
+        parser.error('indique --missing')
+    print(f"✅ Pré-visualização gerada para {generate_missing()} currículo(s)")
+
+
+if __name__ == '__main__':
+    main()
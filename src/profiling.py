@@ -0,0 +1,249 @@
+"""
+Perfil de CPU e memória de um upload, a pedido
+
+Ativado por pedido (header X-Profile: 1 ou ?profile=1, só para administradores).
+Sem o pedido nada disto é criado: o único custo é a verificação do header.
+
+Durante um upload com perfil:
+- um sampler amostra as stacks da thread do pedido e da thread do workflow
+  (sys._current_frames, a cada SAMPLE_INTERVAL) - sem dependências nem
+  instrumentação das funções;
+- o tracemalloc regista o pico de memória Python de cada node do workflow
+  (e o RSS do processo no fim de cada node) e os locais com mais memória
+  alocada no fim do node que terminou com mais memória em uso.
+
+Os artefactos ficam em data/profiles/<nome>/:
+- summary.json: nodes (tempo, pico, RSS), funções mais amostradas e alocações
+- stacks.folded: stacks no formato "collapsed" (flamegraph.pl, speedscope)
+
+Nota: o tracemalloc é global ao processo; uploads em paralelo no mesmo worker
+entram nas mesmas medições de memória.
+"""
+import os
+import re
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+PROFILES_FOLDER = os.path.join('data', 'profiles')
+SAMPLE_INTERVAL = 0.005
+TOP_N = 30
+# Número de frames guardados por cada local de alocação
+TRACEMALLOC_FRAMES = 10
+
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+
+
+def _rss_mb() -> Optional[float]:
+    """RSS atual do processo (Linux; None noutros sistemas)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _start_tracing():
+    global _tracing_sessions
+    with _tracing_lock:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracing_sessions += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracing():
+    global _tracing_sessions
+    with _tracing_lock:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0:
+            tracemalloc.stop()
+
+
+class StackSampler(threading.Thread):
+    """Amostra periodicamente as stacks das threads registadas"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.thread_ids = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def add_thread(self, thread_id: int):
+        self.thread_ids.add(thread_id)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+                    self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def top_functions(self, limit: int = TOP_N) -> List[Dict]:
+        """Funções com mais amostras: 'self' (no topo da stack) e 'total' (em qualquer nível)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            # Sem o número da linha, para agregar por função
+            frames = [re.sub(r':\d+\)$', ')', name) for name in stack.split(';')]
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = max(self.samples, 1)
+        return [
+            {'function': name, 'total_pct': round(100 * count / samples, 1),
+             'self_pct': round(100 * own[name] / samples, 1)}
+            for name, count in total.most_common(limit)
+        ]
+
+
+class ProfileSession:
+    """
+    Perfil de um upload (pedido + workflow em segundo plano)
+
+    O pedido e o workflow chamam hold()/release(); os artefactos são gravados
+    quando o último termina.
+    """
+
+    def __init__(self, label: str, folder: str = PROFILES_FOLDER):
+        self.name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_-]', '', label)[:40]}"
+        self.folder = folder
+        self.started = time.perf_counter()
+        self.nodes = []
+        # Dados do upload guardados no resumo (token, ficheiro, ...)
+        self.info = {}
+        self._node_started = self.started
+        self._snapshot = None
+        self._snapshot_node = None
+        self._snapshot_bytes = -1
+        self._holders = 0
+        self._lock = threading.Lock()
+
+        _start_tracing()
+        self.sampler = StackSampler()
+        self.sampler.add_thread(threading.get_ident())
+        self.sampler.start()
+        self.hold()
+
+    def hold(self):
+        with self._lock:
+            self._holders += 1
+
+    def release(self):
+        """Chamado pela thread que terminou a sua parte (deixa de ser amostrada)"""
+        self.sampler.thread_ids.discard(threading.get_ident())
+        with self._lock:
+            self._holders -= 1
+            done = self._holders == 0
+        if done:
+            self.finish()
+
+    def workflow_started(self):
+        """Chamado pela thread do workflow: passa a amostrá-la e começa a medir o primeiro node"""
+        self.sampler.add_thread(threading.get_ident())
+        tracemalloc.reset_peak()
+        self._node_started = time.perf_counter()
+
+    def node_finished(self, node_name: str):
+        """Regista o tempo e o pico de memória do node que acabou de terminar"""
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        self.nodes.append({
+            'node': node_name,
+            'seconds': round(now - self._node_started, 3),
+            'peak_mb': round(peak / 1024 / 1024, 2),
+            'current_mb': round(current / 1024 / 1024, 2),
+            'rss_mb': _rss_mb(),
+        })
+        if current > self._snapshot_bytes:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._snapshot_node = node_name
+            self._snapshot_bytes = current
+        tracemalloc.reset_peak()
+        self._node_started = now
+
+    def finish(self):
+        """Para o sampler e o tracemalloc e grava os artefactos"""
+        self.sampler.stop()
+        snapshot = self._snapshot or tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        _stop_tracing()
+
+        allocations = [
+            {
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in snapshot.statistics('traceback')[:TOP_N]
+        ]
+        summary = {
+            'name': self.name,
+            'created_at': datetime.now().isoformat(),
+            'total_seconds': round(time.perf_counter() - self.started, 3),
+            **self.info,
+            'samples': self.sampler.samples,
+            'sample_interval_ms': self.sampler.interval * 1000,
+            'nodes': self.nodes,
+            'top_functions': self.sampler.top_functions(),
+            'allocations_node': self._snapshot_node,
+            'top_allocations': allocations,
+        }
+
+        out_dir = os.path.join(self.folder, self.name)
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(out_dir, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[DEBUG] Perfil gravado em {out_dir}")
+
+
+def list_profiles(folder: str = PROFILES_FOLDER) -> List[Dict]:
+    """Perfis gravados, do mais recente para o mais antigo"""
+    if not os.path.isdir(folder):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(folder), reverse=True):
+        summary = load_profile(name, folder)
+        if summary:
+            profiles.append(summary)
+    return profiles
+
+
+def load_profile(name: str, folder: str = PROFILES_FOLDER) -> Optional[Dict]:
+    path = os.path.join(folder, os.path.basename(name), 'summary.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,337 @@
+"""
+Reprocessamento em massa dos currículos guardados
+
+Volta a correr o workflow sobre os PDFs guardados (todos ou filtrados) para
+regenerar o resume_data depois de uma mudança de prompt ou de modelo.
+
+- Pool de processos para a extração, com limite de chamadas simultâneas ao LLM
+- Checkpoint em data/reprocess/<run>.jsonl: uma execução interrompida continua
+  onde parou (os currículos já concluídos são saltados)
+- Cada resultado é escrito de forma atómica nos metadados e, com
+  static_export_folder no config.json, o site estático é reexportado
+- Mostra o débito (currículos/min) e o tempo estimado até ao fim
+
+Uso:
+    python -m src.reprocess --all
+    python -m src.reprocess --username maria --workers 4 --llm-concurrency 2
+    python -m src.reprocess --status failed --run retry-failed
+    python -m src.reprocess --stale --force
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.metadata_store import DATA_FOLDER, load_metadata, update_metadata
+from src.migrate_tokens import migrate_curriculos
+from src.storage import get_storage
+from src import search_index
+
+
+UPLOAD_FOLDER = 'uploads'
+CHECKPOINT_FOLDER = os.path.join(DATA_FOLDER, 'reprocess')
+
+# Pasta da exportação estática (static_export_folder do config.json; None desativa)
+STATIC_EXPORT_FOLDER = None
+
+# Campos escolhidos pelo utilizador que o reprocessamento não deve alterar
+COSMETIC_FIELDS = ('profile_photo', 'color_primary', 'color_secondary', 'color_gradient')
+
+
+# === SELEÇÃO ===
+def select_entries(metadata, args, prompt_version):
+    """Filtra os currículos a reprocessar de acordo com os argumentos"""
+    from src.resume_versions import load_version_record
+
+    selected = []
+    ids = {int(i) for i in args.ids.split(',')} if args.ids else None
+
+    for entry in metadata:
+        if ids is not None and entry.get('id') not in ids:
+            continue
+        if args.username and args.username.lower() not in entry.get('username', '').lower():
+            continue
+        if args.since and entry.get('upload_date', '') < args.since:
+            continue
+        if args.status and entry.get('processing_status', 'done') != args.status:
+            continue
+        if args.stale:
+            record = load_version_record(entry['access_token']) or {}
+            if record.get('prompt_version') == prompt_version:
+                continue
+        selected.append(entry)
+
+    return selected[:args.limit] if args.limit else selected
+
+
+# === CHECKPOINT ===
+def load_checkpoint(path):
+    """Devolve os tokens já concluídos com sucesso nesta execução"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Última linha truncada por uma interrupção
+                continue
+            if record.get('success'):
+                done.add(record['token'])
+    return done
+
+
+def append_checkpoint(path, record):
+    """Acrescenta um resultado ao checkpoint (flush + fsync por linha)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# === WORKERS ===
+def _init_worker(llm_gate, verbose, force=False):
+    """Inicializa cada processo do pool com o semáforo partilhado do LLM"""
+    from src.workflow_langgraph import set_llm_gate
+    from src import llm_cache
+    set_llm_gate(llm_gate)
+    # --force pede respostas novas ao LLM (que substituem as que estão em cache)
+    llm_cache.configure(skip_reads=force)
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+
+def reprocess_entry(entry, force=False):
+    """
+    Corre o workflow para um currículo guardado (executado num worker)
+
+    Returns:
+        Dict com token, sucesso, resume_data, version_record e tempo gasto
+    """
+    from src.workflow_langgraph import process_resume_with_langgraph
+    from src.resume_versions import load_version_record
+
+    started = time.perf_counter()
+    token = entry['access_token']
+    key = f"{UPLOAD_FOLDER}/{entry['filename']}"
+    storage = get_storage()
+
+    if not storage.exists(key):
+        return {'token': token, 'filename': entry['filename'], 'success': False,
+                'error': f"PDF não encontrado: {key}", 'elapsed': 0.0}
+
+    previous_version = load_version_record(token)
+    if previous_version and force:
+        # Reaproveita só o texto das páginas; todas as secções voltam ao LLM
+        previous_version = {'page_texts': previous_version.get('page_texts', {})}
+
+    # No S3 o PDF é descarregado para um ficheiro temporário
+    with storage.local_path(key) as filepath:
+        result = process_resume_with_langgraph(
+            filepath, previous_version=previous_version, pdf_hash=entry.get('content_hash')
+        )
+    return {
+        'token': token,
+        # PDF reprocessado: o resultado só se aplica se o currículo ainda o tiver
+        'filename': entry['filename'],
+        'success': result['success'],
+        'error': result.get('error'),
+        'errors': result.get('errors', []),
+        'resume_data': result['website_structure'].get('data', {}),
+        'version_record': result.get('version_record'),
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+# === APLICAÇÃO DOS RESULTADOS ===
+def apply_result(result):
+    """
+    Atualiza o currículo nos metadados com o novo resume_data (sob lock, escrita atómica)
+
+    Se entretanto foi carregada uma nova versão do PDF, o resultado é
+    descartado (result['skipped'] diz porquê): a análise da versão nova, feita
+    pela aplicação, prevalece.
+    """
+    from src.resume_versions import save_version_record
+
+    with update_metadata() as metadata:
+        entry = next((c for c in metadata if c.get('access_token') == result['token']), None)
+        if not entry:
+            result['skipped'] = 'currículo eliminado durante o reprocessamento'
+            return False
+        if entry['filename'] != result['filename']:
+            result['skipped'] = 'PDF substituído por uma nova versão durante o reprocessamento'
+            return False
+
+        old_data = entry.get('resume_data', {})
+        resume_data = dict(result['resume_data'])
+        for field in COSMETIC_FIELDS:
+            if field in old_data:
+                resume_data[field] = old_data[field]
+        if not resume_data.get('full_name'):
+            resume_data['full_name'] = old_data.get('full_name') or entry.get('username')
+
+        entry['resume_data'] = resume_data
+        entry['processed'] = True
+        entry['processing_status'] = 'done'
+        entry['processing_warnings'] = result['errors']
+        entry['reprocessed_at'] = datetime.now().isoformat()
+        entry.pop('processing_error', None)
+
+    if result.get('version_record'):
+        save_version_record(result['token'], result['version_record'])
+    search_index.index_entry(entry)
+    export_static_site(entry)
+    return True
+
+
+def export_static_site(entry):
+    """Atualiza a cópia estática do website, como a aplicação depois do LLM"""
+    if not STATIC_EXPORT_FOLDER:
+        return
+    try:
+        from src.static_export import export_entry
+        export_entry(entry, STATIC_EXPORT_FOLDER)
+    except Exception as e:
+        print(f"[WARNING] Erro ao exportar website estático de {entry.get('access_token', '')[:8]}: {e}")
+
+
+def format_duration(seconds):
+    """Formata segundos como 1h02m03s / 2m03s / 3s"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{secs:02d}s"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
+
+
+# === EXECUÇÃO ===
+def run(entries, checkpoint_path, workers=2, llm_concurrency=1, force=False, verbose=False):
+    """
+    Reprocessa os currículos indicados, saltando os já concluídos no checkpoint
+
+    Returns:
+        Dict com contagens de sucessos, falhas e saltados
+    """
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    done = load_checkpoint(checkpoint_path)
+    pending = [e for e in entries if e['access_token'] not in done]
+    skipped = len(entries) - len(pending)
+
+    print(f"📋 {len(entries)} currículo(s) selecionado(s), {skipped} já concluído(s) no checkpoint")
+    if not pending:
+        return {'succeeded': 0, 'failed': 0, 'skipped': skipped}
+
+    llm_gate = multiprocessing.Semaphore(llm_concurrency)
+    succeeded = failed = discarded = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(llm_gate, verbose, force)) as executor:
+        futures = {executor.submit(reprocess_entry, entry, force): entry for entry in pending}
+        try:
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'token': entry['access_token'], 'success': False,
+                              'error': str(e), 'elapsed': 0.0}
+
+                if result['success'] and apply_result(result):
+                    succeeded += 1
+                    status = '✓'
+                elif result.get('skipped'):
+                    discarded += 1
+                    status = f"↷ ignorado: {result['skipped']}"
+                else:
+                    failed += 1
+                    status = f"✗ {result.get('error')}"
+
+                append_checkpoint(checkpoint_path, {
+                    'token': result['token'],
+                    'id': entry.get('id'),
+                    'success': result['success'],
+                    'error': result.get('error'),
+                    'skipped': result.get('skipped'),
+                    'elapsed': round(result['elapsed'], 2),
+                    'finished_at': datetime.now().isoformat(),
+                })
+
+                completed = succeeded + failed + discarded
+                elapsed = time.perf_counter() - started
+                rate = completed / elapsed
+                eta = (len(pending) - completed) / rate if rate else 0
+                print(f"[{completed}/{len(pending)}] ID {entry.get('id')} {entry.get('username')}: {status} "
+                      f"| {rate * 60:.1f}/min | ETA {format_duration(eta)}", file=sys.__stdout__, flush=True)
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrompido - o progresso está no checkpoint, volte a correr para continuar")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    total = time.perf_counter() - started
+    print(f"\n✅ {succeeded} reprocessado(s), {failed} falha(s), {discarded} ignorado(s) (currículo "
+          f"alterado entretanto) em {format_duration(total)}")
+    return {'succeeded': succeeded, 'failed': failed, 'skipped': skipped, 'discarded': discarded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa os currículos guardados com o workflow atual")
+    selection = parser.add_argument_group('seleção')
+    selection.add_argument('--all', action='store_true', help='Todos os currículos')
+    selection.add_argument('--ids', help='IDs separados por vírgulas')
+    selection.add_argument('--username', help='Nome contém (sem distinguir maiúsculas)')
+    selection.add_argument('--since', help='Carregados a partir de AAAA-MM-DD')
+    selection.add_argument('--status', choices=['pending', 'done', 'failed'], help='Estado do processamento')
+    selection.add_argument('--stale', action='store_true', help='Analisados com outra versão do prompt')
+    selection.add_argument('--limit', type=int, help='Número máximo de currículos')
+
+    parser.add_argument('--workers', type=int, default=2, help='Processos no pool (default: 2)')
+    parser.add_argument('--llm-concurrency', type=int, default=1,
+                        help='Chamadas simultâneas ao LLM (default: 1)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reanalisa todas as secções mesmo sem alterações (sem usar a cache do LLM)')
+    parser.add_argument('--run', help='Nome da execução/checkpoint (default: prompt-v<versão>)')
+    parser.add_argument('--restart', action='store_true', help='Ignora o checkpoint existente')
+    parser.add_argument('--dry-run', action='store_true', help='Só lista os currículos selecionados')
+    parser.add_argument('--verbose', action='store_true', help='Mostra o output do workflow')
+    args = parser.parse_args()
+
+    if not (args.all or args.ids or args.username or args.since or args.status or args.stale):
+        parser.error('indique --all ou pelo menos um filtro')
+
+    global STATIC_EXPORT_FOLDER
+    if os.path.exists('config.json'):
+        with open('config.json', 'r', encoding='utf-8') as f:
+            STATIC_EXPORT_FOLDER = json.load(f).get('app', {}).get('static_export_folder')
+
+    from src.workflow_langgraph import PROMPT_VERSION
+
+    # Garante que todos os currículos têm token (chave do checkpoint e das versões)
+    migrate_curriculos()
+
+    entries = select_entries(load_metadata(), args, PROMPT_VERSION)
+    if args.dry_run:
+        for entry in entries:
+            print(f"ID {entry.get('id')}: {entry.get('username')} - {entry.get('filename')}")
+        print(f"\n{len(entries)} currículo(s) selecionado(s)")
+        return
+
+    checkpoint_path = os.path.join(CHECKPOINT_FOLDER, f"{args.run or f'prompt-v{PROMPT_VERSION}'}.jsonl")
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    run(entries, checkpoint_path, workers=args.workers, llm_concurrency=args.llm_concurrency,
+        force=args.force, verbose=args.verbose)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Registo de versões dos currículos para reprocessamento incremental
+
+Para cada currículo guarda-se o hash e o texto de cada página, o hash do texto
+de origem de cada secção e os campos que o LLM produziu a partir dela. Quando
+chega uma nova versão do mesmo currículo só são reextraídas as páginas e
+resumidas as secções cujo conteúdo mudou.
+"""
+import os
+import json
+import hashlib
+import tempfile
+from typing import Dict, List, Optional
+
+from src.pdf_extractor import extract_sections_from_text
+from src.section_segmenter import segment_sections
+
+
+VERSIONS_FOLDER = os.path.join('data', 'versions')
+
+# Campos do resume_data produzidos a partir de cada secção do currículo
+SECTION_FIELDS = {
+    'summary': ['about_summary'],
+    'experience': ['experience_summary', 'experience_items'],
+    'education': ['education_summary', 'education_items'],
+    'skills': ['skills_summary', 'skills'],
+    'other': ['full_name', 'professional_title', 'location', 'website',
+              'languages', 'certifications', 'projects'],
+}
+
+
+def hash_text(text: str) -> str:
+    """Hash do texto com espaços normalizados"""
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def section_sources(text: str) -> Dict[str, str]:
+    """
+    Divide o texto do currículo pelas secções de SECTION_FIELDS
+
+    O que não pertence a nenhuma secção reconhecida (cabeçalho, contactos,
+    idiomas, ...) fica em 'other'.
+    """
+    sections = extract_sections_from_text(text)
+    sources = {name: sections.get(name, '') for name in SECTION_FIELDS if name != 'other'}
+
+    # Remove os corpos pelos offsets (o corpo juntado pode não aparecer tal e qual no texto)
+    parts, position = [], 0
+    for span in segment_sections(text):
+        if span.name in sources:
+            parts.append(text[position:span.start])
+            position = span.end
+    parts.append(text[position:])
+    sources['other'] = ''.join(parts)
+    return sources
+
+
+def split_outputs(analyzed_data: Dict) -> Dict[str, Dict]:
+    """Agrupa os campos devolvidos pelo LLM pela secção de origem"""
+    return {
+        name: {field: analyzed_data.get(field) for field in fields if field in analyzed_data}
+        for name, fields in SECTION_FIELDS.items()
+    }
+
+
+def join_outputs(section_outputs: Dict[str, Dict]) -> Dict:
+    """Operação inversa de split_outputs"""
+    data = {}
+    for outputs in section_outputs.values():
+        data.update(outputs)
+    return data
+
+
+def changed_sections(section_hashes: Dict[str, str], previous: Optional[Dict],
+                     prompt_version: str) -> List[str]:
+    """
+    Lista as secções que precisam de nova análise do LLM
+
+    Todas as secções contam como alteradas se não houver versão anterior ou
+    se esta foi gerada com outra versão do prompt.
+    """
+    if not previous or previous.get('prompt_version') != prompt_version \
+            or not previous.get('section_outputs'):
+        return list(SECTION_FIELDS)
+
+    old_hashes = previous.get('section_hashes', {})
+    return [name for name in SECTION_FIELDS if section_hashes.get(name) != old_hashes.get(name)]
+
+
+def _record_path(access_token: str) -> str:
+    return os.path.join(VERSIONS_FOLDER, f"{access_token}.json")
+
+
+def load_version_record(access_token: str) -> Optional[Dict]:
+    """Carrega o registo de versão de um currículo (None se não existir)"""
+    path = _record_path(access_token)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_version_record(access_token: str, record: Dict):
+    """Guarda o registo de versão (escrita atómica)"""
+    os.makedirs(VERSIONS_FOLDER, exist_ok=True)
+    path = _record_path(access_token)
+    # Ficheiro temporário único: dois workers podem gravar o mesmo token ao mesmo tempo
+    fd, tmp_path = tempfile.mkstemp(dir=VERSIONS_FOLDER, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def delete_version_record(access_token: str):
+    """Remove o registo de versão de um currículo eliminado"""
+    path = _record_path(access_token)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,145 @@
+"""
+Extração determinística (sem LLM) de dados do currículo
+
+Preenche em milissegundos os campos que não precisam de IA — contactos por
+expressões regulares e corpo das secções via extract_sections_from_text — para
+que o website possa ser mostrado antes de a análise do LLM terminar.
+"""
+import re
+from typing import Dict, List, Optional
+
+from src.pdf_extractor import extract_sections_from_text
+
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}')
+PHONE_RE = re.compile(r'(?<![\w/])(?:\+|00)?\d[\d\s().-]{7,17}\d(?![\w/])')
+LINKEDIN_RE = re.compile(r'(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[\w%-]+/?', re.IGNORECASE)
+GITHUB_RE = re.compile(r'(?:https?://)?(?:www\.)?github\.com/[\w-]+/?', re.IGNORECASE)
+
+# Campos preenchidos pela extração determinística e que o LLM já não devolve
+CONTACT_FIELDS = ('email', 'phone', 'linkedin', 'github')
+
+# Limites para os textos das secções mostrados antes da análise do LLM
+MAX_SUMMARY_CHARS = 600
+MAX_SKILLS = 30
+
+
+def _normalize_url(url: str) -> str:
+    """Garante que o URL tem esquema e não termina em /"""
+    url = url.rstrip('/')
+    if not url.lower().startswith(('http://', 'https://')):
+        url = f"https://{url}"
+    return url
+
+
+def _find_phone(text: str) -> Optional[str]:
+    """Primeiro número com 9 a 15 dígitos que não pareça um período de datas"""
+    for match in PHONE_RE.finditer(text):
+        candidate = match.group(0).strip()
+        digits = re.sub(r'\D', '', candidate)
+        if not 9 <= len(digits) <= 15:
+            continue
+        # Evita confundir "2019 - 2021" ou "01.2020 - 03.2022" com telefones
+        if re.fullmatch(r'[\d\s./-]*(?:19|20)\d{2}[\d\s./-]*', candidate) and candidate.count('-') == 1:
+            continue
+        return candidate
+    return None
+
+
+def extract_contact_info(text: str) -> Dict[str, Optional[str]]:
+    """
+    Extrai email, telefone, LinkedIn e GitHub com expressões regulares
+
+    Args:
+        text: Texto extraído do PDF
+
+    Returns:
+        Dict com os campos de contacto (None quando não encontrados)
+    """
+    email = EMAIL_RE.search(text)
+    linkedin = LINKEDIN_RE.search(text)
+    github = GITHUB_RE.search(text)
+
+    return {
+        'email': email.group(0) if email else None,
+        'phone': _find_phone(text),
+        'linkedin': _normalize_url(linkedin.group(0)) if linkedin else None,
+        'github': _normalize_url(github.group(0)) if github else None,
+    }
+
+
+def _clip(text: str, limit: int = MAX_SUMMARY_CHARS) -> str:
+    """Junta as linhas de uma secção e corta numa fronteira de palavra"""
+    text = ' '.join(line.strip() for line in text.splitlines() if line.strip())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0] + '…'
+
+
+def _split_skills(text: str) -> List[str]:
+    """Divide a secção de competências por vírgulas, bullets e quebras de linha"""
+    skills = []
+    for item in re.split(r'[,;•·|\n]+', text):
+        item = item.strip(' \t-–*:')
+        if item and len(item) <= 40 and item.lower() not in (s.lower() for s in skills):
+            skills.append(item)
+        if len(skills) >= MAX_SKILLS:
+            break
+    return skills
+
+
+def _guess_name_and_title(text: str) -> Dict[str, Optional[str]]:
+    """Usa as primeiras linhas do PDF como nome e título profissional"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()][:4]
+    name, title = None, None
+
+    if lines and re.fullmatch(r"[^\W\d_]+(?:[ '-][^\W\d_]+){1,5}", lines[0]):
+        name = lines[0].title() if lines[0].isupper() else lines[0]
+        if len(lines) > 1 and len(lines[1]) <= 80 and not re.search(r'[@\d]', lines[1]):
+            title = lines[1]
+
+    return {'full_name': name, 'professional_title': title}
+
+
+def extract_fast_resume_data(text: str) -> Dict:
+    """
+    Constrói um resume_data provisório a partir do texto do PDF
+
+    Args:
+        text: Texto extraído do PDF
+
+    Returns:
+        Dict com as mesmas chaves usadas pelo website (só as encontradas)
+    """
+    if not text:
+        return {}
+
+    sections = extract_sections_from_text(text)
+    data = {**_guess_name_and_title(text), **extract_contact_info(text)}
+
+    if sections.get('summary'):
+        data['about_summary'] = _clip(sections['summary'])
+    if sections.get('experience'):
+        data['experience_summary'] = _clip(sections['experience'])
+    if sections.get('education'):
+        data['education_summary'] = _clip(sections['education'])
+    if sections.get('skills'):
+        data['skills'] = _split_skills(sections['skills'])
+
+    return {key: value for key, value in data.items() if value}
+
+
+def merge_resume_data(fast_data: Dict, llm_data: Dict) -> Dict:
+    """
+    Junta os dados do LLM aos dados determinísticos
+
+    Os contactos extraídos por regex têm prioridade; para os restantes campos
+    os valores do LLM substituem os provisórios sempre que não estão vazios.
+    """
+    merged = dict(fast_data)
+    for key, value in llm_data.items():
+        if key in CONTACT_FIELDS and merged.get(key):
+            continue
+        if value not in (None, '', [], {}):
+            merged[key] = value
+    return merged
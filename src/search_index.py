@@ -0,0 +1,404 @@
+"""
+Índice de pesquisa dos currículos (SQLite FTS5 em data/search.sqlite)
+
+Pesquisar no load_metadata() obrigava a percorrer o resume_data de todos os
+currículos. O índice invertido guarda, por currículo (rowid = id da entrada):
+
+    full_name, professional_title, skills, experience (cargos, empresas,
+    descrições), languages e content (texto extraído do PDF)
+
+e é atualizado incrementalmente: no upload (com o texto do PDF), quando o
+LLM termina ou um currículo é reprocessado (só os campos estruturados) e
+quando um currículo é eliminado. Os resultados são ordenados por BM25, com
+mais peso no nome, nas competências e nos idiomas do que no texto corrido.
+
+Sintaxe das pesquisas (todos os termos têm de aparecer; os acentos são
+ignorados e cada palavra também encontra as que começam por ela):
+
+    kubernetes português
+    "engenheiro de dados" lisboa
+    skill:python idioma:inglês
+
+O índice é local a cada instância (é só uma cópia derivada dos metadados):
+
+    python -m src.search_index --rebuild        # reconstrói a partir dos metadados
+    python -m src.search_index --query "python"
+    python -m src.search_index --benchmark 100000
+"""
+import os
+import re
+import html
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import statistics
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+INDEX_PATH = os.path.join('data', 'search.sqlite')
+DEFAULT_LIMIT = 20
+MAX_COUNT = 1000
+
+COLUMNS = ['full_name', 'professional_title', 'skills', 'experience', 'languages', 'content']
+# Pesos BM25 pela ordem das colunas (token e username não são indexados)
+WEIGHTS = [0, 0, 10.0, 5.0, 8.0, 3.0, 6.0, 1.0]
+# Função de ordenação da coluna rank (configuração persistente da tabela FTS5)
+RANK_FUNCTION = f"bm25({', '.join(str(weight) for weight in WEIGHTS)})"
+
+# Prefixos campo:termo aceites na pesquisa
+FIELD_ALIASES = {
+    'nome': 'full_name', 'name': 'full_name',
+    'cargo': 'professional_title', 'title': 'professional_title',
+    'skill': 'skills', 'skills': 'skills', 'competencia': 'skills', 'competência': 'skills',
+    'empresa': 'experience', 'company': 'experience', 'experiencia': 'experience', 'experiência': 'experience',
+    'idioma': 'languages', 'lang': 'languages', 'language': 'languages',
+}
+
+SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS resumes USING fts5(
+    token UNINDEXED,
+    username UNINDEXED,
+    {', '.join(COLUMNS)},
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+
+# Colunas onde se procura o excerto mostrado em cada resultado
+SNIPPET_COLUMNS = ['skills', 'languages', 'professional_title', 'experience', 'content']
+SNIPPET_WORDS = 12
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def configure(path: Optional[str] = None):
+    """Altera o ficheiro do índice"""
+    global INDEX_PATH
+    if path:
+        INDEX_PATH = path
+
+
+@contextmanager
+def _connect(path: Optional[str] = None):
+    path = path or INDEX_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        if path not in _schema_ready:
+            with _schema_lock:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                # ORDER BY rank ordena todos os resultados pelo BM25 com os pesos das colunas
+                conn.execute("INSERT INTO resumes (resumes, rank) VALUES ('rank', ?)", (RANK_FUNCTION,))
+                conn.commit()
+                _schema_ready.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# === DOCUMENTOS ===
+def _join(values) -> str:
+    return ' · '.join(str(value) for value in values if value)
+
+
+def document_fields(entry: Dict) -> Dict[str, str]:
+    """Texto de cada coluna indexada a partir da entrada do currículo"""
+    data = entry.get('resume_data') or {}
+    experience = [data.get('experience_summary')]
+    for item in data.get('experience_items') or []:
+        if isinstance(item, dict):
+            experience += [item.get('position'), item.get('company'), item.get('description')]
+    languages = []
+    for item in data.get('languages') or []:
+        languages += [item.get('language'), item.get('level')] if isinstance(item, dict) else [item]
+
+    return {
+        'full_name': _join([data.get('full_name'), entry.get('username')]),
+        'professional_title': data.get('professional_title') or '',
+        'skills': _join(data.get('skills') or []),
+        'experience': _join(experience),
+        'languages': _join(languages),
+    }
+
+
+def index_entry(entry: Dict, text: Optional[str] = None, path: Optional[str] = None):
+    """
+    Indexa (ou atualiza) um currículo
+
+    Args:
+        entry: Entrada dos metadados (com 'id')
+        text: Texto extraído do PDF; None mantém o texto já indexado
+    """
+    if entry.get('id') is None:
+        return
+    fields = document_fields(entry)
+    try:
+        with _connect(path) as conn:
+            if text is None:
+                row = conn.execute('SELECT content FROM resumes WHERE rowid = ?', (entry['id'],)).fetchone()
+                text = row[0] if row else ''
+            conn.execute('DELETE FROM resumes WHERE rowid = ?', (entry['id'],))
+            conn.execute(
+                f"INSERT INTO resumes (rowid, token, username, {', '.join(COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in COLUMNS)})",
+                (entry['id'], entry['access_token'], entry.get('username', ''),
+                 *(fields[column] for column in COLUMNS[:-1]), text)
+            )
+    except sqlite3.Error as e:
+        # O índice é derivado dos metadados (--rebuild); não impede o upload
+        print(f"[WARNING] Não foi possível indexar o currículo {entry['id']}: {e}")
+
+
+def remove_entry(entry_id: Optional[int], path: Optional[str] = None):
+    """Remove um currículo eliminado do índice"""
+    if entry_id is None:
+        return
+    try:
+        with _connect(path) as conn:
+            conn.execute('DELETE FROM resumes WHERE rowid = ?', (entry_id,))
+    except sqlite3.Error as e:
+        print(f"[WARNING] Não foi possível remover o currículo {entry_id} do índice: {e}")
+
+
+# === PESQUISA ===
+def build_match_query(query: str) -> str:
+    """
+    Converte a pesquisa do utilizador numa expressão MATCH do FTS5
+
+    Os operadores do FTS5 nunca passam diretamente (uma pesquisa com aspas
+    ou parênteses soltos não dá erro de sintaxe).
+    """
+    parts = []
+    for field, phrase, word in re.findall(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))', query):
+        column = FIELD_ALIASES.get(field.lower()) if field else None
+        if field and not column:
+            # Não é um campo conhecido: "c:" faz parte do termo
+            word = f"{field} {phrase or word}"
+            phrase = ''
+        prefix = f"{{{column}}} : " if column else ''
+        if phrase:
+            tokens = re.findall(r'\w+', phrase)
+            if tokens:
+                parts.append(f'{prefix}"{" ".join(tokens)}"')
+        else:
+            parts += [f'{prefix}"{token}"*' for token in re.findall(r'\w+', word)]
+    return ' AND '.join(parts)
+
+
+def _fold(text: str) -> str:
+    """Minúsculas e sem acentos (como o tokenizer remove_diacritics)"""
+    return ''.join(c for c in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(c))
+
+
+def make_snippet(fields: Dict[str, str], terms: List[str], words: int = SNIPPET_WORDS) -> str:
+    """
+    Excerto em HTML com os termos da pesquisa marcados com <mark>
+
+    Procura a primeira coluna (competências, idiomas, cargo, experiência,
+    texto) com um termo e mostra as palavras à volta dele.
+    """
+    for column in SNIPPET_COLUMNS:
+        text = fields.get(column) or ''
+        folded = _fold(text)
+        if not any(term in folded for term in terms):
+            continue
+        tokens = re.findall(r'\w+|\W+', text)
+        hits = [i for i, token in enumerate(tokens)
+                if token[0].isalnum() and any(_fold(token).startswith(term) for term in terms)]
+        if not hits:
+            continue
+        # ~words palavras (tokens alternam palavra/separador), centradas no primeiro termo
+        start = max(0, hits[0] - words)
+        end = min(len(tokens), start + 2 * words)
+        parts = ['…'] if start else []
+        for i in range(start, end):
+            token = html.escape(tokens[i])
+            parts.append(f"<mark>{token}</mark>" if i in hits else token)
+        if end < len(tokens):
+            parts.append('…')
+        return ''.join(parts).strip()
+    return ''
+
+
+def search(query: str, limit: int = DEFAULT_LIMIT, offset: int = 0, path: Optional[str] = None) -> Dict:
+    """
+    Pesquisa ordenada por relevância (BM25 sobre todos os resultados)
+
+    Returns:
+        Dict com 'results' (token, username, full_name, professional_title,
+        snippet em HTML com <mark>, score), 'total' (até MAX_COUNT, com
+        'total_capped' se houver mais) e 'took_ms'
+    """
+    started = time.perf_counter()
+    match = build_match_query(query)
+    if not match:
+        return {'query': query, 'results': [], 'total': 0, 'total_capped': False, 'took_ms': 0.0}
+
+    with _connect(path) as conn:
+        # 1) só o rowid e a pontuação (o snippet de todos os resultados antes do
+        #    LIMIT custava mais do que a própria pesquisa); ORDER BY rank com
+        #    LIMIT é otimizado pelo FTS5 (só guarda os melhores limit + offset)
+        ranked = conn.execute(
+            'SELECT rowid, rank FROM resumes WHERE resumes MATCH ? ORDER BY rank LIMIT ? OFFSET ?',
+            (match, limit, offset)
+        ).fetchall()
+        # 2) colunas só da página pedida, por rowid (com MATCH, o snippet() do
+        #    FTS5 voltava a expandir os prefixos da pesquisa em cada linha)
+        details = {}
+        if ranked:
+            details = {row[0]: row[1:] for row in conn.execute(
+                f"""SELECT rowid, token, username, {', '.join(COLUMNS)}
+                    FROM resumes WHERE rowid IN ({', '.join('?' for _ in ranked)})""",
+                [row[0] for row in ranked]
+            )}
+        if len(ranked) < limit:
+            total = offset + len(ranked)
+        else:
+            # Contagem limitada: acima de MAX_COUNT só interessa que são "muitos"
+            total = conn.execute(
+                'SELECT COUNT(*) FROM (SELECT 1 FROM resumes WHERE resumes MATCH ? LIMIT ?)',
+                (match, MAX_COUNT + 1)
+            ).fetchone()[0]
+    terms = [_fold(term) for term in re.findall(r'\w+', query) if term.lower() not in FIELD_ALIASES]
+
+    return {
+        'query': query,
+        'results': [
+            {
+                'id': rowid,
+                'token': details[rowid][0],
+                'username': details[rowid][1],
+                # full_name indexado inclui o username (ver document_fields)
+                'full_name': details[rowid][2].split(' · ')[0],
+                'professional_title': details[rowid][3],
+                'snippet': make_snippet(dict(zip(COLUMNS, details[rowid][2:])), terms),
+                'score': round(-score, 3),
+            }
+            for rowid, score in ranked if rowid in details
+        ],
+        'total': min(total, MAX_COUNT),
+        'total_capped': total > MAX_COUNT,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+# === RECONSTRUÇÃO ===
+def entry_text(entry: Dict) -> str:
+    """Texto do PDF guardado no registo de versão do currículo (src/resume_versions.py)"""
+    from src.resume_versions import load_version_record
+
+    record = load_version_record(entry['access_token']) or {}
+    page_texts = record.get('page_texts', {})
+    return '\n\n'.join(page_texts.get(page_hash, '') for page_hash in record.get('page_hashes', []))
+
+
+def rebuild(metadata: List[Dict], path: Optional[str] = None) -> int:
+    """Reconstrói o índice inteiro a partir dos metadados"""
+    with _connect(path) as conn:
+        conn.execute('DELETE FROM resumes')
+    for entry in metadata:
+        index_entry(entry, entry_text(entry), path)
+    with _connect(path) as conn:
+        conn.execute("INSERT INTO resumes (resumes) VALUES ('optimize')")
+    return len(metadata)
+
+
+# === BENCHMARK ===
+_SKILLS = ['Python', 'Java', 'Kubernetes', 'Docker', 'React', 'SQL', 'AWS', 'Terraform', 'Go', 'Rust',
+           'TypeScript', 'Spark', 'Excel', 'SAP', 'Figma', 'Photoshop', 'Scrum', 'Linux', 'C#', 'PHP']
+_LANGUAGES = ['Português', 'Inglês', 'Espanhol', 'Francês', 'Alemão', 'Italiano', 'Mandarim']
+_TITLES = ['Engenheiro de Software', 'Analista de Dados', 'Designer UX', 'Gestor de Projeto',
+           'Engenheiro DevOps', 'Contabilista', 'Enfermeiro', 'Professor', 'Consultor SAP']
+_WORDS = ('desenvolvimento equipa cliente sistema dados projeto gestão plataforma análise serviço '
+          'produto qualidade processo relatórios vendas infraestrutura segurança migração cloud').split()
+
+
+def _synthetic_entry(index: int, rng: random.Random) -> Dict:
+    return {
+        'id': index,
+        'access_token': f"bench{index}",
+        'username': f"Pessoa {index}",
+        'resume_data': {
+            'full_name': f"Pessoa {index} {rng.choice(['Silva', 'Santos', 'Costa', 'Pereira', 'Ferreira'])}",
+            'professional_title': rng.choice(_TITLES),
+            'skills': rng.sample(_SKILLS, 5),
+            'languages': [{'language': language, 'level': 'fluente'}
+                          for language in rng.sample(_LANGUAGES, 2)],
+            'experience_items': [{'company': f"Empresa {rng.randrange(5000)}", 'position': rng.choice(_TITLES),
+                                  'description': ' '.join(rng.choices(_WORDS, k=15))}],
+        },
+    }
+
+
+def benchmark(size: int, queries: List[str], repeat: int = 20) -> List[Dict]:
+    """Indexa currículos sintéticos num índice temporário e mede as pesquisas (mediana e p95)"""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'search.sqlite')
+        started = time.perf_counter()
+        fields = None
+        with _connect(path) as conn:
+            for i in range(1, size + 1):
+                entry = _synthetic_entry(i, rng)
+                fields = document_fields(entry)
+                conn.execute(
+                    f"INSERT INTO resumes (rowid, token, username, {', '.join(COLUMNS)}) "
+                    f"VALUES (?, ?, ?, {', '.join('?' for _ in COLUMNS)})",
+                    (i, entry['access_token'], entry['username'], *(fields[c] for c in COLUMNS[:-1]),
+                     ' '.join(rng.choices(_WORDS, k=300)))
+                )
+            conn.execute("INSERT INTO resumes (resumes) VALUES ('optimize')")
+        print(f"📚 {size} currículos indexados em {time.perf_counter() - started:.1f}s")
+
+        results = []
+        for query in queries:
+            timings = []
+            for _ in range(repeat):
+                result = search(query, path=path)
+                timings.append(result['took_ms'])
+            timings.sort()
+            results.append({
+                'query': query,
+                'total': result['total'],
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            })
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de pesquisa dos currículos (SQLite FTS5)")
+    parser.add_argument('--rebuild', action='store_true', help='Reconstrói o índice a partir dos metadados')
+    parser.add_argument('--query', help='Pesquisa no índice')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='Mede as pesquisas num índice temporário com N currículos sintéticos')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from src.metadata_store import load_metadata
+        print(f"✅ {rebuild(load_metadata())} currículo(s) indexado(s) em {INDEX_PATH}")
+    if args.query:
+        result = search(args.query)
+        print(f"{result['total']} resultado(s) em {result['took_ms']:.2f} ms")
+        for row in result['results']:
+            print(f"  {row['score']:>8.2f}  {row['full_name']} - {row['professional_title']}")
+    if args.benchmark:
+        queries = ['kubernetes', 'kubernetes português', 'skill:python idioma:inglês',
+                   '"engenheiro de software"', 'pessoa 4242', 'migra']
+        print(f"{'pesquisa':<32}{'resultados':>12}{'mediana':>12}{'p95':>12}")
+        for row in benchmark(args.benchmark, queries):
+            print(f"{row['query']:<32}{row['total']:>12}{row['median_ms']:>10.2f}ms{row['p95_ms']:>10.2f}ms")
+    if not (args.rebuild or args.query or args.benchmark):
+        parser.error('indique --rebuild, --query ou --benchmark')
+
+
+if __name__ == '__main__':
+    main()
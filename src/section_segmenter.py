@@ -0,0 +1,221 @@
+"""
+Segmentação do texto de um currículo em secções
+
+Uma única expressão regular compilada (ancorada no início da linha, com um
+grupo por tipo de secção) reconhece só linhas com ar de título - o título
+sozinho na linha, com numeração, bullets ou ':' - e devolve os limites de
+cada secção como offsets no texto, sem copiar strings. Uma linha do corpo
+que apenas contém "sobre" ou "work" já não abre uma secção. O título seguido
+de ':' e conteúdo na mesma linha ("SKILLS: Python, SQL") só conta em
+maiúsculas: "Experience: 5 years of Python" no resumo é texto corrido.
+
+Os títulos cobrem português, inglês, espanhol, francês, alemão e italiano e
+são comparados sem acentos e sem distinguir maiúsculas (PDFs que perdem os
+acentos na extração continuam a funcionar).
+
+    python -m src.section_segmenter cv.pdf     # mostra as secções encontradas
+"""
+import re
+import sys
+import unicodedata
+from typing import Dict, List, NamedTuple
+
+
+# Títulos por secção (escritos sem acentos: o texto é comparado sem acentos)
+SECTION_HEADERS = {
+    'summary': [
+        # pt
+        'resumo', 'resumo profissional', 'sobre', 'sobre mim', 'perfil', 'perfil profissional',
+        'objetivo', 'objetivos', 'objetivo profissional', 'apresentacao',
+        # en
+        'summary', 'professional summary', 'profile', 'professional profile', 'about', 'about me',
+        'objective', 'career objective', 'personal statement',
+        # es / fr / de / it
+        'resumen', 'perfil profesional', 'sobre mi', 'acerca de mi',
+        'profil', 'profil professionnel', 'a propos', 'a propos de moi', 'objectif',
+        'zusammenfassung', 'uber mich', 'kurzprofil',
+        'profilo', 'sommario', 'chi sono', 'obiettivo',
+    ],
+    'experience': [
+        'experiencia', 'experiencias', 'experiencia profissional', 'experiencias profissionais',
+        'percurso profissional', 'historico profissional', 'trabalho', 'experiencia de trabalho',
+        'experience', 'work experience', 'professional experience', 'employment', 'employment history',
+        'work history', 'career history',
+        'experiencia laboral', 'experiencia profesional', 'historial laboral',
+        'experience professionnelle', 'experiences professionnelles', 'parcours professionnel',
+        'berufserfahrung', 'berufliche erfahrung', 'werdegang', 'beruflicher werdegang',
+        'esperienza', 'esperienze lavorative', 'esperienza professionale', 'esperienze professionali',
+    ],
+    'education': [
+        'educacao', 'formacao', 'formacao academica', 'habilitacoes', 'habilitacoes literarias',
+        'habilitacoes academicas', 'escolaridade',
+        'education', 'academic background', 'qualifications', 'academic qualifications',
+        'educacion', 'formacion', 'formacion academica', 'estudios',
+        'formation', 'etudes', 'parcours academique',
+        'ausbildung', 'bildung', 'studium', 'bildungsweg',
+        'istruzione', 'formazione', 'studi',
+    ],
+    'skills': [
+        'competencias', 'competencias tecnicas', 'habilidades', 'aptidoes', 'conhecimentos',
+        'conhecimentos tecnicos', 'ferramentas', 'tecnologias',
+        'skills', 'technical skills', 'core competencies', 'competencies', 'expertise', 'tools',
+        'technologies', 'key skills',
+        'conocimientos', 'aptitudes',
+        'competences', 'competences techniques', 'savoir faire',
+        'kenntnisse', 'fahigkeiten', 'kompetenzen', 'it kenntnisse',
+        'competenze', 'abilita', 'conoscenze',
+    ],
+    'projects': [
+        'projetos', 'projectos', 'projetos pessoais',
+        'projects', 'personal projects', 'side projects', 'portfolio',
+        'proyectos', 'projets', 'projekte', 'progetti',
+    ],
+    'certifications': [
+        'certificacoes', 'certificados', 'cursos', 'cursos e certificacoes',
+        'certifications', 'certificates', 'licenses', 'licenses & certifications',
+        'licenses and certifications', 'courses',
+        'certificaciones', 'certificats', 'zertifikate', 'zertifizierungen', 'weiterbildung',
+        'certificazioni', 'certificati', 'corsi',
+    ],
+    'languages': [
+        'idiomas', 'linguas', 'languages', 'language skills', 'lenguas', 'langues',
+        'sprachen', 'sprachkenntnisse', 'lingue', 'conoscenze linguistiche',
+    ],
+    'interests': [
+        'interesses', 'hobbies', 'atividades', 'interests', 'intereses', 'aficiones',
+        "centres d'interet", 'loisirs', 'interessen', 'hobbys', 'interessi', 'hobby',
+    ],
+    'awards': [
+        'premios', 'distincoes', 'awards', 'honors', 'honours', 'achievements', 'logros',
+        'prix', 'distinctions', 'auszeichnungen', 'premi', 'riconoscimenti',
+    ],
+    'publications': [
+        'publicacoes', 'publications', 'publicaciones', 'publikationen', 'veroffentlichungen',
+        'pubblicazioni',
+    ],
+    'volunteering': [
+        'voluntariado', 'volunteering', 'volunteer experience', 'benevolat', 'ehrenamt', 'volontariato',
+    ],
+    'references': [
+        'referencias', 'references', 'referenzen', 'referenze',
+    ],
+    'contact': [
+        'contacto', 'contactos', 'contato', 'contatos', 'dados pessoais',
+        'contact', 'contact information', 'contact details', 'personal details', 'personal information',
+        'datos personales', 'coordonnees', 'kontakt', 'personliche daten', 'contatti', 'dati personali',
+    ],
+}
+
+
+class SectionSpan(NamedTuple):
+    """Limites de uma secção no texto (offsets; o corpo é text[start:end])"""
+    name: str
+    header_start: int
+    header_end: int
+    start: int
+    end: int
+
+
+def _fold_table() -> Dict[int, str]:
+    """Letras acentuadas -> letra base, sempre um carácter por um (os offsets não mudam)"""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = ''.join(c for c in unicodedata.normalize('NFKD', chr(code)) if not unicodedata.combining(c))
+        if len(base) == 1 and base.isascii() and base != chr(code):
+            table[code] = base
+    return table
+
+
+_FOLD = _fold_table()
+
+
+def fold(text: str) -> str:
+    """Remove os acentos mantendo o comprimento do texto"""
+    return text.translate(_FOLD)
+
+
+def _phrase_pattern(phrase: str) -> str:
+    # Espaços e hífenes entre palavras são equivalentes ("savoir-faire", "IT-Kenntnisse")
+    words = re.split(r"[\s-]+", phrase)
+    return r'[ \t\-]+'.join(re.escape(word) for word in words)
+
+
+def _build_header_regex() -> re.Pattern:
+    groups = []
+    seen = {}
+    for section, phrases in SECTION_HEADERS.items():
+        for phrase in phrases:
+            if phrase in seen:
+                raise ValueError(f"Título '{phrase}' repetido em {seen[phrase]} e {section}")
+            seen[phrase] = section
+        # Frases mais longas primeiro ("experiencia profissional" antes de "experiencia")
+        alternatives = '|'.join(_phrase_pattern(p) for p in sorted(phrases, key=len, reverse=True))
+        groups.append(f"(?P<{section}>{alternatives})")
+    return re.compile(
+        r'^[ \t]*'
+        # Numeração ou decoração antes do título: "1.", "II -", "■", "//"
+        r'(?:(?:\d{1,2}|[ivx]{1,4})[.)][ \t]*|[^\w\n]{1,3}[ \t]*)?'
+        rf"(?:{'|'.join(groups)})"
+        # Sozinho na linha (com ':' ou sublinhado opcionais) ou seguido de ':' e conteúdo
+        r'(?:[^\w\n]*$|[ \t]*[:：][ \t]*)',
+        re.IGNORECASE | re.MULTILINE
+    )
+
+
+HEADER_RE = _build_header_regex()
+
+
+def segment_sections(text: str) -> List[SectionSpan]:
+    """
+    Encontra as secções do currículo
+
+    O corpo de cada secção vai do fim do título até ao início do título
+    seguinte (ou ao fim do texto). O texto antes do primeiro título (nome,
+    contactos) não pertence a nenhuma secção.
+
+    Returns:
+        Lista de SectionSpan pela ordem em que aparecem (um nome pode repetir-se)
+    """
+    headers = []
+    for match in HEADER_RE.finditer(fold(text)):
+        start = match.end()
+        inline = start < len(text) and text[start] != '\n'
+        if inline and not text[match.start(match.lastgroup):match.end(match.lastgroup)].isupper():
+            continue
+        # O corpo começa na linha seguinte quando o título está sozinho na linha
+        if text.startswith('\n', start):
+            start += 1
+        headers.append((match.lastgroup, match.start(), match.end(), start))
+
+    spans = []
+    for i, (name, header_start, header_end, start) in enumerate(headers):
+        end = headers[i + 1][1] if i + 1 < len(headers) else len(text)
+        spans.append(SectionSpan(name, header_start, header_end, start, max(start, end)))
+    return spans
+
+
+def section_body(text: str, span: SectionSpan) -> str:
+    """Corpo da secção sem linhas em branco"""
+    return '\n'.join(line for line in text[span.start:span.end].split('\n') if line.strip())
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Uso: python -m src.section_segmenter <ficheiro .pdf ou .txt>")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    if path.lower().endswith('.pdf'):
+        from src.pdf_extractor import extract_text_from_pdf
+        text = extract_text_from_pdf(path).get('text', '')
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    for span in segment_sections(text):
+        header = text[span.header_start:span.header_end].strip()
+        print(f"{span.name:<15}{span.start:>7}-{span.end:<7} {header!r} ({span.end - span.start} chars)")
+
+
+if __name__ == '__main__':
+    main()
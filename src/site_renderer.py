@@ -0,0 +1,102 @@
+"""
+Contexto de renderização dos websites gerados
+
+O resume_data guardado usa as chaves do workflow (full_name, experience_items,
+...). Os templates website_spa.html e website_corporativo.html foram escritos
+para o esquema antigo em português (nome_completo, experiencias, ...), por isso
+o contexto é adaptado aqui consoante o template escolhido.
+"""
+from datetime import datetime
+from typing import Dict
+
+
+# Nome curto do template → ficheiro em templates/
+WEBSITE_TEMPLATES = {
+    'simple': 'website_simple.html',
+    'spa': 'website_spa.html',
+    'corporativo': 'website_corporativo.html',
+}
+DEFAULT_TEMPLATE = 'simple'
+
+
+def template_file(template: str) -> str:
+    """Ficheiro do template (o simples se o nome não for conhecido)"""
+    return WEBSITE_TEMPLATES.get(template, WEBSITE_TEMPLATES[DEFAULT_TEMPLATE])
+
+
+def _legacy_context(data: Dict) -> Dict:
+    """Converte o resume_data para as chaves em português dos templates antigos"""
+    experiencias = [
+        {
+            'empresa': item.get('company'),
+            'cargo': item.get('position'),
+            'periodo': item.get('period'),
+            'descricao': item.get('description'),
+        }
+        for item in data.get('experience_items') or []
+    ]
+    educacao = [
+        {
+            'instituicao': item.get('institution'),
+            'curso': item.get('degree'),
+            'periodo': item.get('period'),
+        }
+        for item in data.get('education_items') or []
+    ]
+    projetos = [
+        {'nome': item.get('name'), 'descricao': item.get('description')} if isinstance(item, dict) else item
+        for item in data.get('projects') or []
+    ]
+
+    context = {
+        'nome_completo': data.get('full_name', ''),
+        'titulo_profissional': data.get('professional_title'),
+        'resumo_profissional': data.get('about_summary'),
+        'bio_curta': data.get('about_summary'),
+        'telefone': data.get('phone'),
+        'localizacao': data.get('location'),
+        'experiencias': experiencias,
+        'educacao': educacao,
+        'competencias': data.get('skills') or [],
+        'projetos': projetos,
+        'idiomas': data.get('languages') or [],
+        'certificacoes': data.get('certifications') or [],
+        # website_spa.html
+        'primary_color': data.get('color_primary'),
+        'secondary_color': data.get('color_secondary'),
+        # website_corporativo.html
+        'cor_primaria': data.get('color_primary'),
+        'cor_secundaria': data.get('color_secondary'),
+    }
+
+    sections = [{'id': 'sobre', 'icon': '👤', 'title': 'Sobre'}]
+    if experiencias:
+        sections.append({'id': 'experiencia', 'icon': '💼', 'title': 'Experiência'})
+    if educacao:
+        sections.append({'id': 'educacao', 'icon': '🎓', 'title': 'Educação'})
+    if context['competencias']:
+        sections.append({'id': 'competencias', 'icon': '⚡', 'title': 'Competências'})
+    if projetos:
+        sections.append({'id': 'projetos', 'icon': '🚀', 'title': 'Projetos'})
+    sections.append({'id': 'contacto', 'icon': '✉️', 'title': 'Contacto'})
+    context['sections'] = sections
+
+    return context
+
+
+def build_template_context(resume_data: Dict, template: str = DEFAULT_TEMPLATE) -> Dict:
+    """
+    Prepara as variáveis do template a partir do resume_data guardado
+
+    Args:
+        resume_data: Dados do currículo (metadados)
+        template: 'simple', 'spa' ou 'corporativo'
+
+    Returns:
+        Dict pronto a passar a render_template
+    """
+    context = dict(resume_data)
+    context['current_year'] = datetime.now().year
+    if template_file(template) != WEBSITE_TEMPLATES['simple']:
+        context.update(_legacy_context(resume_data))
+    return context
@@ -0,0 +1,153 @@
+"""
+Perfil do tempo de arranque da aplicação
+
+Mede o tempo de import por módulo (python -X importtime) e o tempo até à
+primeira resposta de /login, para acompanhar o cold start no Render.
+
+Uso:
+    python -m src.startup_profile
+    python -m src.startup_profile --with-workflow --top 25
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+# Script executado num processo limpo; o importtime vai para o stderr
+# e o resultado das medições para o stdout (JSON)
+PROBE_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter()
+client = app.app.test_client()
+response = client.get('/login')
+t_first = time.perf_counter()
+result = {
+    'import_app_ms': (t_import - t0) * 1000,
+    'first_response_ms': (t_first - t0) * 1000,
+    'first_status': response.status_code,
+}
+if WITH_WORKFLOW:
+    # Os processos do pool de extração herdariam o -X importtime e misturariam
+    # os imports deles com os da aplicação no stderr
+    import multiprocessing.util
+    _flags = multiprocessing.util._args_from_interpreter_flags
+    def _without_importtime():
+        args = _flags()
+        return [a for i, a in enumerate(args)
+                if a != 'importtime' and not (a == '-X' and args[i + 1:i + 2] == ['importtime'])]
+    multiprocessing.util._args_from_interpreter_flags = _without_importtime
+    t_wf = time.perf_counter()
+    app.load_workflow()
+    result['load_workflow_ms'] = (time.perf_counter() - t_wf) * 1000
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str):
+    """
+    Converte a saída de -X importtime numa lista de módulos
+
+    Returns:
+        Lista de dicts com module, self_us, cumulative_us e depth
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        raw_name = parts[2].rstrip()
+        depth = (len(raw_name) - len(raw_name.lstrip(' '))) // 2
+        modules.append({
+            'module': raw_name.strip(),
+            'self_us': int(parts[0].strip()),
+            'cumulative_us': int(parts[1].strip()),
+            'depth': depth,
+        })
+    return modules
+
+
+def run_probe(with_workflow: bool = False, cwd: str = None) -> dict:
+    """Executa o arranque num processo novo e recolhe as medições"""
+    env = dict(os.environ, STARTUP_PROFILE='1')
+    script = PROBE_SCRIPT.replace('WITH_WORKFLOW', 'True' if with_workflow else 'False')
+
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=cwd or os.getcwd(),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao arrancar a aplicação:\n{proc.stderr[-2000:]}")
+
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    timings['modules'] = parse_importtime(proc.stderr)
+    return timings
+
+
+def report_modules(modules):
+    """
+    Módulos a comparar no relatório: os importados diretamente por app.py e
+    os restantes de topo (importados depois, p.ex. por load_workflow)
+
+    O -X importtime mostra cada módulo antes do que o importou, por isso os
+    de profundidade 1 que antecedem a linha de 'app' são os imports de app.py.
+    Os módulos de topo anteriores (site, encodings, ...) são do arranque do
+    próprio interpretador.
+    """
+    selected, children, seen_app = [], [], False
+    for m in modules:
+        if m['depth'] == 1:
+            children.append(m)
+        elif m['depth'] == 0:
+            if m['module'] == 'app':
+                selected += children
+                seen_app = True
+            elif seen_app:
+                selected.append(m)
+            children = []
+    return sorted(selected, key=lambda m: m['cumulative_us'], reverse=True)
+
+
+def print_report(timings: dict, top: int = 15):
+    """Mostra o relatório de arranque"""
+    modules = timings['modules']
+    top_level = report_modules(modules)
+
+    print("⏱️  PERFIL DE ARRANQUE")
+    print("=" * 60)
+    print(f"Import de app.py:        {timings['import_app_ms']:8.1f} ms")
+    print(f"Primeira resposta /login: {timings['first_response_ms']:8.1f} ms (HTTP {timings['first_status']})")
+    if 'load_workflow_ms' in timings:
+        print(f"Carregar workflow (LLM): {timings['load_workflow_ms']:8.1f} ms")
+    print(f"Módulos importados:      {len(modules):8d}")
+    print("=" * 60)
+    print(f"{'cumulativo (ms)':>16} {'próprio (ms)':>13}  módulo")
+    for m in top_level[:top]:
+        print(f"{m['cumulative_us'] / 1000:16.1f} {m['self_us'] / 1000:13.1f}  {m['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil do tempo de arranque da aplicação")
+    parser.add_argument('--with-workflow', action='store_true',
+                        help='Mede também o carregamento do stack LLM/PDF')
+    parser.add_argument('--top', type=int, default=15, help='Número de módulos a mostrar')
+    parser.add_argument('--json', action='store_true', help='Escreve o resultado em JSON')
+    args = parser.parse_args()
+
+    timings = run_probe(with_workflow=args.with_workflow)
+    if args.json:
+        print(json.dumps(timings, indent=2))
+    else:
+        print_report(timings, top=args.top)
+
+
+if __name__ == '__main__':
+    main()
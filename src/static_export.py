@@ -0,0 +1,331 @@
+"""
+Exportação dos websites gerados como sites estáticos
+
+Cada currículo é escrito numa pasta autónoma (export/<token>/) com o HTML já
+renderizado, o CSS/JS com hash (src/build_assets.py), as fontes, a foto
+otimizada (nome com hash) e cópias pré-comprimidas
+.gz/.br, para ser servido pelo nginx ou por qualquer alojamento estático sem
+passar pelo Flask. A exportação é incremental: um manifesto guarda a impressão
+digital de cada site e só os que mudaram são reescritos.
+
+Uso:
+    python -m src.static_export
+    python -m src.static_export --out /var/www/cv --template spa --force
+
+nginx:
+    location /cv/ { root /var/www; gzip_static on; brotli_static on; }
+"""
+import os
+import io
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+from typing import Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from src.storage import get_storage
+from src.site_renderer import build_template_context, template_file
+from src.build_assets import STATIC_FOLDER, DIST_FOLDER, FONTS_FOLDER, load_asset_manifest
+
+
+TEMPLATES_FOLDER = 'templates'
+UPLOAD_FOLDER = 'uploads'
+EXPORT_FOLDER = 'export'
+MANIFEST_NAME = 'manifest.json'
+# Alterar obriga a reexportar todos os sites
+EXPORT_VERSION = '1'
+PHOTO_MAX_SIZE = 400
+# Ficheiros de texto que recebem cópias pré-comprimidas
+COMPRESSIBLE_SUFFIXES = ('.html', '.css', '.js', '.svg', '.json')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _photo_source(entry: Dict) -> Optional[Tuple[str, bytes]]:
+    """Nome e conteúdo da foto original no armazenamento (None se não existir)"""
+    photo = entry.get('resume_data', {}).get('profile_photo') or entry.get('profile_photo')
+    if not photo:
+        return None
+    data = get_storage().get_bytes(f"{UPLOAD_FOLDER}/{photo}")
+    return (photo, data) if data is not None else None
+
+
+def site_fingerprint(entry: Dict, template: str) -> str:
+    """Impressão digital de tudo o que influencia o site exportado"""
+    digest = hashlib.sha256()
+    digest.update(EXPORT_VERSION.encode())
+    digest.update(template_file(template).encode())
+    digest.update(json.dumps(entry.get('resume_data', {}), sort_keys=True, ensure_ascii=False).encode('utf-8'))
+
+    with open(os.path.join(TEMPLATES_FOLDER, template_file(template)), 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps(load_asset_manifest(), sort_keys=True).encode())
+
+    photo = _photo_source(entry)
+    if photo:
+        digest.update(photo[1])
+    return digest.hexdigest()
+
+
+def create_environment() -> Environment:
+    """Ambiente Jinja independente do Flask (mesmo autoescape que o Flask)"""
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_FOLDER),
+        autoescape=select_autoescape(['html']),
+    )
+
+
+def optimize_photo(source: Tuple[str, bytes], out_dir: str) -> str:
+    """
+    Redimensiona a foto e grava-a em WebP com o hash no nome
+
+    Sem Pillow, copia o original (também com hash no nome).
+
+    Returns:
+        Nome do ficheiro gravado em out_dir
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(source[1])) as image:
+            image.thumbnail((PHOTO_MAX_SIZE, PHOTO_MAX_SIZE))
+            buffer = io.BytesIO()
+            image.convert('RGB').save(buffer, 'WEBP', quality=80, method=6)
+        data, extension = buffer.getvalue(), 'webp'
+    except ImportError:
+        data = source[1]
+        extension = source[0].rsplit('.', 1)[-1].lower()
+
+    filename = f"photo.{_sha256(data)[:12]}.{extension}"
+    with open(os.path.join(out_dir, filename), 'wb') as f:
+        f.write(data)
+    return filename
+
+
+def precompress(path: str):
+    """Grava path.gz (e path.br se o módulo brotli estiver instalado)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # mtime=0 para que o .gz seja idêntico entre exportações
+    with open(f"{path}.gz", 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f"{path}.br", 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def _asset_copier(out_dir: str):
+    """asset_url para a exportação: copia o asset para out_dir/assets/ e devolve o caminho relativo"""
+    manifest = load_asset_manifest()
+
+    def asset_url(path):
+        built = manifest.get(path)
+        source = os.path.join(DIST_FOLDER, built) if built else os.path.join(STATIC_FOLDER, path)
+        name = built or os.path.basename(path)
+        os.makedirs(os.path.join(out_dir, 'assets'), exist_ok=True)
+        shutil.copyfile(source, os.path.join(out_dir, 'assets', name))
+
+        # fonts.css aponta para ../fonts/*.woff2
+        if path == 'site/fonts.css' and os.path.isdir(FONTS_FOLDER):
+            os.makedirs(os.path.join(out_dir, 'fonts'), exist_ok=True)
+            for font in os.listdir(FONTS_FOLDER):
+                if font.endswith('.woff2'):
+                    shutil.copyfile(os.path.join(FONTS_FOLDER, font), os.path.join(out_dir, 'fonts', font))
+        return f"assets/{name}"
+
+    return asset_url
+
+
+def render_site(entry: Dict, template: str, photo_filename: Optional[str],
+                env: Optional[Environment] = None, out_dir: Optional[str] = None) -> str:
+    """Renderiza o HTML do website com URLs relativos à pasta exportada"""
+    env = env or create_environment()
+
+    def url_for(endpoint, **values):
+        if endpoint == 'uploaded_photo':
+            return photo_filename or ''
+        if endpoint == 'static':
+            return f"/static/{values.get('filename', '')}"
+        return '#'
+
+    context = build_template_context(entry.get('resume_data', {}), template)
+    if not photo_filename:
+        context['profile_photo'] = None
+    asset_url = _asset_copier(out_dir) if out_dir else (lambda path: f"/static/{path}")
+    return env.get_template(template_file(template)).render(url_for=url_for, asset_url=asset_url, **context)
+
+
+def export_site(entry: Dict, out_root: str = EXPORT_FOLDER, template: Optional[str] = None,
+                env: Optional[Environment] = None) -> str:
+    """
+    Exporta um currículo para out_root/<token>/ (substituição atómica da pasta)
+
+    Returns:
+        Caminho da pasta exportada
+    """
+    template = template or entry.get('template', 'simple')
+    token = entry['access_token']
+    site_dir = os.path.join(out_root, token)
+    tmp_dir = os.path.join(out_root, f".{token}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    photo = _photo_source(entry)
+    photo_filename = optimize_photo(photo, tmp_dir) if photo else None
+
+    index_path = os.path.join(tmp_dir, 'index.html')
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(render_site(entry, template, photo_filename, env, out_dir=tmp_dir))
+
+    for folder, _, files in os.walk(tmp_dir):
+        for name in files:
+            if name.endswith(COMPRESSIBLE_SUFFIXES):
+                precompress(os.path.join(folder, name))
+
+    # Troca a pasta antiga pela nova
+    old_dir = os.path.join(out_root, f".{token}.old")
+    if os.path.exists(site_dir):
+        os.replace(site_dir, old_dir)
+    os.replace(tmp_dir, site_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return site_dir
+
+
+def remove_site(token: str, out_root: str = EXPORT_FOLDER):
+    """Remove o site exportado de um currículo e a entrada no manifesto"""
+    shutil.rmtree(os.path.join(out_root, token), ignore_errors=True)
+    with manifest_lock(out_root):
+        manifest = load_manifest(out_root)
+        if manifest.pop(token, None) is not None:
+            save_manifest(out_root, manifest)
+
+
+def manifest_lock(out_root: str):
+    """
+    Lock do ciclo ler-alterar-gravar do manifesto (workers da aplicação, reprocess, CLI)
+
+    A chave fica em data/ (o ficheiro .lock não deve ser publicado com os
+    sites) e identifica a pasta de destino pelo caminho absoluto.
+    """
+    folder_id = hashlib.sha256(os.path.abspath(out_root).encode()).hexdigest()[:12]
+    return get_storage().lock(f"data/static_export-{folder_id}")
+
+
+def load_manifest(out_root: str) -> Dict[str, str]:
+    path = os.path.join(out_root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(out_root: str, manifest: Dict[str, str]):
+    os.makedirs(out_root, exist_ok=True)
+    path = os.path.join(out_root, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def export_entry(entry: Dict, out_root: str = EXPORT_FOLDER, force: bool = False,
+                 template: Optional[str] = None) -> bool:
+    """
+    Exporta um currículo só se mudou desde a última exportação
+
+    Returns:
+        True se o site foi (re)escrito
+    """
+    template = template or entry.get('template', 'simple')
+    fingerprint = site_fingerprint(entry, template)
+    manifest = load_manifest(out_root)
+    token = entry['access_token']
+
+    if not force and manifest.get(token) == fingerprint and os.path.isdir(os.path.join(out_root, token)):
+        return False
+
+    export_site(entry, out_root, template)
+    with manifest_lock(out_root):
+        manifest = load_manifest(out_root)
+        manifest[token] = fingerprint
+        save_manifest(out_root, manifest)
+    return True
+
+
+def export_all(metadata, out_root: str = EXPORT_FOLDER, force: bool = False,
+               template: Optional[str] = None) -> Dict[str, int]:
+    """
+    Exporta todos os currículos alterados e remove os que já não existem
+
+    Returns:
+        Dict com contagens exported, unchanged e removed
+    """
+    os.makedirs(out_root, exist_ok=True)
+    manifest = load_manifest(out_root)
+    env = create_environment()
+    stats = {'exported': 0, 'unchanged': 0, 'removed': 0}
+
+    tokens, exported = set(), {}
+    for entry in metadata:
+        token = entry.get('access_token')
+        if not token:
+            continue
+        tokens.add(token)
+        entry_template = template or entry.get('template', 'simple')
+        fingerprint = site_fingerprint(entry, entry_template)
+
+        if not force and manifest.get(token) == fingerprint and os.path.isdir(os.path.join(out_root, token)):
+            stats['unchanged'] += 1
+            continue
+
+        export_site(entry, out_root, entry_template, env)
+        exported[token] = fingerprint
+        stats['exported'] += 1
+        print(f"✓ {entry.get('username')} → {os.path.join(out_root, token)}")
+
+    removed = set(manifest) - tokens
+    for token in removed:
+        shutil.rmtree(os.path.join(out_root, token), ignore_errors=True)
+        stats['removed'] += 1
+
+    # Só as alterações desta execução: o manifesto é relido sob lock para não
+    # perder as exportações feitas entretanto pela aplicação
+    with manifest_lock(out_root):
+        manifest = load_manifest(out_root)
+        manifest.update(exported)
+        for token in removed:
+            manifest.pop(token, None)
+        save_manifest(out_root, manifest)
+    return stats
+
+
+def main():
+    from src.metadata_store import load_metadata
+
+    parser = argparse.ArgumentParser(description="Exporta os websites gerados como sites estáticos")
+    parser.add_argument('--out', default=EXPORT_FOLDER, help=f'Pasta de destino (default: {EXPORT_FOLDER})')
+    parser.add_argument('--template', choices=['simple', 'spa', 'corporativo'],
+                        help='Força um template para todos os sites')
+    parser.add_argument('--force', action='store_true', help='Reexporta mesmo os sites sem alterações')
+    args = parser.parse_args()
+
+    stats = export_all(load_metadata(), args.out, force=args.force, template=args.template)
+    print(f"\n✅ {stats['exported']} exportado(s), {stats['unchanged']} sem alterações, "
+          f"{stats['removed']} removido(s)")
+    if brotli is None:
+        print("ℹ️  Módulo brotli não instalado - só foram geradas cópias .gz")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Armazenamento dos PDFs, fotos e metadados
+
+Os ficheiros são identificados por chaves com o mesmo formato dos caminhos
+locais ('uploads/<pdf>', 'uploads/photos/<foto>', 'data/curriculos.json').
+
+- LocalStorage: pasta local (por omissão o diretório da aplicação, ou seja, o
+  disco do Render como até aqui)
+- S3Storage: bucket S3 ou compatível (MinIO, R2, ...), partilhado por várias
+  instâncias da aplicação. Leituras e escritas em streaming, downloads servidos
+  por redirect para um URL pré-assinado e lock por objeto com escrita
+  condicional (If-None-Match), para o ciclo ler-alterar-gravar dos metadados.
+
+O backend é escolhido por variáveis de ambiente (também lidas pelos scripts
+em src/):
+
+    STORAGE_BACKEND=s3
+    S3_BUCKET=curriculos
+    S3_PREFIX=prod/                       # opcional
+    S3_ENDPOINT_URL=http://localhost:9000 # opcional (MinIO)
+    S3_REGION=eu-west-1                   # opcional
+    AWS_ACCESS_KEY_ID=... AWS_SECRET_ACCESS_KEY=...
+"""
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+import mimetypes
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (desenvolvimento local): só há lock entre threads do mesmo processo
+    fcntl = None
+
+
+PRESIGN_EXPIRES = 3600
+# Um lock S3 mais antigo do que isto é de um processo que morreu a meio
+S3_LOCK_TTL = 30
+S3_LOCK_TIMEOUT = 60
+
+
+class LocalStorage:
+    """Ficheiros numa pasta local"""
+
+    is_local = True
+
+    def __init__(self, root: str = '.'):
+        self.root = root
+        self._thread_lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def is_stored_at(self, key: str, local_path: str) -> bool:
+        """True se o ficheiro local já é o próprio ficheiro guardado"""
+        return os.path.abspath(self.path(key)) == os.path.abspath(local_path)
+
+    def put_file(self, key: str, local_path: str):
+        """Guarda uma cópia de um ficheiro local"""
+        if self.is_stored_at(key, local_path):
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(local_path, path)
+
+    def put_bytes(self, key: str, data: bytes):
+        """Escrita atómica (ficheiro temporário + fsync + rename)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def open(self, key: str) -> IO[bytes]:
+        return open(self.path(key), 'rb')
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def list_files(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        """(chave, bytes, data de modificação) de todos os ficheiros abaixo de prefix"""
+        base = self.path(prefix)
+        for folder, _, files in os.walk(base):
+            for name in files:
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                relative = os.path.relpath(path, base).replace(os.sep, '/')
+                yield f"{prefix.rstrip('/')}/{relative}", stat.st_size, stat.st_mtime
+
+    def send(self, key: str, mimetype: Optional[str] = None):
+        """Resposta Flask com o ficheiro"""
+        from flask import send_from_directory
+        folder, _, filename = self.path(key).rpartition(os.sep)
+        return send_from_directory(folder, filename, mimetype=mimetype)
+
+    @contextmanager
+    def local_path(self, key: str):
+        """Caminho local do ficheiro (para bibliotecas que precisam de um path)"""
+        yield self.path(key)
+
+    @contextmanager
+    def lock(self, key: str):
+        """Lock exclusivo associado à chave, entre threads e entre processos"""
+        path = f"{self.path(key)}.lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fcntl is None:
+            with self._thread_lock:
+                yield
+            return
+        # flock é por descritor: também exclui threads do mesmo processo
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class S3Storage:
+    """Objetos num bucket S3 ou compatível"""
+
+    is_local = False
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, presign_expires: int = PRESIGN_EXPIRES):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requer o boto3: pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_expires = presign_expires
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _is_status(error, *statuses) -> bool:
+        return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') in statuses
+
+    def is_stored_at(self, key: str, local_path: str) -> bool:
+        return False
+
+    def put_file(self, key: str, local_path: str):
+        """Envia um ficheiro local em streaming (multipart nos grandes)"""
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        self.client.upload_file(local_path, self.bucket, self._key(key),
+                                ExtraArgs={'ContentType': content_type})
+
+    def put_bytes(self, key: str, data: bytes):
+        # PUT de um objeto é atómico: os leitores veem o antigo ou o novo
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        body = self.open(key)
+        if body is None:
+            return None
+        with body:
+            return body.read()
+
+    def open(self, key: str):
+        """Corpo do objeto em streaming (None se não existir)"""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        except ClientError as e:
+            if self._is_status(e, 404):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if self._is_status(e, 404):
+                return False
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list_files(self, prefix: str) -> Iterator[Tuple[str, int, float]]:
+        """(chave, bytes, data de modificação) de todos os objetos abaixo de prefix"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix.rstrip('/') + '/')):
+            for obj in page.get('Contents', []):
+                yield obj['Key'][len(self.prefix):], obj['Size'], obj['LastModified'].timestamp()
+
+    def url(self, key: str, mimetype: Optional[str] = None) -> str:
+        """URL pré-assinado para o browser descarregar o objeto diretamente"""
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.presign_expires)
+
+    def send(self, key: str, mimetype: Optional[str] = None):
+        """Redirect para o URL pré-assinado (o ficheiro não passa pela aplicação)"""
+        from flask import redirect
+        return redirect(self.url(key, mimetype), code=302)
+
+    @contextmanager
+    def local_path(self, key: str):
+        """Descarrega o objeto para um ficheiro temporário, apagado no fim"""
+        suffix = os.path.splitext(key)[1]
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.client.download_fileobj(self.bucket, self._key(key), f)
+            yield path
+        finally:
+            os.remove(path)
+
+    @contextmanager
+    def lock(self, key: str):
+        """
+        Lock entre instâncias: cria <chave>.lock só se não existir (If-None-Match)
+
+        Um lock com mais de S3_LOCK_TTL segundos é considerado abandonado. O
+        objeto guarda um identificador do dono: se o lock expirou e outra
+        instância o obteve entretanto, a libertação não apaga o lock dela.
+        """
+        from botocore.exceptions import ClientError
+
+        lock_key = self._key(f"{key}.lock")
+        owner = uuid.uuid4().hex.encode()
+        deadline = time.monotonic() + S3_LOCK_TIMEOUT
+        delay = 0.05
+        while True:
+            try:
+                self.client.put_object(Bucket=self.bucket, Key=lock_key, Body=owner, IfNoneMatch='*')
+                break
+            except ClientError as e:
+                # 412: já existe; 409: outro pedido condicional em curso
+                if not self._is_status(e, 409, 412):
+                    raise
+            self._break_stale_lock(lock_key)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Não foi possível obter o lock de {key}")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+        try:
+            yield
+        finally:
+            self._release_lock(lock_key, owner)
+
+    def _delete_if_match(self, lock_key: str, etag: str) -> bool:
+        """Apaga o lock só se ainda for a versão lida (If-Match); False se mudou entretanto"""
+        from botocore.exceptions import ClientError
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=lock_key, IfMatch=etag)
+            return True
+        except ClientError as e:
+            # 404: já não existe; 412: foi recriado por outra instância
+            if self._is_status(e, 404, 412):
+                return False
+            raise
+
+    def _release_lock(self, lock_key: str, owner: bytes):
+        from botocore.exceptions import ClientError
+        try:
+            current = self.client.get_object(Bucket=self.bucket, Key=lock_key)
+        except ClientError as e:
+            if self._is_status(e, 404):
+                print(f"[WARNING] Lock {lock_key} já tinha sido removido (expirou)")
+                return
+            raise
+        if current['Body'].read() != owner:
+            print(f"[WARNING] Lock {lock_key} expirou e pertence agora a outra instância: não removido")
+            return
+        self._delete_if_match(lock_key, current['ETag'])
+
+    def _break_stale_lock(self, lock_key: str):
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=lock_key)
+        except ClientError:
+            return
+        age = time.time() - head['LastModified'].timestamp()
+        # If-Match: um lock acabado de obter por outra instância não é removido
+        if age > S3_LOCK_TTL and self._delete_if_match(lock_key, head['ETag']):
+            print(f"[WARNING] Lock abandonado removido: {lock_key} ({age:.0f}s)")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage_from_env():
+    """Cria o backend indicado pelas variáveis de ambiente (local por omissão)"""
+    backend = os.getenv('STORAGE_BACKEND', 'local').lower()
+    if backend == 's3':
+        return S3Storage(
+            bucket=os.environ['S3_BUCKET'],
+            prefix=os.getenv('S3_PREFIX', ''),
+            endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+            region=os.getenv('S3_REGION') or None,
+            presign_expires=int(os.getenv('S3_PRESIGN_EXPIRES', PRESIGN_EXPIRES)),
+        )
+    if backend != 'local':
+        raise ValueError(f"STORAGE_BACKEND desconhecido: {backend}")
+    return LocalStorage(os.getenv('STORAGE_ROOT', '.'))
+
+
+def get_storage():
+    """Backend de armazenamento em uso (criado na primeira chamada)"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage_from_env()
+    return _storage
+
+
+def configure(storage):
+    """Substitui o backend em uso (usado pelo teste de stress)"""
+    global _storage
+    _storage = storage
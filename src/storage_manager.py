@@ -0,0 +1,336 @@
+"""
+Contabilidade, limpeza e quota do armazenamento dos uploads
+
+O disco do Render (render.yaml) tem 1 GB para uploads/. Até aqui só o PDF era
+removido ao eliminar um currículo; a foto de perfil ficava, tal como as
+fotos e PDFs de uploads que falharam a meio e os temporários de uploads
+interrompidos. Este módulo:
+
+- atribui cada ficheiro de uploads/ (PDF, foto, imagens das páginas) ao
+  currículo dono e soma os bytes por currículo e por utilizador (quem fez o
+  upload, 'uploaded_by');
+- remove os ficheiros sem dono (órfãos) com mais de ORPHAN_GRACE_SECONDS (os
+  mais recentes podem ser de um upload em curso);
+- aplica a quota (QUOTA_BYTES): acima dela são eliminados os currículos mais
+  antigos até o total voltar a caber.
+
+A aplicação corre a manutenção numa thread em segundo plano (a cada
+GC_INTERVAL_SECONDS, partilhado entre workers, e depois de cada upload).
+Também pela linha de comandos:
+
+    python -m src.storage_manager                 # uso por currículo e por utilizador
+    python -m src.storage_manager --gc --quota    # limpeza e quota (--dry-run só lista)
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.storage import get_storage
+from src.pdf_preview import PREVIEW_FOLDER
+
+
+UPLOADS_PREFIX = 'uploads'
+# Ficheiros sem dono mais recentes do que isto podem ser de um upload em curso
+ORPHAN_GRACE_SECONDS = 3600
+# 0 = sem quota
+QUOTA_BYTES = 0
+GC_INTERVAL_SECONDS = 3600
+# Resultado da última manutenção (também indica aos outros workers quando correu)
+LAST_RUN_KEY = 'data/storage_gc.json'
+# Espera depois do arranque antes da primeira manutenção (não competir com o warmup)
+STARTUP_DELAY_SECONDS = 30
+
+_wakeup = threading.Event()
+
+
+def configure(quota_bytes: Optional[int] = None, grace_seconds: Optional[float] = None,
+              interval_seconds: Optional[float] = None):
+    """Altera a quota, a margem dos órfãos e o intervalo da manutenção (chamado pela aplicação)"""
+    global QUOTA_BYTES, ORPHAN_GRACE_SECONDS, GC_INTERVAL_SECONDS
+    if quota_bytes is not None:
+        QUOTA_BYTES = quota_bytes
+    if grace_seconds is not None:
+        ORPHAN_GRACE_SECONDS = grace_seconds
+    if interval_seconds is not None:
+        GC_INTERVAL_SECONDS = interval_seconds
+
+
+def entry_keys(entry: Dict) -> List[str]:
+    """Chaves do PDF e da foto de um currículo (as imagens das páginas estão em PREVIEW_FOLDER/<pdf>/)"""
+    keys = [f"{UPLOADS_PREFIX}/{entry['filename']}"]
+    if entry.get('profile_photo'):
+        keys.append(f"{UPLOADS_PREFIX}/{entry['profile_photo']}")
+    return keys
+
+
+def _owner_of(key: str, owners: Dict[str, Dict]) -> Optional[Dict]:
+    if key.startswith(f"{PREVIEW_FOLDER}/"):
+        pdf = key[len(PREVIEW_FOLDER) + 1:].split('/', 1)[0]
+        return owners.get(f"{UPLOADS_PREFIX}/{pdf}")
+    return owners.get(key)
+
+
+def scan(metadata: Optional[List[Dict]] = None) -> Dict:
+    """
+    Percorre uploads/ e atribui cada ficheiro ao currículo dono
+
+    Returns:
+        Dict com 'total_bytes', 'per_entry' (bytes por access_token) e
+        'orphans' (lista de (chave, bytes, data de modificação))
+    """
+    if metadata is None:
+        from src.metadata_store import load_metadata
+        metadata = load_metadata()
+
+    owners = {}
+    for entry in metadata:
+        for key in entry_keys(entry):
+            owners[key] = entry
+
+    total = 0
+    per_entry = {entry['access_token']: 0 for entry in metadata}
+    orphans = []
+    for key, size, mtime in get_storage().list_files(UPLOADS_PREFIX):
+        total += size
+        owner = _owner_of(key, owners)
+        if owner is None:
+            orphans.append((key, size, mtime))
+        else:
+            per_entry[owner['access_token']] += size
+    return {'total_bytes': total, 'per_entry': per_entry, 'orphans': orphans}
+
+
+def usage_report(metadata: Optional[List[Dict]] = None) -> Dict:
+    """Bytes usados no total, por currículo e por utilizador, e órfãos"""
+    if metadata is None:
+        from src.metadata_store import load_metadata
+        metadata = load_metadata()
+    result = scan(metadata)
+
+    per_user = {}
+    per_resume = []
+    for entry in metadata:
+        size = result['per_entry'][entry['access_token']]
+        user = entry.get('uploaded_by') or '-'
+        per_user[user] = per_user.get(user, 0) + size
+        per_resume.append({
+            'id': entry.get('id'),
+            'token': entry['access_token'][:8],
+            'username': entry.get('username'),
+            'uploaded_by': entry.get('uploaded_by'),
+            'upload_date': entry.get('upload_date'),
+            'bytes': size,
+        })
+    per_resume.sort(key=lambda item: item['bytes'], reverse=True)
+
+    return {
+        'total_bytes': result['total_bytes'],
+        'quota_bytes': QUOTA_BYTES or None,
+        'orphan_files': len(result['orphans']),
+        'orphan_bytes': sum(size for _, size, _ in result['orphans']),
+        'per_user': dict(sorted(per_user.items(), key=lambda item: item[1], reverse=True)),
+        'per_resume': per_resume,
+    }
+
+
+def delete_entry_files(entry: Dict):
+    """Remove o PDF, a foto e as imagens das páginas de um currículo"""
+    from src.pdf_preview import delete_previews
+
+    storage = get_storage()
+    for key in entry_keys(entry):
+        storage.delete(key)
+    delete_previews(entry['filename'], entry.get('preview_pages', 0))
+
+
+def purge_entry(entry: Dict, static_export_folder: Optional[str] = None):
+    """Remove tudo o que pertence a um currículo já retirado dos metadados"""
+    from src.resume_versions import delete_version_record
+
+    delete_entry_files(entry)
+    delete_version_record(entry['access_token'])
+    if static_export_folder:
+        from src.static_export import remove_site
+        remove_site(entry['access_token'], static_export_folder)
+
+
+def _remove_empty_preview_folders():
+    storage = get_storage()
+    if not storage.is_local:
+        return
+    root = storage.path(PREVIEW_FOLDER)
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        folder = os.path.join(root, name)
+        if os.path.isdir(folder) and not os.listdir(folder):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                # Um upload acabou de lá escrever
+                pass
+
+
+def collect_garbage(metadata: Optional[List[Dict]] = None, dry_run: bool = False) -> Dict:
+    """
+    Remove os ficheiros de uploads/ que não pertencem a nenhum currículo
+
+    Returns:
+        Dict com 'files' e 'bytes' removidos (ou a remover, com dry_run)
+    """
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    storage = get_storage()
+    files = freed = 0
+    for key, size, mtime in scan(metadata)['orphans']:
+        if mtime > cutoff:
+            continue
+        if dry_run:
+            print(f"   órfão: {key} ({size} bytes)")
+        else:
+            storage.delete(key)
+        files += 1
+        freed += size
+    if not dry_run:
+        _remove_empty_preview_folders()
+    if files:
+        print(f"[DEBUG] Armazenamento: {files} ficheiro(s) órfão(s), {freed / 1024 / 1024:.1f} MB")
+    return {'files': files, 'bytes': freed}
+
+
+def enforce_quota(static_export_folder: Optional[str] = None, dry_run: bool = False) -> Dict:
+    """
+    Elimina os currículos mais antigos enquanto o uso estiver acima de QUOTA_BYTES
+
+    Currículos carregados há menos de ORPHAN_GRACE_SECONDS nunca são eliminados.
+
+    Returns:
+        Dict com 'evicted' (tokens abreviados) e 'bytes' libertados
+    """
+    from src.metadata_store import load_metadata, update_metadata
+    from src import search_index
+
+    if not QUOTA_BYTES:
+        return {'evicted': [], 'bytes': 0}
+
+    metadata = load_metadata()
+    result = scan(metadata)
+    excess = result['total_bytes'] - QUOTA_BYTES
+    if excess <= 0:
+        return {'evicted': [], 'bytes': 0}
+
+    recent = datetime.fromtimestamp(time.time() - ORPHAN_GRACE_SECONDS).isoformat()
+    candidates = sorted(
+        (entry for entry in metadata if entry.get('upload_date', '') < recent),
+        key=lambda entry: entry.get('upload_date', '')
+    )
+    chosen = []
+    for entry in candidates:
+        if excess <= 0:
+            break
+        chosen.append(entry)
+        excess -= result['per_entry'][entry['access_token']]
+    if excess > 0:
+        print(f"[WARNING] Quota de armazenamento excedida em {excess / 1024 / 1024:.1f} MB "
+              f"mesmo eliminando os currículos antigos")
+
+    freed = sum(result['per_entry'][entry['access_token']] for entry in chosen)
+    if dry_run or not chosen:
+        return {'evicted': [entry['access_token'][:8] for entry in chosen], 'bytes': freed}
+
+    # Só elimina as entradas que não mudaram entretanto (nova versão com outro PDF)
+    tokens = {entry['access_token']: entry['filename'] for entry in chosen}
+    with update_metadata() as current:
+        evicted = [entry for entry in current if tokens.get(entry['access_token']) == entry['filename']]
+        evicted_tokens = {entry['access_token'] for entry in evicted}
+        current[:] = [entry for entry in current if entry['access_token'] not in evicted_tokens]
+
+    for entry in evicted:
+        search_index.remove_entry(entry.get('id'))
+        purge_entry(entry, static_export_folder)
+        print(f"[DEBUG] Quota: currículo {entry['access_token'][:8]} ({entry.get('upload_date')}) eliminado")
+    return {'evicted': [entry['access_token'][:8] for entry in evicted], 'bytes': freed}
+
+
+def run_maintenance(static_export_folder: Optional[str] = None) -> Dict:
+    """Limpeza dos órfãos seguida da quota; o resultado fica em LAST_RUN_KEY"""
+    storage = get_storage()
+    with storage.lock(LAST_RUN_KEY):
+        started = time.time()
+        report = {
+            'garbage': collect_garbage(),
+            'quota': enforce_quota(static_export_folder),
+            'finished_at': time.time(),
+        }
+        report['seconds'] = round(report['finished_at'] - started, 3)
+        storage.put_bytes(LAST_RUN_KEY, json.dumps(report).encode('utf-8'))
+    return report
+
+
+def last_run() -> Optional[Dict]:
+    data = get_storage().get_bytes(LAST_RUN_KEY)
+    return json.loads(data) if data else None
+
+
+def request_maintenance():
+    """Pede uma manutenção já (p.ex. depois de um upload) à thread em segundo plano"""
+    _wakeup.set()
+
+
+def start_maintenance_thread(static_export_folder: Optional[str] = None) -> threading.Thread:
+    """
+    Thread que corre a manutenção a cada GC_INTERVAL_SECONDS ou quando pedida
+
+    Com vários workers, a manutenção periódica é saltada se outro worker a
+    correu há menos de metade do intervalo.
+    """
+    def loop():
+        requested = _wakeup.wait(STARTUP_DELAY_SECONDS)
+        while True:
+            _wakeup.clear()
+            try:
+                previous = last_run()
+                due = not previous or time.time() - previous['finished_at'] > GC_INTERVAL_SECONDS / 2
+                if requested or due:
+                    run_maintenance(static_export_folder)
+            except Exception as e:
+                print(f"[WARNING] Erro na manutenção do armazenamento: {e}")
+            requested = _wakeup.wait(GC_INTERVAL_SECONDS)
+
+    thread = threading.Thread(target=loop, name='storage-maintenance', daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uso, limpeza e quota do armazenamento dos uploads")
+    parser.add_argument('--gc', action='store_true', help='Remove os ficheiros órfãos')
+    parser.add_argument('--quota', action='store_true', help='Aplica a quota (elimina os currículos mais antigos)')
+    parser.add_argument('--quota-mb', type=int, help='Quota em MB (por omissão storage_quota_mb do config.json)')
+    parser.add_argument('--grace-minutes', type=int, help='Idade mínima de um órfão para ser removido')
+    parser.add_argument('--dry-run', action='store_true', help='Só lista o que seria removido')
+    args = parser.parse_args()
+
+    app_config = {}
+    if os.path.exists('config.json'):
+        with open('config.json', 'r', encoding='utf-8') as f:
+            app_config = json.load(f).get('app', {})
+    quota_mb = args.quota_mb if args.quota_mb is not None else app_config.get('storage_quota_mb', 0)
+    configure(quota_bytes=quota_mb * 1024 * 1024,
+              grace_seconds=args.grace_minutes * 60 if args.grace_minutes is not None else None)
+
+    if args.gc:
+        result = collect_garbage(dry_run=args.dry_run)
+        print(f"🗑️  Órfãos: {result['files']} ficheiro(s), {result['bytes'] / 1024 / 1024:.1f} MB")
+    if args.quota:
+        result = enforce_quota(app_config.get('static_export_folder'), dry_run=args.dry_run)
+        print(f"📦 Quota: {len(result['evicted'])} currículo(s) eliminado(s), "
+              f"{result['bytes'] / 1024 / 1024:.1f} MB {' '.join(result['evicted'])}")
+    print(json.dumps(usage_report(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Cache de bytecode e pré-compilação dos templates Jinja
+
+Cada worker do gunicorn compila os templates na primeira vez que os usa. Com
+o FileSystemBytecodeCache, o código compilado fica em data/jinja_cache/ e é
+partilhado por todos os workers (e entre deploys, enquanto o template não
+mudar - a chave inclui o checksum da fonte). precompile_templates() carrega
+todos os templates no arranque, para o primeiro visitante de cada worker não
+pagar a compilação.
+
+Uso:
+    python -m src.template_cache             # pré-compila (passo de build)
+    python -m src.template_cache --measure   # primeira renderização vs. a quente
+"""
+import os
+import time
+import argparse
+import statistics
+from typing import Dict, List
+
+from jinja2 import ChainableUndefined, Environment, FileSystemBytecodeCache
+
+
+BYTECODE_CACHE_FOLDER = os.path.join('data', 'jinja_cache')
+
+
+def create_bytecode_cache(folder: str = BYTECODE_CACHE_FOLDER) -> FileSystemBytecodeCache:
+    """Cache de bytecode em disco (escrita atómica, segura entre processos)"""
+    os.makedirs(folder, exist_ok=True)
+    return FileSystemBytecodeCache(folder)
+
+
+def precompile_templates(env: Environment) -> List[str]:
+    """
+    Carrega todos os templates HTML no ambiente (compila ou lê do bytecode cache)
+
+    Returns:
+        Nomes dos templates carregados
+    """
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+# === MEDIÇÃO ===
+SAMPLE_RESUME = {
+    'full_name': 'Maria Silva',
+    'professional_title': 'Engenheira de Software',
+    'email': 'maria@example.com',
+    'phone': '+351 912 345 678',
+    'location': 'Lisboa',
+    'about_summary': 'Engenheira com 8 anos de experiência em sistemas distribuídos.',
+    'experience_summary': 'Backend e infraestrutura.',
+    'experience_items': [
+        {'company': 'Empresa A', 'position': 'Tech Lead', 'period': '2020 - Atual',
+         'description': 'Liderança da equipa de plataforma.'},
+        {'company': 'Empresa B', 'position': 'Developer', 'period': '2016 - 2020',
+         'description': 'APIs em Python.'},
+    ],
+    'education_items': [
+        {'institution': 'Universidade de Lisboa', 'degree': 'Mestrado em Informática', 'period': '2014 - 2016'},
+    ],
+    'skills': ['Python', 'Flask', 'PostgreSQL', 'Docker'],
+    'languages': ['Português', 'Inglês'],
+    'projects': [{'name': 'GenerateCurriculo', 'description': 'Websites a partir de CVs.'}],
+    'color_primary': '#2563eb',
+    'color_secondary': '#1e40af',
+    'color_gradient': 'linear-gradient(135deg, #2563eb 0%, #1e40af 100%)',
+}
+
+SAMPLE_ENTRY = {
+    'id': 1,
+    'username': 'Maria Silva',
+    'filename': 'exemplo.pdf',
+    'original_filename': 'cv.pdf',
+    'upload_date': '2026-01-01T00:00:00',
+    'access_token': 'exemplo',
+    'template': 'simple',
+    'resume_data': SAMPLE_RESUME,
+}
+
+
+def sample_context(name: str) -> Dict:
+    """Contexto de exemplo para renderizar cada template"""
+    from src.site_renderer import WEBSITE_TEMPLATES, build_template_context
+
+    for template, filename in WEBSITE_TEMPLATES.items():
+        if filename == name:
+            return build_template_context(SAMPLE_RESUME, template)
+    return {'curriculos': [SAMPLE_ENTRY], 'curriculo': SAMPLE_ENTRY}
+
+
+def measure(app, repeat: int = 20) -> List[Dict]:
+    """
+    Mede, por template, a primeira renderização sem cache, a primeira com o
+    bytecode cache em disco (novo worker após o deploy) e a renderização a quente
+
+    Returns:
+        Lista de dicts com template, cold_ms, bytecode_ms e warm_ms
+    """
+    import tempfile
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder, app.test_request_context('/'):
+        def fresh_env(bytecode_cache=None):
+            env = app.create_jinja_environment()
+            # Globais registados com @app.template_global (asset_url, ...)
+            env.globals.update(app.jinja_env.globals)
+            env.bytecode_cache = bytecode_cache
+            # Variáveis em falta no contexto de exemplo não interrompem a medição
+            env.undefined = ChainableUndefined
+            return env
+
+        # Popula o bytecode cache temporário
+        precompile_templates(fresh_env(FileSystemBytecodeCache(folder)))
+
+        for name in fresh_env().list_templates(extensions=['html']):
+            context = sample_context(name)
+
+            env = fresh_env()
+            t0 = time.perf_counter()
+            template = env.get_template(name)
+            template.render(**context)
+            cold_ms = (time.perf_counter() - t0) * 1000
+
+            env = fresh_env(FileSystemBytecodeCache(folder))
+            t0 = time.perf_counter()
+            env.get_template(name).render(**context)
+            bytecode_ms = (time.perf_counter() - t0) * 1000
+
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                template.render(**context)
+                timings.append((time.perf_counter() - t0) * 1000)
+
+            results.append({
+                'template': name,
+                'cold_ms': cold_ms,
+                'bytecode_ms': bytecode_ms,
+                'warm_ms': statistics.median(timings),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-compila os templates Jinja para o bytecode cache")
+    parser.add_argument('--measure', action='store_true',
+                        help='Mede a primeira renderização vs. a renderização a quente por template')
+    parser.add_argument('--repeat', type=int, default=20, help='Renderizações a quente por template (default: 20)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('STARTUP_PROFILE', '1')
+    from app import app
+
+    if args.measure:
+        results = measure(app, args.repeat)
+        print(f"{'template':<28}{'sem cache':>12}{'bytecode':>12}{'a quente':>12}")
+        for row in results:
+            print(f"{row['template']:<28}{row['cold_ms']:>10.2f}ms{row['bytecode_ms']:>10.2f}ms"
+                  f"{row['warm_ms']:>10.2f}ms")
+        return
+
+    names = precompile_templates(app.jinja_env)
+    print(f"✅ {len(names)} template(s) compilado(s) em {BYTECODE_CACHE_FOLDER}")
+
+
+if __name__ == '__main__':
+    main()
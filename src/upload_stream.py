@@ -0,0 +1,166 @@
+"""
+Receção de uploads PDF em streaming
+
+O corpo multipart é escrito em blocos para um ficheiro temporário na pasta de
+uploads. Enquanto os blocos chegam calcula-se o hash SHA-256 do conteúdo,
+verifica-se a assinatura %PDF e contam-se os objetos /Type /Page visíveis, para
+rejeitar ficheiros inválidos ou enormes logo nos primeiros kilobytes.
+"""
+import os
+import re
+import hashlib
+import tempfile
+from werkzeug.exceptions import BadRequest
+
+
+PDF_MAGIC = b'%PDF-'
+# A especificação PDF tolera lixo antes do cabeçalho até 1024 bytes
+SNIFF_WINDOW = 1024
+# Objetos de página não comprimidos (exclui /Type /Pages)
+PAGE_OBJECT_RE = re.compile(rb'/Type\s{0,8}/Page(?![a-zA-Z])')
+# Bytes mantidos entre blocos para apanhar marcadores partidos a meio
+PAGE_MARKER_OVERLAP = 32
+
+
+class UploadRejected(BadRequest):
+    """Upload rejeitado durante a receção (não é PDF, demasiado grande, etc.)"""
+
+
+class PDFUploadStream:
+    """
+    Ficheiro de destino usado pelo parser multipart do Werkzeug para PDFs
+
+    Implementa write/seek/read como um ficheiro normal e mantém o hash e a
+    contagem de páginas atualizados à medida que os dados chegam.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = None, max_pages: int = None):
+        os.makedirs(folder, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(
+            dir=folder, prefix='.upload-', suffix='.part', delete=False
+        )
+        self.path = self._file.name
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.size = 0
+        self.page_markers = 0
+        self.num_pages = None
+        self._hash = hashlib.sha256()
+        self._head = b''
+        self._sniffed = False
+        self._tail = b''
+        self._committed = False
+
+    # --- Interface de ficheiro usada pelo Werkzeug ---
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self._reject(f'O ficheiro excede o tamanho máximo de {self.max_bytes // (1024 * 1024)}MB')
+
+        if not self._sniffed:
+            self._sniff(data)
+
+        if self.max_pages:
+            self._count_page_markers(data)
+
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if not self._sniffed:
+            # Fim do upload: o cabeçalho tem de ter aparecido
+            self._sniff(b'', final=True)
+        return self._file.seek(offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._file.readline(size)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """Fecha o ficheiro; se não foi aceite, remove o temporário"""
+        if not self._file.closed:
+            self._file.close()
+        if not self._committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # --- Validação ---
+
+    @property
+    def sha256(self) -> str:
+        """Hash SHA-256 do conteúdo recebido"""
+        return self._hash.hexdigest()
+
+    def _reject(self, message: str):
+        self.close()
+        raise UploadRejected(description=message)
+
+    def _sniff(self, data: bytes, final: bool = False):
+        self._head += data[:SNIFF_WINDOW - len(self._head)]
+        if PDF_MAGIC in self._head:
+            self._sniffed = True
+        elif final or len(self._head) >= SNIFF_WINDOW:
+            self._reject('O ficheiro enviado não é um PDF válido')
+
+    def _count_page_markers(self, data: bytes):
+        buffer = self._tail + data
+        overlap = len(self._tail)
+        # Só conta marcadores que terminam depois da sobreposição (os anteriores
+        # já foram contados) e antes do fim do bloco (o lookahead precisa de um byte)
+        for match in PAGE_OBJECT_RE.finditer(buffer):
+            if overlap <= match.end() < len(buffer):
+                self.page_markers += 1
+        self._tail = buffer[-PAGE_MARKER_OVERLAP:]
+
+        if self.page_markers > self.max_pages:
+            self._reject(f'O PDF tem demasiadas páginas (máximo {self.max_pages})')
+
+    def verify(self) -> int:
+        """
+        Confirma o número de páginas a partir da árvore de páginas do PDF
+
+        Returns:
+            Número de páginas do documento
+        """
+        self._file.flush()
+        try:
+            num_pages = count_pdf_pages(self.path)
+        except Exception:
+            self._reject('Não foi possível ler o PDF enviado')
+
+        if self.max_pages and num_pages > self.max_pages:
+            self._reject(f'O PDF tem demasiadas páginas ({num_pages}, máximo {self.max_pages})')
+        if num_pages == 0:
+            self._reject('O PDF enviado não tem páginas')
+
+        self.num_pages = num_pages
+        return num_pages
+
+    def commit(self, destination: str):
+        """Move o ficheiro temporário para o destino final (sem copiar)"""
+        self._file.flush()
+        self._file.close()
+        os.replace(self.path, destination)
+        self._committed = True
+        self.path = destination
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Lê o /Count da raiz da árvore de páginas sem processar as páginas"""
+    import pdfplumber
+    from pdfminer.pdftypes import resolve1
+
+    with pdfplumber.open(pdf_path) as pdf:
+        try:
+            pages_root = resolve1(pdf.doc.catalog['Pages'])
+            return int(resolve1(pages_root['Count']))
+        except (KeyError, TypeError, ValueError):
+            return len(pdf.pages)
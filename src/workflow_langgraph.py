@@ -1,30 +1,75 @@
 """
 Workflow LangGraph simplificado para processamento de currículos
-Extração PDF → Análise AI → Website simples com resumos
+Extração PDF → Extração determinística → Análise AI → Website simples com resumos
 """
-from typing import TypedDict, List, Dict
+from typing import TypedDict, Any, List, Dict, Callable, Optional
 from langgraph.graph import StateGraph, END
 from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, SystemMessage
 import json
-
-from src.pdf_extractor import extract_text_from_pdf
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, asynccontextmanager
+
+from src import extraction_pool, chunked_analysis
+from src.extraction_cache import file_sha256, get_cached_extraction, put_cached_extraction
+from src.deadline import Deadline
+from src import llm_cassette
+from src.llm_cache import cache_key, get_cached_response, put_cached_response
+from src.rule_extractor import extract_fast_resume_data, merge_resume_data
+from src.resume_versions import (
+    SECTION_FIELDS, hash_text, section_sources, split_outputs, join_outputs, changed_sections
+)
 
 
 # === ESTADO DO WORKFLOW ===
 class ResumeWorkflowState(TypedDict):
     """Estado compartilhado entre todos os nodes do workflow"""
     pdf_path: str
+    pdf_hash: Optional[str]
     pdf_text: str
+    fast_data: Dict
     analyzed_data: Dict
     website_structure: Dict
+    previous_version: Optional[Dict]
+    version_record: Dict
+    llm_gate: Optional[Any]
+    deadline: Optional[Deadline]
     errors: List[str]
     processing_stage: str
 
 
 # === CONFIGURAÇÃO DO LLM ===
-def get_llm(temperature: float = 0.3):
-    """Retorna instância do LLM (Ollama local ou Groq na nuvem)"""
+# Limite opcional de chamadas simultâneas ao LLM (p.ex. um Semaphore partilhado
+# entre processos no reprocessamento em massa)
+_llm_gate = None
+
+
+def set_llm_gate(gate):
+    """Define o objeto (context manager) que controla a entrada nas chamadas ao LLM"""
+    global _llm_gate
+    _llm_gate = gate
+
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+OLLAMA_MODEL = "llama3"
+LLM_TEMPERATURE = 0.3
+
+
+def llm_model_name() -> str:
+    """Provider e modelo que get_llm vai usar (faz parte da chave da cache de respostas)"""
+    import os
+    return f"groq:{GROQ_MODEL}" if os.getenv('GROQ_API_KEY') else f"ollama:{OLLAMA_MODEL}"
+
+
+def get_llm(temperature: float = LLM_TEMPERATURE, timeout: Optional[float] = None):
+    """
+    Retorna instância do LLM (Ollama local ou Groq na nuvem)
+
+    Com timeout (derivado do prazo do upload) o pedido HTTP não pode
+    ultrapassá-lo e não há novas tentativas.
+    """
     import os
 
     # Verifica se deve usar Groq (produção) ou Ollama (local)
@@ -35,42 +80,125 @@ def get_llm(temperature: float = 0.3):
         from langchain_groq import ChatGroq
         print("=" * 50)
         print("🤖 LLM: GROQ (Cloud)")
-        print(f"   Modelo: llama-3.3-70b-versatile")
+        print(f"   Modelo: {GROQ_MODEL}")
         print(f"   API Key: {groq_api_key[:8]}...{groq_api_key[-4:]}")
         print("=" * 50)
         return ChatGroq(
-            model="llama-3.3-70b-versatile",
+            model=GROQ_MODEL,
             temperature=temperature,
-            groq_api_key=groq_api_key
+            groq_api_key=groq_api_key,
+            request_timeout=timeout,
+            max_retries=0 if timeout else 2
         )
     else:
         # Usa Ollama localmente
         print("=" * 50)
         print("🤖 LLM: OLLAMA (Local)")
-        print(f"   Modelo: llama3")
+        print(f"   Modelo: {OLLAMA_MODEL}")
         print(f"   URL: http://localhost:11434")
         print("   ⚠️  GROQ_API_KEY não configurada!")
         print("=" * 50)
         return ChatOllama(
-            model="llama3",
+            model=OLLAMA_MODEL,
             temperature=temperature,
             base_url="http://localhost:11434",
-            format="json"
+            format="json",
+            client_kwargs={'timeout': timeout} if timeout else {}
         )
 
 
+# === PRAZO ===
+# Orçamento mínimo para valer a pena começar uma chamada ao LLM
+MIN_LLM_SECONDS = 5
+LLM_DEFAULT_TIMEOUT = 120
+
+
+def check_deadline(state: ResumeWorkflowState, stage: str, min_seconds: float = 0.0):
+    """Interrompe o workflow (DeadlineExceeded) se o prazo do upload expirou ou foi cancelado"""
+    deadline = state.get('deadline')
+    if deadline is not None:
+        deadline.check(stage, min_seconds)
+
+
+def invoke_llm(llm, messages, deadline: Optional[Deadline] = None) -> str:
+    """
+    Chama o LLM e devolve o texto da resposta
+
+    Com prazo, a resposta é lida em streaming e a geração é abandonada (a
+    ligação fecha-se, o Ollama/Groq param de gerar) logo que o prazo expire
+    ou o processamento seja cancelado.
+    """
+    if deadline is None:
+        return llm.invoke(messages).content
+
+    parts = []
+    stream = llm.stream(messages)
+    try:
+        for chunk in stream:
+            parts.append(chunk.content)
+            deadline.check("a geração do LLM")
+    finally:
+        stream.close()
+    return ''.join(parts)
+
+
+async def ainvoke_llm(llm, messages, deadline: Optional[Deadline] = None) -> str:
+    """
+    Versão assíncrona de invoke_llm (modo app.async_llm)
+
+    O ChatGroq e o ChatOllama usam nos métodos assíncronos os clientes httpx
+    assíncronos dos respetivos SDKs: a espera pela resposta não ocupa uma thread.
+    """
+    if deadline is None:
+        return (await llm.ainvoke(messages)).content
+
+    parts = []
+    stream = llm.astream(messages)
+    try:
+        async for chunk in stream:
+            parts.append(chunk.content)
+            deadline.check("a geração do LLM")
+    finally:
+        await stream.aclose()
+    return ''.join(parts)
+
+
 # === NODE 1: EXTRAÇÃO DE PDF ===
 def extract_pdf_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
-    """Extrai texto do PDF usando pdfplumber"""
+    """Extrai texto do PDF usando pdfplumber (no pool de extração, se ativo)"""
     print("📄 [NODE 1] Extraindo texto do PDF...")
+    check_deadline(state, "extract_pdf")
 
-    pdf_data = extract_text_from_pdf(state['pdf_path'])
+    # A cache é consultada antes de abrir o PDF
+    pdf_hash = state.get('pdf_hash') or file_sha256(state['pdf_path'])
+    pdf_data = get_cached_extraction(pdf_hash)
+
+    if pdf_data:
+        print(f"   ♻️  Extração em cache ({pdf_hash[:12]})")
+    else:
+        # Páginas iguais às da versão anterior não voltam a ser extraídas
+        previous_pages = (state.get('previous_version') or {}).get('page_texts')
+        # Num processo auxiliar com limites de CPU e memória (src/extraction_pool.py)
+        deadline = state.get('deadline')
+        pdf_data = extraction_pool.extract(
+            state['pdf_path'], previous_pages=previous_pages,
+            timeout=deadline.timeout(extraction_pool.TIMEOUT_SECONDS) if deadline else None
+        )
+        put_cached_extraction(pdf_hash, pdf_data)
 
     if not pdf_data['success']:
         state['errors'].append(f"Erro ao extrair PDF: {pdf_data.get('error')}")
         state['pdf_text'] = ""
     else:
         state['pdf_text'] = pdf_data['text']
+        state['version_record'] = {
+            'page_hashes': pdf_data['page_hashes'],
+            'page_texts': pdf_data['page_texts'],
+        }
+        if pdf_data.get('engines'):
+            print(f"   📄 Motores: {', '.join(f'{name}={count}' for name, count in pdf_data['engines'].items())}")
+        if pdf_data.get('reused_pages'):
+            print(f"   ♻️  {pdf_data['reused_pages']}/{pdf_data['num_pages']} páginas reutilizadas da versão anterior")
 
     state['processing_stage'] = "PDF extraído"
     print(f"   ✓ Extraídos {len(state['pdf_text'])} caracteres")
@@ -78,122 +206,427 @@ def extract_pdf_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
     return state
 
 
-# === NODE 2: ANÁLISE COMPLETA E RESUMOS ===
-def analyze_and_summarize_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
-    """Analisa o currículo e gera resumos de cada secção"""
-    print("🤖 [NODE 2] Analisando currículo e gerando resumos...")
+# === NODE 2: EXTRAÇÃO DETERMINÍSTICA ===
+def rule_extract_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
+    """Extrai contactos e secções sem LLM (website visível de imediato)"""
+    print("⚡ [NODE 2] Extração determinística (regex + secções)...")
+    check_deadline(state, "rule_extract")
 
-    if not state['pdf_text']:
-        state['errors'].append("Sem texto para processar")
-        state['analyzed_data'] = {}
-        return state
+    state['fast_data'] = extract_fast_resume_data(state['pdf_text'])
+
+    state['processing_stage'] = "Dados básicos extraídos"
+    print(f"   ✓ Campos preenchidos: {', '.join(state['fast_data']) or 'nenhum'}")
 
-    # Inicializa LLM (Groq ou Ollama)
-    llm = get_llm(temperature=0.3)
+    return state
 
-    system_prompt = """You are an expert resume analyzer. Extract information and create CONCISE summaries for each section.
 
-Extract the following and respond ONLY with valid JSON:
-{
-  "full_name": "string",
-  "professional_title": "string (infer from experience, NEVER null)",
-  "email": "string or null",
-  "phone": "string or null",
-  "location": "string or null",
-  "linkedin": "url or null",
-  "github": "url or null",
-  "website": "url or null",
-
-  "about_summary": "2-3 sentence professional summary highlighting key strengths and experience",
-
-  "experience_summary": "2-3 sentence summary of professional experience and key roles",
-  "experience_items": [
+# === NODE 3: ANÁLISE COMPLETA E RESUMOS ===
+# Versão do prompt; alterar obriga a reanalisar todas as secções guardadas
+PROMPT_VERSION = "2"
+
+# Esquema JSON pedido ao LLM, campo a campo (permite pedir só as secções alteradas)
+FIELD_SCHEMAS = {
+    "full_name": '"string"',
+    "professional_title": '"string (infer from experience, NEVER null)"',
+    "location": '"string or null"',
+    "website": '"url or null"',
+    "about_summary": '"2-3 sentence professional summary highlighting key strengths and experience"',
+    "experience_summary": '"2-3 sentence summary of professional experience and key roles"',
+    "experience_items": """[
     {
       "company": "string",
       "position": "string",
       "period": "string",
       "description": "1-2 sentence summary"
     }
-  ],
-
-  "education_summary": "1-2 sentence summary of academic background",
-  "education_items": [
+  ]""",
+    "education_summary": '"1-2 sentence summary of academic background"',
+    "education_items": """[
     {
       "institution": "string",
       "degree": "string",
       "period": "string"
     }
-  ],
+  ]""",
+    "skills_summary": '"1 sentence highlighting main skill areas"',
+    "skills": '["skill1", "skill2", "skill3"]',
+    "languages": '[{"language": "string", "level": "string"}] or null',
+    "certifications": '["string"] or null',
+    "projects": '[{"name": "string", "description": "1 sentence"}] or null',
+}
 
-  "skills_summary": "1 sentence highlighting main skill areas",
-  "skills": ["skill1", "skill2", "skill3"],
 
-  "languages": [{"language": "string", "level": "string"}] or null,
-  "certifications": ["string"] or null,
-  "projects": [{"name": "string", "description": "1 sentence"}] or null
-}
+def build_system_prompt(fields: List[str]) -> str:
+    """Monta o prompt de sistema pedindo apenas os campos indicados"""
+    schema = ",\n".join(f'  "{field}": {FIELD_SCHEMAS[field]}' for field in FIELD_SCHEMAS if field in fields)
+    return f"""You are an expert resume analyzer. Extract information and create CONCISE summaries for each section.
+
+Extract the following and respond ONLY with valid JSON:
+{{
+{schema}
+}}
 
 Keep summaries CONCISE and PROFESSIONAL. Focus on impact and achievements."""
 
-    user_prompt = f"Currículo completo:\n\n{state['pdf_text']}"
 
-    raw_content = ""
-    try:
-        messages = [
+def parse_llm_json(raw_content: str) -> Dict:
+    """Extrai o objeto JSON da resposta do LLM (pode vir com texto extra)"""
+    json_content = raw_content
+    if '```json' in raw_content:
+        json_content = raw_content.split('```json')[1].split('```')[0]
+    elif '```' in raw_content:
+        json_content = raw_content.split('```')[1].split('```')[0]
+    elif '{' in raw_content:
+        # Encontra o primeiro { e o último }
+        start = raw_content.find('{')
+        end = raw_content.rfind('}') + 1
+        if start != -1 and end > start:
+            json_content = raw_content[start:end]
+
+    return json.loads(json_content.strip())
+
+
+def _plan_analysis(state: ResumeWorkflowState) -> Dict:
+    """
+    Prepara a análise: secções alteradas, mensagens para o LLM e resposta em cache
+
+    Returns:
+        Dict com 'sources', 'section_hashes', 'changed', 'section_outputs' e,
+        se há secções a analisar, 'messages', 'model', 'response_key',
+        'cached_content' (None se a resposta não está em cache) e
+        'chunk_requests' (texto longo: um pedido por parte, ver _analyze_in_chunks)
+    """
+    # Compara as secções com a versão anterior do currículo (se houver)
+    previous = state.get('previous_version')
+    sources = section_sources(state['pdf_text'])
+    section_hashes = {name: hash_text(text) for name, text in sources.items()}
+    changed = changed_sections(section_hashes, previous, PROMPT_VERSION)
+    section_outputs = dict(previous['section_outputs']) if len(changed) < len(SECTION_FIELDS) else {}
+
+    if not changed:
+        print("   ♻️  Nenhuma secção mudou - reutilizando análise anterior")
+    elif section_outputs:
+        print(f"   ♻️  Secções alteradas: {', '.join(changed)} (restantes reutilizadas)")
+
+    plan = {
+        'sources': sources,
+        'section_hashes': section_hashes,
+        'changed': changed,
+        'section_outputs': section_outputs,
+        'messages': None,
+        'chunk_requests': None,
+    }
+    if not changed:
+        return plan
+
+    if section_outputs:
+        # Só as secções alteradas vão para o LLM
+        fields = [field for name in changed for field in SECTION_FIELDS[name]]
+        analysis_text = "\n\n".join(f"[{name}]\n{sources[name]}" for name in changed)
+        user_prompt = f"Secções alteradas do currículo:\n\n{analysis_text}"
+    else:
+        fields = list(FIELD_SCHEMAS)
+        analysis_text = state['pdf_text']
+        user_prompt = f"Currículo completo:\n\n{analysis_text}"
+
+    messages = [
+        SystemMessage(content=build_system_prompt(fields)),
+        HumanMessage(content=user_prompt)
+    ]
+
+    # O mesmo texto já analisado (PDF reexportado, retry, só mudaram as
+    # cores) não volta ao LLM nem ocupa lugar na fila
+    model = llm_model_name()
+    response_key = cache_key([m.content for m in messages], PROMPT_VERSION, model, LLM_TEMPERATURE)
+    plan.update({
+        'messages': messages,
+        'model': model,
+        'response_key': response_key,
+        # Com uma cassete (src/llm_cassette.py) todas as chamadas passam por ela
+        'cached_content': None if llm_cassette.active() else get_cached_response(response_key),
+    })
+    if plan['cached_content'] is not None:
+        print("   ♻️  Resposta do LLM em cache")
+    elif chunked_analysis.needs_chunking(analysis_text) and any(
+            field not in chunked_analysis.SUMMARY_FIELDS for field in fields):
+        plan['fields'] = fields
+        plan['chunk_requests'] = _map_requests(fields, chunked_analysis.split_chunks(analysis_text), model)
+        print(f"   🧩 Texto longo (~{chunked_analysis.estimate_tokens(analysis_text)} tokens): "
+              f"análise em {len(plan['chunk_requests'])} partes")
+    return plan
+
+
+# === ANÁLISE EM PARTES (textos longos, ver src/chunked_analysis.py) ===
+def _llm_request(messages: List, model: str) -> Dict:
+    """Mensagens de uma chamada do map-reduce, com a chave e a resposta em cache"""
+    response_key = cache_key([m.content for m in messages], PROMPT_VERSION, model, LLM_TEMPERATURE)
+    return {
+        'messages': messages,
+        'model': model,
+        'response_key': response_key,
+        'cached_content': None if llm_cassette.active() else get_cached_response(response_key),
+    }
+
+
+def _map_requests(fields: List[str], chunks: List[str], model: str) -> List[Dict]:
+    """Um pedido por parte, só com os campos que não são resumos"""
+    map_fields = [field for field in fields if field not in chunked_analysis.SUMMARY_FIELDS]
+    requests = []
+    for i, chunk in enumerate(chunks, 1):
+        system_prompt = build_system_prompt(map_fields) + (
+            f"\n\nThis is part {i} of {len(chunks)} of a long resume. Extract only what appears in "
+            "this part; use null or [] for anything that is not in it."
+        )
+        requests.append(_llm_request([
             SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
+            HumanMessage(content=f"Parte {i}/{len(chunks)} do currículo:\n\n{chunk}")
+        ], model))
+    return requests
+
+
+def _reduce_request(plan: Dict, merged: Dict) -> Optional[Dict]:
+    """Pedido dos resumos sobre os dados juntos das partes (None se não há resumos a pedir)"""
+    fields = [field for field in chunked_analysis.SUMMARY_FIELDS if field in plan['fields']]
+    if 'professional_title' in plan['fields'] and not merged.get('professional_title'):
+        fields.append('professional_title')
+    if not fields:
+        return None
+    return _llm_request([
+        SystemMessage(content=build_system_prompt(fields)),
+        HumanMessage(content="Dados extraídos do currículo (JSON):\n\n" + json.dumps(merged, ensure_ascii=False))
+    ], plan['model'])
+
+
+def _request_json(state: ResumeWorkflowState, request: Dict) -> Dict:
+    """Resposta de um pedido do map-reduce (cache ou LLM), já convertida de JSON"""
+    raw_content = request['cached_content']
+    if raw_content is None:
+        raw_content = _call_llm(state, request['messages'], request['model'], gated=False)
+    data = parse_llm_json(raw_content)
+    if request['cached_content'] is None and not llm_cassette.replaying():
+        put_cached_response(request['response_key'], request['model'], raw_content)
+    return data
+
+
+def _analyze_in_chunks(state: ResumeWorkflowState, plan: Dict) -> str:
+    """
+    Map-reduce: analisa as partes em paralelo, junta os dados sem repetidos e
+    pede os resumos sobre o resultado; devolve o JSON final
+
+    O upload ocupa um só lugar na fila do LLM (o gate é pedido uma vez) e
+    faz até chunked_analysis.CONCURRENCY chamadas em simultâneo dentro dele.
+    """
+    gate = nullcontext() if llm_cassette.replaying() else (state.get('llm_gate') or _llm_gate or nullcontext())
+    with gate:
+        with ThreadPoolExecutor(max_workers=chunked_analysis.CONCURRENCY) as pool:
+            partials = list(pool.map(lambda request: _request_json(state, request), plan['chunk_requests']))
+        merged = chunked_analysis.merge_partials(partials)
+        reduce_request = _reduce_request(plan, merged)
+        if reduce_request is not None:
+            merged.update(_request_json(state, reduce_request))
+    print(f"   🧩 {len(partials)} partes juntas: {len(merged.get('experience_items') or [])} experiências, "
+          f"{len(merged.get('education_items') or [])} formações")
+    return json.dumps(merged, ensure_ascii=False)
+
+
+async def _arequest_json(state: ResumeWorkflowState, request: Dict, semaphore: asyncio.Semaphore) -> Dict:
+    """Versão assíncrona de _request_json (no máximo CONCURRENCY chamadas ao mesmo tempo)"""
+    raw_content = request['cached_content']
+    if raw_content is None:
+        async with semaphore:
+            raw_content = await _acall_llm(state, request['messages'], request['model'], gated=False)
+    data = parse_llm_json(raw_content)
+    if request['cached_content'] is None and not llm_cassette.replaying():
+        await asyncio.get_running_loop().run_in_executor(
+            None, put_cached_response, request['response_key'], request['model'], raw_content
+        )
+    return data
+
+
+async def _aanalyze_in_chunks(state: ResumeWorkflowState, plan: Dict) -> str:
+    """Versão assíncrona de _analyze_in_chunks"""
+    semaphore = asyncio.Semaphore(chunked_analysis.CONCURRENCY)
+    gate = None if llm_cassette.replaying() else (state.get('llm_gate') or _llm_gate)
+    async with _async_gate(gate):
+        partials = await asyncio.gather(*(
+            _arequest_json(state, request, semaphore) for request in plan['chunk_requests']
+        ))
+        merged = chunked_analysis.merge_partials(partials)
+        reduce_request = await asyncio.get_running_loop().run_in_executor(None, _reduce_request, plan, merged)
+        if reduce_request is not None:
+            merged.update(await _arequest_json(state, reduce_request, semaphore))
+    print(f"   🧩 {len(partials)} partes juntas: {len(merged.get('experience_items') or [])} experiências, "
+          f"{len(merged.get('education_items') or [])} formações")
+    return json.dumps(merged, ensure_ascii=False)
+
+
+def _llm_for_state(state: ResumeWorkflowState):
+    """Verifica o prazo e cria o LLM com o timeout que resta depois da espera na fila"""
+    deadline = state.get('deadline')
+    check_deadline(state, "analyze_and_summarize", MIN_LLM_SECONDS)
+    return get_llm(temperature=LLM_TEMPERATURE,
+                   timeout=deadline.timeout(LLM_DEFAULT_TIMEOUT) if deadline else None)
+
+
+def _call_llm(state: ResumeWorkflowState, messages: List, model: str, gated: bool = True) -> str:
+    """
+    Chamada ao LLM (ou resposta da cassete em reprodução), gravada na cassete em modo record
 
+    Com gated=False o chamador já está dentro do gate (análise em partes).
+    """
+    prompt_parts = [m.content for m in messages]
+    replayed = llm_cassette.replay(prompt_parts, model)
+    if replayed is not None:
+        time.sleep(replayed['latency'])
+        return replayed['response']
+
+    # Lugar de execução do controlo de admissão (por upload) ou limite global
+    with (state.get('llm_gate') or _llm_gate or nullcontext()) if gated else nullcontext():
+        llm = _llm_for_state(state)
+        print("   📤 Enviando para LLM...")
+        started = time.perf_counter()
+        raw_content = invoke_llm(llm, messages, state.get('deadline'))
+    llm_cassette.record(prompt_parts, model, raw_content, time.perf_counter() - started)
+    return raw_content
+
+
+async def _acall_llm(state: ResumeWorkflowState, messages: List, model: str, gated: bool = True) -> str:
+    """Versão assíncrona de _call_llm"""
+    prompt_parts = [m.content for m in messages]
+    replayed = llm_cassette.replay(prompt_parts, model)
+    if replayed is not None:
+        await asyncio.sleep(replayed['latency'])
+        return replayed['response']
+
+    async with _async_gate((state.get('llm_gate') or _llm_gate) if gated else None):
+        llm = _llm_for_state(state)
         print("   📤 Enviando para LLM...")
-        response = llm.invoke(messages)
-        raw_content = response.content
-
-        print(f"   📥 Resposta recebida ({len(raw_content)} chars)")
-        print(f"   📥 Preview: {raw_content[:200]}..." if len(raw_content) > 200 else f"   📥 Resposta: {raw_content}")
-
-        # Tenta extrair JSON da resposta (pode vir com texto extra)
-        json_content = raw_content
-        if '```json' in raw_content:
-            json_content = raw_content.split('```json')[1].split('```')[0]
-        elif '```' in raw_content:
-            json_content = raw_content.split('```')[1].split('```')[0]
-        elif '{' in raw_content:
-            # Encontra o primeiro { e o último }
-            start = raw_content.find('{')
-            end = raw_content.rfind('}') + 1
-            if start != -1 and end > start:
-                json_content = raw_content[start:end]
-
-        result = json.loads(json_content.strip())
-
-        state['analyzed_data'] = result
-        print(f"   ✓ Analisado: {result.get('full_name', 'N/A')}")
-        state['processing_stage'] = "Currículo analisado"
-
-    except json.JSONDecodeError as e:
-        print(f"   ✗ Erro ao parsear JSON: {e}")
+        started = time.perf_counter()
+        raw_content = await ainvoke_llm(llm, messages, state.get('deadline'))
+    llm_cassette.record(prompt_parts, model, raw_content, time.perf_counter() - started)
+    return raw_content
+
+
+def _print_response(raw_content: str):
+    print(f"   📥 Resposta recebida ({len(raw_content)} chars)")
+    print(f"   📥 Preview: {raw_content[:200]}..." if len(raw_content) > 200 else f"   📥 Resposta: {raw_content}")
+
+
+def _finish_analysis(state: ResumeWorkflowState, plan: Dict, raw_content: str):
+    """Junta a resposta do LLM (se houve chamada) às secções reutilizadas e grava o registo da versão"""
+    section_outputs = plan['section_outputs']
+    if plan['messages'] is not None:
+        partial = split_outputs(parse_llm_json(raw_content))
+        if plan['cached_content'] is None and not llm_cassette.replaying():
+            # Só respostas com JSON válido ficam em cache
+            put_cached_response(plan['response_key'], plan['model'], raw_content)
+        for name in plan['changed']:
+            section_outputs[name] = partial[name]
+
+    result = join_outputs(section_outputs)
+
+    state['analyzed_data'] = result
+    state['version_record'] = {
+        'prompt_version': PROMPT_VERSION,
+        'page_hashes': state['version_record'].get('page_hashes', []),
+        'page_texts': state['version_record'].get('page_texts', {}),
+        'section_hashes': plan['section_hashes'],
+        'section_outputs': section_outputs,
+        'reanalyzed_sections': plan['changed'],
+    }
+    print(f"   ✓ Analisado: {result.get('full_name', 'N/A')}")
+    state['processing_stage'] = "Currículo analisado"
+
+
+def _analysis_failed(state: ResumeWorkflowState, error: Exception, raw_content: str):
+    """Regista o erro da análise no estado e interrompe o workflow"""
+    state['analyzed_data'] = {}
+    state['processing_stage'] = "Erro na análise"
+    if isinstance(error, json.JSONDecodeError):
+        print(f"   ✗ Erro ao parsear JSON: {error}")
         print(f"   ✗ Conteúdo recebido: {raw_content[:500] if raw_content else 'VAZIO'}")
         state['errors'].append(f"Resposta inválida do LLM (não é JSON)")
+        raise RuntimeError(f"Resposta do LLM não é JSON válido: {str(error)}")
+    print(f"   ✗ Erro na análise com IA: {error}")
+    state['errors'].append(f"Erro na análise com IA: {str(error)}")
+    raise RuntimeError(f"Falha ao processar currículo com IA: {str(error)}")
+
+
+def analyze_and_summarize_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
+    """Analisa o currículo e gera resumos de cada secção"""
+    print("🤖 [NODE 3] Analisando currículo e gerando resumos...")
+
+    if not state['pdf_text']:
+        state['errors'].append("Sem texto para processar")
         state['analyzed_data'] = {}
-        state['processing_stage'] = "Erro na análise"
-        raise RuntimeError(f"Resposta do LLM não é JSON válido: {str(e)}")
+        return state
+
+    raw_content = ""
+    try:
+        plan = _plan_analysis(state)
+        raw_content = plan.get('cached_content') or ""
+        if plan['chunk_requests']:
+            raw_content = _analyze_in_chunks(state, plan)
+        elif plan['messages'] is not None and plan['cached_content'] is None:
+            raw_content = _call_llm(state, plan['messages'], plan['model'])
+            _print_response(raw_content)
+        _finish_analysis(state, plan, raw_content)
     except Exception as e:
-        print(f"   ✗ Erro na análise com IA: {e}")
-        state['errors'].append(f"Erro na análise com IA: {str(e)}")
+        _analysis_failed(state, e, raw_content)
+
+    return state
+
+
+async def analyze_and_summarize_node_async(state: ResumeWorkflowState) -> ResumeWorkflowState:
+    """Como analyze_and_summarize_node, mas a fila e a chamada ao LLM são aguardadas no event loop"""
+    print("🤖 [NODE 3] Analisando currículo e gerando resumos (assíncrono)...")
+
+    if not state['pdf_text']:
+        state['errors'].append("Sem texto para processar")
         state['analyzed_data'] = {}
-        state['processing_stage'] = "Erro na análise"
-        raise RuntimeError(f"Falha ao processar currículo com IA: {str(e)}")
+        return state
+
+    raw_content = ""
+    try:
+        # Secções, hashes e cache são trabalho síncrono (CPU e SQLite): no executor
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(None, _plan_analysis, state)
+        raw_content = plan.get('cached_content') or ""
+        if plan['chunk_requests']:
+            raw_content = await _aanalyze_in_chunks(state, plan)
+        elif plan['messages'] is not None and plan['cached_content'] is None:
+            raw_content = await _acall_llm(state, plan['messages'], plan['model'])
+            _print_response(raw_content)
+        await loop.run_in_executor(None, _finish_analysis, state, plan, raw_content)
+    except Exception as e:
+        _analysis_failed(state, e, raw_content)
 
     return state
 
 
-# === NODE 3: ESTRUTURA DO WEBSITE ===
+@asynccontextmanager
+async def _async_gate(gate):
+    """Entra no gate sem bloquear o loop ('async with' do Ticket; os outros no executor)"""
+    if gate is None:
+        yield
+    elif hasattr(gate, '__aenter__'):
+        async with gate:
+            yield
+    else:
+        await asyncio.get_running_loop().run_in_executor(None, gate.__enter__)
+        try:
+            yield
+        finally:
+            gate.__exit__(None, None, None)
+
+
+# === NODE 4: ESTRUTURA DO WEBSITE ===
 def build_website_structure_node(state: ResumeWorkflowState) -> ResumeWorkflowState:
     """Constrói estrutura simplificada do website"""
-    print("🏗️  [NODE 3] Construindo estrutura do website...")
+    print("🏗️  [NODE 4] Construindo estrutura do website...")
 
     state['website_structure'] = {
-        'data': state['analyzed_data']
+        'data': merge_resume_data(state['fast_data'], state['analyzed_data'])
     }
 
     state['processing_stage'] = "Website estruturado"
@@ -203,70 +636,146 @@ def build_website_structure_node(state: ResumeWorkflowState) -> ResumeWorkflowSt
 
 
 # === CONSTRUÇÃO DO GRAPH ===
-def create_resume_workflow() -> StateGraph:
-    """Cria o workflow LangGraph simplificado"""
+def create_resume_workflow(async_llm: bool = False) -> StateGraph:
+    """
+    Cria o workflow LangGraph simplificado
+
+    Com async_llm=True o node de análise é uma corrotina (usar com astream;
+    os restantes nodes correm no executor do loop).
+    """
     workflow = StateGraph(ResumeWorkflowState)
 
     # Adiciona nodes
     workflow.add_node("extract_pdf", extract_pdf_node)
-    workflow.add_node("analyze_and_summarize", analyze_and_summarize_node)
+    workflow.add_node("rule_extract", rule_extract_node)
+    workflow.add_node("analyze_and_summarize",
+                      analyze_and_summarize_node_async if async_llm else analyze_and_summarize_node)
     workflow.add_node("build_website", build_website_structure_node)
 
     # Define edges (fluxo sequencial)
     workflow.set_entry_point("extract_pdf")
-    workflow.add_edge("extract_pdf", "analyze_and_summarize")
+    workflow.add_edge("extract_pdf", "rule_extract")
+    workflow.add_edge("rule_extract", "analyze_and_summarize")
     workflow.add_edge("analyze_and_summarize", "build_website")
     workflow.add_edge("build_website", END)
 
     return workflow.compile()
 
 
+def _initial_state(pdf_path: str, previous_version: Optional[Dict], pdf_hash: Optional[str],
+                   llm_gate: Optional[Any], deadline: Optional[Deadline]) -> Dict:
+    print("\n" + "="*60)
+    print("🚀 INICIANDO WORKFLOW LANGGRAPH")
+    print("="*60 + "\n")
+
+    return {
+        "pdf_path": pdf_path,
+        "pdf_hash": pdf_hash,
+        "pdf_text": "",
+        "fast_data": {},
+        "analyzed_data": {},
+        "website_structure": {},
+        "previous_version": previous_version,
+        "version_record": {},
+        "llm_gate": llm_gate,
+        "deadline": deadline,
+        "errors": [],
+        "processing_stage": "Iniciado"
+    }
+
+
+def _workflow_result(final_state: Dict) -> Dict:
+    print("\n" + "="*60)
+    print(f"✅ WORKFLOW CONCLUÍDO: {final_state['processing_stage']}")
+    if final_state['errors']:
+        print(f"⚠️  Com {len(final_state['errors'])} avisos")
+    print("="*60 + "\n")
+
+    return {
+        'success': True,
+        'website_structure': final_state['website_structure'],
+        'version_record': final_state['version_record'],
+        'errors': final_state['errors']
+    }
+
+
+def _workflow_error(e: Exception) -> Dict:
+    print(f"\n❌ ERRO NO WORKFLOW: {str(e)}\n")
+    return {
+        'success': False,
+        'error': str(e),
+        'website_structure': {},
+        'errors': [str(e)]
+    }
+
+
 # === FUNÇÃO PRINCIPAL ===
-def process_resume_with_langgraph(pdf_path: str) -> Dict:
+def process_resume_with_langgraph(pdf_path: str,
+                                  on_progress: Optional[Callable[[str, Dict], None]] = None,
+                                  previous_version: Optional[Dict] = None,
+                                  pdf_hash: Optional[str] = None,
+                                  llm_gate: Optional[Any] = None,
+                                  deadline: Optional[Deadline] = None) -> Dict:
     """
     Processa um currículo usando o workflow LangGraph
 
     Args:
         pdf_path: Caminho para o ficheiro PDF
+        on_progress: Callback opcional chamado com (nome_do_node, estado)
+            após cada node, p.ex. para publicar os dados determinísticos
+            antes de a análise do LLM terminar
+        previous_version: Registo da versão anterior do mesmo currículo
+            (ver src/resume_versions.py) para reprocessamento incremental
+        pdf_hash: SHA-256 do PDF, se já conhecido (evita reler o ficheiro
+            para consultar a cache de extrações)
+        llm_gate: Context manager à volta da chamada ao LLM deste currículo
+            (p.ex. o Ticket do controlo de admissão, ver src/admission.py)
+        deadline: Prazo do processamento (src/deadline.py); os nodes param
+            quando expira ou é cancelado
 
     Returns:
         Dict com estrutura completa do website
     """
-    print("\n" + "="*60)
-    print("🚀 INICIANDO WORKFLOW LANGGRAPH")
-    print("="*60 + "\n")
-
     app = create_resume_workflow()
+    initial_state = _initial_state(pdf_path, previous_version, pdf_hash, llm_gate, deadline)
 
-    initial_state = {
-        "pdf_path": pdf_path,
-        "pdf_text": "",
-        "analyzed_data": {},
-        "website_structure": {},
-        "errors": [],
-        "processing_stage": "Iniciado"
-    }
+    try:
+        final_state = initial_state
+        for update in app.stream(initial_state, stream_mode="updates"):
+            for node_name, node_state in update.items():
+                final_state = node_state
+                if on_progress:
+                    on_progress(node_name, node_state)
+        return _workflow_result(final_state)
+
+    except Exception as e:
+        return _workflow_error(e)
+
+
+async def process_resume_with_langgraph_async(pdf_path: str,
+                                              on_progress: Optional[Callable[[str, Dict], None]] = None,
+                                              previous_version: Optional[Dict] = None,
+                                              pdf_hash: Optional[str] = None,
+                                              llm_gate: Optional[Any] = None,
+                                              deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Versão assíncrona de process_resume_with_langgraph (mesmos argumentos)
+
+    A espera na fila do LLM e a chamada ao LLM são aguardadas sem ocupar uma
+    thread; a extração do PDF corre no executor do loop. on_progress é chamado
+    na thread do loop.
+    """
+    app = create_resume_workflow(async_llm=True)
+    initial_state = _initial_state(pdf_path, previous_version, pdf_hash, llm_gate, deadline)
 
     try:
-        final_state = app.invoke(initial_state)
-
-        print("\n" + "="*60)
-        print(f"✅ WORKFLOW CONCLUÍDO: {final_state['processing_stage']}")
-        if final_state['errors']:
-            print(f"⚠️  Com {len(final_state['errors'])} avisos")
-        print("="*60 + "\n")
-
-        return {
-            'success': True,
-            'website_structure': final_state['website_structure'],
-            'errors': final_state['errors']
-        }
+        final_state = initial_state
+        async for update in app.astream(initial_state, stream_mode="updates"):
+            for node_name, node_state in update.items():
+                final_state = node_state
+                if on_progress:
+                    on_progress(node_name, node_state)
+        return _workflow_result(final_state)
 
     except Exception as e:
-        print(f"\n❌ ERRO NO WORKFLOW: {str(e)}\n")
-        return {
-            'success': False,
-            'error': str(e),
-            'website_structure': {},
-            'errors': [str(e)]
-        }
+        return _workflow_error(e)
@@ -0,0 +1,88 @@
+// URL atual da página
+const pageUrl = window.location.href;
+const pageTitle = document.body.dataset.shareTitle || document.title;
+
+// Função para abrir modal de partilha
+function openShareModal() {
+    const modal = document.getElementById('shareModal');
+    const shareLink = document.getElementById('shareLink');
+
+    shareLink.value = pageUrl;
+    modal.classList.add('active');
+
+    // Atualiza links de partilha
+    updateShareLinks();
+}
+
+// Função para fechar modal de partilha
+function closeShareModal(event) {
+    const modal = document.getElementById('shareModal');
+    if (!event || event.target === modal) {
+        modal.classList.remove('active');
+    }
+}
+
+// Função para copiar link
+async function copyLink() {
+    const shareLink = document.getElementById('shareLink');
+    const copyButton = document.getElementById('copyButton');
+
+    try {
+        await navigator.clipboard.writeText(shareLink.value);
+
+        // Feedback visual
+        copyButton.textContent = '✓ Copiado!';
+        copyButton.classList.add('copied');
+
+        setTimeout(() => {
+            copyButton.textContent = '📋 Copiar';
+            copyButton.classList.remove('copied');
+        }, 2000);
+    } catch (err) {
+        // Fallback para navegadores antigos
+        shareLink.select();
+        document.execCommand('copy');
+
+        copyButton.textContent = '✓ Copiado!';
+        copyButton.classList.add('copied');
+
+        setTimeout(() => {
+            copyButton.textContent = '📋 Copiar';
+            copyButton.classList.remove('copied');
+        }, 2000);
+    }
+}
+
+// Atualiza links de redes sociais
+function updateShareLinks() {
+    const encodedUrl = encodeURIComponent(pageUrl);
+    const encodedTitle = encodeURIComponent(pageTitle);
+
+    // WhatsApp
+    const whatsappLink = document.getElementById('whatsappShare');
+    whatsappLink.href = `https://wa.me/?text=${encodedTitle}%20-%20${encodedUrl}`;
+
+    // LinkedIn
+    const linkedinLink = document.getElementById('linkedinShare');
+    linkedinLink.href = `https://www.linkedin.com/sharing/share-offsite/?url=${encodedUrl}`;
+
+    // Email
+    const emailLink = document.getElementById('emailShare');
+    emailLink.href = `mailto:?subject=${encodedTitle}&body=Confira este currículo profissional: ${encodedUrl}`;
+}
+
+// Fechar modal com tecla ESC
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        closeShareModal();
+    }
+});
+
+// Ocultar botão de partilha ao imprimir
+window.addEventListener('beforeprint', function() {
+    document.querySelector('.share-button').style.display = 'none';
+});
+
+window.addEventListener('afterprint', function() {
+    document.querySelector('.share-button').style.display = 'flex';
+});